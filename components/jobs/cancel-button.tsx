@@ -0,0 +1,39 @@
+"use client";
+
+import { Button } from "@/components/ui/button";
+import { useCancelJob } from "@/lib/api/hooks";
+import { toast } from "sonner";
+import type { JobStatus } from "@/lib/types";
+
+interface CancelButtonProps {
+  jobId: string;
+  status: JobStatus;
+  size?: "sm" | "default";
+}
+
+const CANCELLABLE: JobStatus[] = ["pending", "retrying", "processing", "scheduled"];
+
+export function CancelButton({ jobId, status, size = "sm" }: CancelButtonProps) {
+  const { mutate, isPending } = useCancelJob();
+
+  if (!CANCELLABLE.includes(status)) return null;
+
+  return (
+    <Button
+      variant="outline"
+      size={size}
+      disabled={isPending}
+      onClick={(e) => {
+        e.preventDefault();
+        e.stopPropagation();
+        mutate(jobId, {
+          onSuccess: () => toast.success("Job cancelled"),
+          onError: (err) => toast.error(`Cancel failed: ${err.message}`),
+        });
+      }}
+      className="font-mono text-xs uppercase tracking-wider h-6 px-2 py-0"
+    >
+      {isPending ? "..." : "Cancel"}
+    </Button>
+  );
+}
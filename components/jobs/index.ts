@@ -1,3 +1,4 @@
 export { StatusBadge } from "./status-badge";
 export { RetryButton } from "./retry-button";
+export { CancelButton } from "./cancel-button";
 export { JobTypeLabel } from "./job-type-label";
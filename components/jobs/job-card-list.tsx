@@ -5,6 +5,7 @@ import { Card, CardContent } from "@/components/ui/card";
 import { StatusBadge } from "./status-badge";
 import { JobTypeLabel } from "./job-type-label";
 import { RetryButton } from "./retry-button";
+import { CancelButton } from "./cancel-button";
 import { RelativeTime } from "./relative-time";
 import { truncateId } from "@/lib/utils/format";
 import type { Job } from "@/lib/types";
@@ -38,6 +39,7 @@ export function JobCardList({ jobs }: JobCardListProps) {
                 </div>
               </div>
               <RetryButton jobId={job.id} status={job.status} />
+              <CancelButton jobId={job.id} status={job.status} />
             </CardContent>
           </Card>
         </Link>
@@ -7,6 +7,7 @@ import { Button } from "@/components/ui/button";
 import { StatusBadge } from "./status-badge";
 import { JobTypeLabel } from "./job-type-label";
 import { RetryButton } from "./retry-button";
+import { CancelButton } from "./cancel-button";
 import { Skeleton } from "@/components/ui/skeleton";
 import { JOB_TYPE_CONFIG } from "@/lib/types";
 import { formatDateTime } from "@/lib/utils/format";
@@ -49,6 +50,7 @@ export function JobDetail({ jobId }: JobDetailProps) {
       <div className="flex items-center justify-between">
         <BackButton />
         <RetryButton jobId={job.id} status={job.status} size="default" />
+        <CancelButton jobId={job.id} status={job.status} size="default" />
       </div>
 
       <Card>
@@ -10,6 +10,8 @@ const TABS: Array<{ value: JobStatus | "all"; label: string }> = [
   { value: "failed", label: "Failed" },
   { value: "retrying", label: "Retrying" },
   { value: "dead_letter", label: "DLQ" },
+  { value: "scheduled", label: "Scheduled" },
+  { value: "cancelled", label: "Cancelled" },
 ];
 
 interface JobStatusTabsProps {
@@ -12,6 +12,7 @@ import {
 import { StatusBadge } from "./status-badge";
 import { JobTypeLabel } from "./job-type-label";
 import { RetryButton } from "./retry-button";
+import { CancelButton } from "./cancel-button";
 import { RelativeTime } from "./relative-time";
 import { truncateId } from "@/lib/utils/format";
 import type { Job } from "@/lib/types";
@@ -73,6 +74,7 @@ export function JobTable({ jobs }: JobTableProps) {
               <TableCell>
                 <div className="flex items-center h-6">
                   <RetryButton jobId={job.id} status={job.status} />
+                  <CancelButton jobId={job.id} status={job.status} />
                 </div>
               </TableCell>
             </TableRow>
@@ -28,6 +28,10 @@ const badgeVariants = cva(
           "border-status-retrying/30 bg-status-retrying/10 text-status-retrying",
         dead_letter:
           "border-status-dead-letter/30 bg-status-dead-letter/10 text-status-dead-letter",
+        scheduled:
+          "border-status-scheduled/30 bg-status-scheduled/10 text-status-scheduled",
+        cancelled:
+          "border-status-cancelled/30 bg-status-cancelled/10 text-status-cancelled",
       },
     },
     defaultVariants: {
@@ -1,5 +1,9 @@
 const API_BASE = process.env.NEXT_PUBLIC_API_URL ?? "http://localhost:8000";
 
+// Echoed back so reads right after a write go to the primary, not a lagging replica
+const LAST_WRITE_HEADER = "X-Last-Write";
+let lastWrite: string | null = null;
+
 export class ApiError extends Error {
   constructor(
     public status: number,
@@ -19,9 +23,11 @@ export async function request<T>(
     ...options,
     headers: {
       "Content-Type": "application/json",
+      ...(lastWrite ? { [LAST_WRITE_HEADER]: lastWrite } : {}),
       ...options?.headers,
     },
   });
+  lastWrite = res.headers.get(LAST_WRITE_HEADER) ?? lastWrite;
 
   if (!res.ok) {
     const body = await res.json().catch(() => ({ detail: res.statusText }));
@@ -6,7 +6,7 @@ import {
   useQueryClient,
   keepPreviousData,
 } from "@tanstack/react-query";
-import { listJobs, getJob, createJob, retryJob } from "./jobs";
+import { listJobs, getJob, createJob, retryJob, cancelJob } from "./jobs";
 import type { CreateJobRequest } from "@/lib/types";
 import { generateIdempotencyKey } from "@/lib/utils/format";
 
@@ -38,7 +38,12 @@ export function useJob(id: string) {
     queryFn: () => getJob(id),
     refetchInterval: (query) => {
       const status = query.state.data?.status;
-      if (status === "completed" || status === "dead_letter") return false;
+      if (
+        status === "completed" ||
+        status === "dead_letter" ||
+        status === "cancelled"
+      )
+        return false;
       return 2000;
     },
   });
@@ -65,3 +70,14 @@ export function useRetryJob() {
     },
   });
 }
+
+export function useCancelJob() {
+  const queryClient = useQueryClient();
+  return useMutation({
+    mutationFn: (id: string) => cancelJob(id),
+    onSuccess: (updatedJob) => {
+      queryClient.setQueryData(jobKeys.detail(updatedJob.id), updatedJob);
+      queryClient.invalidateQueries({ queryKey: jobKeys.lists() });
+    },
+  });
+}
@@ -37,3 +37,7 @@ export async function createJob(
 export async function retryJob(id: string): Promise<Job> {
   return request<Job>(`/jobs/${id}/retry`, { method: "POST" });
 }
+
+export async function cancelJob(id: string): Promise<Job> {
+  return request<Job>(`/jobs/${id}/cancel`, { method: "POST" });
+}
@@ -4,7 +4,9 @@ export type JobStatus =
   | "completed"
   | "failed"
   | "retrying"
-  | "dead_letter";
+  | "dead_letter"
+  | "scheduled"
+  | "cancelled";
 
 export type JobType = "email.send" | "report.generate" | "image.process";
 
@@ -17,6 +19,12 @@ export interface Job {
   max_attempts: number;
   error_message: string | null;
   idempotency_key: string | null;
+  dedupe_key: string | null;
+  traceparent: string | null;
+  timeout_seconds: number | null;
+  run_at: string | null;
+  cron: string | null;
+  started_at: string | null;
   created_at: string;
   updated_at: string;
 }
@@ -32,6 +40,10 @@ export interface CreateJobRequest {
   type: JobType;
   payload: Record<string, unknown>;
   max_attempts: number;
+  timeout_seconds?: number;
+  run_at?: string;
+  cron?: string;
+  dedupe_key?: string;
 }
 
 export const JOB_STATUS_CONFIG: Record<
@@ -44,6 +56,8 @@ export const JOB_STATUS_CONFIG: Record<
   failed: { label: "Failed", variant: "failed" },
   retrying: { label: "Retrying", variant: "retrying" },
   dead_letter: { label: "Dead Letter", variant: "dead_letter" },
+  scheduled: { label: "Scheduled", variant: "scheduled" },
+  cancelled: { label: "Cancelled", variant: "cancelled" },
 };
 
 export const JOB_TYPE_CONFIG: Record<
@@ -1,10 +1,55 @@
 #!/usr/bin/env python3
-"""Load test script: enqueue jobs and optionally watch processing metrics."""
+"""Load test script: enqueue jobs and optionally watch processing metrics.
+
+Two modes:
+
+* ``--count N [--poll]``: quick smoke load. Enqueues N jobs as fast as
+  CONCURRENCY connections allow, then optionally watches /metrics.
+* ``--scenario FILE --report OUT``: open-loop benchmark. Jobs arrive as a
+  Poisson process at the scenario's rates, whatever the system's response
+  time, so a slow system is charged for the backlog it causes instead of
+  quietly receiving less load (coordinated omission). Once arrivals end,
+  every job is followed to a final state. Latencies are computed from the
+  job's own timestamps, so the polling cadence doesn't distort them:
+
+      enqueue     intended send time -> POST /jobs response
+      queue_wait  created_at -> started_at (last attempt's claim)
+      run         started_at -> updated_at of the final state
+      end_to_end  created_at -> updated_at of the final state
+
+  The JSON report holds p50/p90/p99/p99.9/max per stage, overall and per
+  job type, plus offered and sustained throughput. ``--compare OLD`` prints
+  the change against an earlier report.
+
+Scenario file (JSON; see scripts/scenarios/):
+
+    {
+      "name": "steady",
+      "seed": 1,
+      "phases": [{"duration_s": 60, "rate": 50}],
+      "mix": [
+        {"type": "email.send", "weight": 0.6, "payload": {"to": "a@example.com"},
+         "payload_bytes": 256}
+      ],
+      "max_attempts": 3
+    }
+
+``payload_bytes`` pads the payload with a filler field up to roughly that
+many bytes of JSON. Server timestamps come from the API's database and the
+worker hosts, so run the stack on synchronized clocks.
+
+All arrivals come from one client IP, so start the API with a per-IP limit
+above the scenario's peak (e.g. ``RATE_LIMIT_MAX=100000``). A 429 aborts the
+run rather than being counted as an enqueue error.
+"""
 
 import argparse
 import asyncio
+import json
+import math
 import random
 import time
+from datetime import datetime, timezone
 
 import httpx
 
@@ -26,6 +71,68 @@ REPORT_PAYLOADS = [
 
 CONCURRENCY = 50
 
+# Open-loop mode: cap on simultaneous HTTP connections (arrivals past it
+# wait for a connection, and that wait counts towards enqueue latency)
+MAX_CONNECTIONS = 500
+
+# Following jobs to completion: GET /jobs page size, and how far back each
+# poll re-reads updated_at to catch rows committed late
+FOLLOW_PAGE_SIZE = 100
+FOLLOW_OVERLAP_S = 5.0
+
+FINAL_STATUSES = {"completed", "failed", "dead_letter", "cancelled"}
+
+RATE_LIMITED = (
+    "API answered 429: the per-IP rate limit is below the offered load. "
+    "Restart it with a higher RATE_LIMIT_MAX (e.g. RATE_LIMIT_MAX=100000) and rerun."
+)
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """HDR-style histogram: log-spaced buckets, bounded relative error.
+
+    Values (ms) land in bucket ``floor(log(v) / log(1 + precision))``, so
+    every reported percentile is within ``precision`` of the true value,
+    whatever the range, using memory proportional to the range's log.
+    """
+
+    def __init__(self, precision: float = 0.001):
+        self._log_base = math.log1p(precision)
+        self.counts: dict[int, int] = {}
+        self.total = 0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value_ms: float) -> None:
+        value_ms = max(value_ms, 0.001)
+        bucket = math.floor(math.log(value_ms) / self._log_base)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.min = min(self.min, value_ms)
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, p: float) -> float:
+        rank = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                # Bucket midpoint, clamped to what was actually recorded
+                value = math.exp((bucket + 0.5) * self._log_base)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        if self.total == 0:
+            return {"count": 0}
+        result = {"count": self.total}
+        for p in PERCENTILES:
+            result[f"p{p:g}".replace(".", "")] = round(self.percentile(p), 3)
+        result["max"] = round(self.max, 3)
+        return result
+
 
 async def enqueue_job(
     client: httpx.AsyncClient,
@@ -101,6 +208,257 @@ async def poll_metrics(client: httpx.AsyncClient, url: str):
         await asyncio.sleep(2)
 
 
+# --- Open-loop scenarios ------------------------------------------------------
+
+
+def load_scenario(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        scenario = json.load(f)
+    if not scenario.get("phases") or not scenario.get("mix"):
+        raise SystemExit(f"{path}: a scenario needs 'phases' and 'mix'")
+    return scenario
+
+
+def build_payload(entry: dict) -> dict:
+    payload = dict(entry.get("payload", {}))
+    target = entry.get("payload_bytes")
+    if target:
+        filler = target - len(json.dumps(payload)) - len(', "filler": ""')
+        if filler > 0:
+            payload["filler"] = "x" * filler
+    return payload
+
+
+def arrival_schedule(scenario: dict, rng: random.Random) -> list[tuple[float, dict]]:
+    """(offset in seconds, mix entry) for every arrival, Poisson within each phase."""
+    mix = scenario["mix"]
+    weights = [entry.get("weight", 1.0) for entry in mix]
+    arrivals = []
+    phase_start = 0.0
+    for phase in scenario["phases"]:
+        phase_end = phase_start + phase["duration_s"]
+        t = phase_start
+        if phase["rate"] > 0:
+            while True:
+                t += rng.expovariate(phase["rate"])
+                if t >= phase_end:
+                    break
+                arrivals.append((t, rng.choices(mix, weights)[0]))
+        phase_start = phase_end
+    return arrivals
+
+
+def _parse_time(value: str) -> float:
+    """API timestamps are naive UTC."""
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+async def send_job(
+    client: httpx.AsyncClient,
+    url: str,
+    body: dict,
+    intended_at: float,
+    results: list,
+    headers: dict | None = None,
+) -> None:
+    try:
+        resp = await client.post(f"{url}/jobs", json=body, headers=headers)
+        latency_ms = (time.perf_counter() - intended_at) * 1000
+        if resp.status_code in (200, 201):
+            results.append({"id": resp.json()["id"], "type": body["type"], "enqueue_ms": latency_ms})
+        else:
+            results.append({"error": resp.status_code, "type": body["type"]})
+    except httpx.HTTPError as exc:
+        results.append({"error": type(exc).__name__, "type": body["type"]})
+
+
+def check_rate_limited(results: list, checked: int) -> int:
+    """Abort on a 429 among ``results[checked:]``; returns how many are checked."""
+    if any(result.get("error") == 429 for result in results[checked:]):
+        raise SystemExit(RATE_LIMITED)
+    return len(results)
+
+
+async def run_arrivals(client: httpx.AsyncClient, url: str, scenario: dict) -> tuple[list, float]:
+    rng = random.Random(scenario.get("seed"))
+    schedule = arrival_schedule(scenario, rng)
+    payloads = {id(entry): build_payload(entry) for entry in scenario["mix"]}
+    max_attempts = scenario.get("max_attempts", 3)
+    results: list[dict] = []
+    tasks = []
+    checked = 0
+
+    print(f"Scenario '{scenario.get('name', 'unnamed')}': {len(schedule)} arrivals planned")
+    started = time.perf_counter()
+    for offset, entry in schedule:
+        intended_at = started + offset
+        delay = intended_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        checked = check_rate_limited(results, checked)
+        body = {"type": entry["type"], "payload": payloads[id(entry)], "max_attempts": max_attempts}
+        # Fire and forget: the next arrival doesn't wait for this response
+        tasks.append(asyncio.create_task(send_job(client, url, body, intended_at, results)))
+    await asyncio.gather(*tasks)
+    check_rate_limited(results, checked)
+    return results, time.perf_counter() - started
+
+
+def _api_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+async def finished_since(
+    client: httpx.AsyncClient, url: str, status: str, created_after: float, updated_after: float
+) -> list[dict]:
+    """Every job in ``status`` created and last updated after the given times."""
+    jobs: list[dict] = []
+    params = {
+        "status": status,
+        "created_after": _api_time(created_after),
+        "updated_after": _api_time(updated_after),
+        "limit": FOLLOW_PAGE_SIZE,
+    }
+    while True:
+        resp = await client.get(f"{url}/jobs", params={**params, "offset": len(jobs)})
+        resp.raise_for_status()
+        page = resp.json()["items"]
+        jobs.extend(page)
+        if len(page) < FOLLOW_PAGE_SIZE:
+            return jobs
+
+
+async def follow_jobs(
+    client: httpx.AsyncClient, url: str, job_ids: list[str], timeout: float, since: float
+) -> dict[str, dict]:
+    """Follow jobs to a final state, or until ``timeout`` passes.
+
+    Rather than GET each job, every poll lists the jobs that reached a final
+    state since the previous one (``since`` is when the first was sent), so
+    the load it adds scales with the completion rate, not the backlog.
+    """
+    final: dict[str, dict] = {}
+    pending = set(job_ids)
+    deadline = time.monotonic() + timeout
+    created_after = updated_after = since - FOLLOW_OVERLAP_S
+
+    while pending and time.monotonic() < deadline:
+        polled_at = time.time()
+        try:
+            for status in FINAL_STATUSES:
+                for job in await finished_since(client, url, status, created_after, updated_after):
+                    if job["id"] in pending:
+                        pending.discard(job["id"])
+                        final[job["id"]] = job
+        except httpx.HTTPError:
+            pass
+        else:
+            updated_after = polled_at - FOLLOW_OVERLAP_S
+        print(f"  {len(final)}/{len(job_ids)} jobs finished", end="\r")
+        if pending:
+            await asyncio.sleep(1.0)
+    print()
+    return final
+
+
+def build_report(scenario: dict, results: list, final: dict, elapsed: float) -> dict:
+    stages = ("enqueue", "queue_wait", "run", "end_to_end")
+    overall = {stage: LatencyHistogram() for stage in stages}
+    per_type: dict[str, dict[str, LatencyHistogram]] = {}
+    statuses = {"completed": 0, "failed": 0, "dead_letter": 0, "cancelled": 0, "unfinished": 0}
+    errors: dict[str, int] = {}
+    created_first, finished_last = math.inf, 0.0
+
+    for result in results:
+        if "error" in result:
+            errors[str(result["error"])] = errors.get(str(result["error"]), 0) + 1
+            continue
+        hists = per_type.setdefault(result["type"], {stage: LatencyHistogram() for stage in stages})
+        samples = {"enqueue": result["enqueue_ms"]}
+        job = final.get(result["id"])
+        if job is None:
+            statuses["unfinished"] += 1
+        else:
+            statuses[job["status"]] += 1
+            created = _parse_time(job["created_at"])
+            finished = _parse_time(job["updated_at"])
+            created_first = min(created_first, created)
+            finished_last = max(finished_last, finished)
+            samples["end_to_end"] = (finished - created) * 1000
+            if job.get("started_at"):
+                started = _parse_time(job["started_at"])
+                samples["queue_wait"] = (started - created) * 1000
+                samples["run"] = (finished - started) * 1000
+        for stage, value in samples.items():
+            overall[stage].record(value)
+            hists[stage].record(value)
+
+    enqueued = sum(1 for result in results if "error" not in result)
+    finished = sum(count for status, count in statuses.items() if status != "unfinished")
+    span = finished_last - created_first if finished else 0.0
+    return {
+        "scenario": scenario.get("name", "unnamed"),
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "arrivals": len(results),
+        "enqueued": enqueued,
+        "enqueue_errors": errors,
+        "statuses": statuses,
+        "throughput": {
+            "offered_per_s": round(len(results) / elapsed, 2) if elapsed else 0.0,
+            # First job created -> last job finished, as the system saw it
+            "sustained_per_s": round(finished / span, 2) if span > 0 else 0.0,
+        },
+        "dead_letter_rate": round(statuses["dead_letter"] / enqueued, 4) if enqueued else 0.0,
+        "latency_ms": {stage: hist.summary() for stage, hist in overall.items()},
+        "per_type": {
+            job_type: {stage: hist.summary() for stage, hist in hists.items()}
+            for job_type, hists in sorted(per_type.items())
+        },
+    }
+
+
+def print_comparison(report: dict, baseline: dict) -> None:
+    def change(new, old) -> str:
+        if not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"\nvs {baseline.get('scenario')} @ {baseline.get('run_at')}")
+    old_tp, new_tp = baseline["throughput"], report["throughput"]
+    print(f"  sustained throughput  {new_tp['sustained_per_s']:>10} /s  "
+          f"{change(new_tp['sustained_per_s'], old_tp['sustained_per_s'])}")
+    for stage, summary in report["latency_ms"].items():
+        old = baseline["latency_ms"].get(stage, {})
+        for key in ("p50", "p99", "p999"):
+            if key in summary:
+                print(f"  {stage:<11} {key:<5}  {summary[key]:>10.1f} ms  "
+                      f"{change(summary[key], old.get(key))}")
+
+
+async def run_scenario(args) -> None:
+    scenario = load_scenario(args.scenario)
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        since = time.time()
+        results, elapsed = await run_arrivals(client, args.url, scenario)
+        job_ids = [result["id"] for result in results if "id" in result]
+        print(f"Arrivals done in {elapsed:.1f}s, following {len(job_ids)} jobs...")
+        final = await follow_jobs(client, args.url, job_ids, args.drain_timeout, since)
+
+    report = build_report(scenario, results, final, elapsed)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    e2e = report["latency_ms"]["end_to_end"]
+    print(
+        f"Sustained {report['throughput']['sustained_per_s']}/s, end-to-end "
+        f"p50 {e2e.get('p50', '-')} ms, p99 {e2e.get('p99', '-')} ms -> {args.report}"
+    )
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+
+
 async def main():
     parser = argparse.ArgumentParser(description="Job Flow load test")
     parser.add_argument(
@@ -112,8 +470,24 @@ async def main():
     parser.add_argument(
         "--poll", action="store_true", help="Poll metrics after enqueue"
     )
+    parser.add_argument(
+        "--scenario", help="Open-loop scenario file (see scripts/scenarios/)"
+    )
+    parser.add_argument(
+        "--report", default="load_report.json", help="Where --scenario writes its report"
+    )
+    parser.add_argument(
+        "--compare", help="Earlier --scenario report to compare against"
+    )
+    parser.add_argument(
+        "--drain-timeout", type=float, default=300, help="Seconds to wait for jobs to finish"
+    )
     args = parser.parse_args()
 
+    if args.scenario:
+        await run_scenario(args)
+        return
+
     print(f"Enqueuing {args.count} jobs to {args.url}...\n")
 
     stats = {"ok": 0, "fail": 0}
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Replay captured POST /jobs traffic against a test stack.
+
+Reads the files written by the API's traffic capture (TRAFFIC_CAPTURE_FILE,
+including its rotated ``.1``, ``.2``... backups) and re-issues the requests
+with their original spacing divided by ``--speed``, or back to back with
+``--speed max`` (bounded by ``--concurrency``). Arrivals are open-loop, as
+in load_test.py --scenario, and ``--report`` follows the jobs and writes
+the same JSON report. As with load_test.py, raise the API's RATE_LIMIT_MAX
+first: a 429 aborts the replay.
+
+Anonymized records are rebuilt from their payload shape: strings of the
+recorded length, zeros and falses, so payload sizes and structure match.
+Idempotency and dedupe keys are prefixed with a per-run id: repeats within
+the capture still collide as they did originally, but a second replay
+doesn't just get the first replay's jobs back. Cron templates are skipped
+(they would keep firing); delayed jobs keep their delay, scaled by speed.
+
+    python scripts/replay_traffic.py capture.jsonl --speed 10 --report replay.json
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from load_test import MAX_CONNECTIONS, build_report, check_rate_limited, follow_jobs, send_job
+
+
+def read_capture(path: str) -> list[dict]:
+    """Records from the capture file and its rotated backups, oldest first."""
+    records = []
+    for name in glob.glob(f"{glob.escape(path)}*"):
+        if name != path and not name[len(path) + 1:].isdigit():
+            continue
+        with open(name, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+
+def from_shape(shape):
+    if isinstance(shape, dict):
+        return {key: from_shape(value) for key, value in shape.items()}
+    if isinstance(shape, list):
+        return [from_shape(value) for value in shape]
+    if isinstance(shape, str) and shape.startswith("str:"):
+        return "x" * int(shape[4:])
+    return {"num": 0, "bool": False}.get(shape)
+
+
+def build_request(record: dict, run_id: str, speed: float | None) -> tuple[dict, dict]:
+    """(JSON body, headers) re-creating one captured request."""
+    payload = record["payload"] if "payload" in record else from_shape(record["payload_shape"])
+    body = {"type": record["type"], "payload": payload, "max_attempts": record["max_attempts"]}
+    if record.get("timeout_seconds") is not None:
+        body["timeout_seconds"] = record["timeout_seconds"]
+    if record.get("dedupe_key") is not None:
+        body["dedupe_key"] = f"{run_id}-{record['dedupe_key']}"
+    if record.get("run_in_s") is not None:
+        delay = record["run_in_s"] / speed if speed else 0.0
+        run_at = datetime.now(timezone.utc) + timedelta(seconds=max(0.0, delay))
+        body["run_at"] = run_at.isoformat()
+    headers = {}
+    if record.get("idempotency_key") is not None:
+        headers["Idempotency-Key"] = f"{run_id}-{record['idempotency_key']}"
+    return body, headers
+
+
+async def replay(client: httpx.AsyncClient, url: str, records: list[dict], speed: float | None,
+                 concurrency: int) -> tuple[list, float]:
+    run_id = f"replay-{uuid.uuid4().hex[:8]}"
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[dict] = []
+    tasks = []
+    checked = 0
+
+    async def send(body: dict, headers: dict, intended_at: float) -> None:
+        async with semaphore:
+            await send_job(client, url, body, intended_at, results, headers)
+
+    first_ts = records[0]["ts"] if records else 0.0
+    started = time.perf_counter()
+    for record in records:
+        if record.get("cron"):
+            continue
+        intended_at = started + (record["ts"] - first_ts) / speed if speed else time.perf_counter()
+        delay = intended_at - time.perf_counter()
+        # Always yield (even at --speed max) so sends run and their results
+        # reach the rate-limit check before the whole capture is queued
+        await asyncio.sleep(max(delay, 0))
+        checked = check_rate_limited(results, checked)
+        body, headers = build_request(record, run_id, speed)
+        tasks.append(asyncio.create_task(send(body, headers, intended_at)))
+    await asyncio.gather(*tasks)
+    check_rate_limited(results, checked)
+    return results, time.perf_counter() - started
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="capture file (rotated backups are read too)")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--speed", default="1", help="time compression: 1, 10, ... or 'max'")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONNECTIONS,
+                        help="max requests in flight")
+    parser.add_argument("--report", help="follow the jobs and write a JSON report here")
+    parser.add_argument("--drain-timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    records = read_capture(args.capture)
+    if not records:
+        raise SystemExit(f"No captured requests in {args.capture}*")
+    span = records[-1]["ts"] - records[0]["ts"]
+    print(f"Replaying {len(records)} requests captured over {span:.0f}s "
+          f"at {'max speed' if speed is None else f'{speed:g}x'}")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        since = time.time()
+        results, elapsed = await replay(client, args.url, records, speed, args.concurrency)
+        errors = sum(1 for result in results if "error" in result)
+        print(f"Sent {len(results)} requests in {elapsed:.1f}s "
+              f"({len(results) / elapsed if elapsed else 0:.1f}/s), {errors} errors")
+        if args.report:
+            job_ids = [result["id"] for result in results if "id" in result]
+            final = await follow_jobs(client, args.url, job_ids, args.drain_timeout, since)
+            label = "max" if speed is None else f"{speed:g}x"
+            report = build_report({"name": f"replay:{args.capture}@{label}"}, results, final, elapsed)
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write("\n")
+            print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
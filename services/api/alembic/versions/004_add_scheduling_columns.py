@@ -0,0 +1,27 @@
+"""add run_at and cron columns
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("run_at", sa.DateTime(), nullable=True))
+    op.add_column("jobs", sa.Column("cron", sa.String(255), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("jobs", "cron")
+    op.drop_column("jobs", "run_at")
@@ -0,0 +1,35 @@
+"""add dedupe_key column with active-job unique index
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("dedupe_key", sa.String(255), nullable=True))
+    op.create_index(
+        "ix_jobs_dedupe_key_active",
+        "jobs",
+        ["dedupe_key"],
+        unique=True,
+        postgresql_where=sa.text(
+            "dedupe_key IS NOT NULL AND status IN ('pending', 'processing', 'retrying')"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_dedupe_key_active", table_name="jobs")
+    op.drop_column("jobs", "dedupe_key")
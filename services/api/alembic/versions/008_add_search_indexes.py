@@ -0,0 +1,61 @@
+"""add indexes for job search filters
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY keeps the table writable while a large jobs table is
+    # indexed; it can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_jobs_status_created_at",
+            "jobs",
+            ["status", "created_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_jobs_type_status_created_at",
+            "jobs",
+            ["type", "status", "created_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_jobs_payload",
+            "jobs",
+            ["payload"],
+            postgresql_using="gin",
+            postgresql_ops={"payload": "jsonb_path_ops"},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_jobs_error_message_trgm",
+            "jobs",
+            ["error_message"],
+            postgresql_using="gin",
+            postgresql_ops={"error_message": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in (
+            "ix_jobs_error_message_trgm",
+            "ix_jobs_payload",
+            "ix_jobs_type_status_created_at",
+            "ix_jobs_status_created_at",
+        ):
+            op.drop_index(name, table_name="jobs", postgresql_concurrently=True)
@@ -0,0 +1,114 @@
+"""Job cancellation.
+
+Cancelling is one ``UPDATE`` that moves cancellable rows to "cancelled"
+and returns the status each had before, read under ``FOR UPDATE`` so a
+worker's claim can't slip in between. Afterwards:
+
+* queued jobs stay in ``job_queue`` (removing them is O(N)); the worker's
+  claim only matches pending/retrying rows, so they are skipped on claim
+* retries, delayed jobs and cron templates are removed from their ZSETs
+* jobs that were "processing" are announced on CANCEL_CHANNEL, and the
+  worker running one cancels its task, freeing the slot at once
+
+Bulk cancels run in batches of CANCEL_BATCH_SIZE that skip rows locked by
+an in-progress claim or status write; a final pass waits for those.
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
+
+from app import queue_stats
+from app.models import Job
+
+jobs = Job.__table__
+
+# Must match the worker's CANCEL_CHANNEL / RETRY_QUEUE_NAME / SCHEDULE_QUEUE_NAME
+CANCEL_CHANNEL = "job_cancel"
+RETRY_QUEUE_NAME = "retry_queue"
+SCHEDULE_QUEUE_NAME = "cron_schedule"
+
+CANCELLABLE = ("pending", "retrying", "processing", "scheduled")
+
+CANCEL_BATCH_SIZE = 1000
+
+# Job ids per CANCEL_CHANNEL message (comma-separated)
+ANNOUNCE_CHUNK = 200
+
+
+def _utcnow() -> datetime:
+    """Return a naive UTC datetime (matches TIMESTAMP WITHOUT TIME ZONE columns)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def cancel_statement(*conditions, limit: int | None = None, skip_locked: bool = False):
+    """UPDATE cancelling matching rows, returning each row plus its ``previous_status``."""
+    previous = (
+        select(jobs.c.id, jobs.c.status)
+        .where(jobs.c.status.in_(CANCELLABLE), *conditions)
+        .limit(limit)
+        .with_for_update(skip_locked=skip_locked)
+        .subquery()
+    )
+    return (
+        update(jobs)
+        .where(jobs.c.id == previous.c.id)
+        .values(status="cancelled", updated_at=_utcnow())
+        .returning(*jobs.c, previous.c.status.label("previous_status"))
+    )
+
+
+async def announce(redis, rows) -> int:
+    """Clear cancelled jobs out of the timer ZSETs and signal running ones.
+
+    Returns how many were running (announced to the workers).
+    """
+    if not rows:
+        return 0
+    ids = [str(row.id) for row in rows]
+    running = [str(row.id) for row in rows if row.previous_status == "processing"]
+    by_type: dict[str, list[str]] = {}
+    for row in rows:
+        by_type.setdefault(row.type, []).append(str(row.id))
+
+    pipe = redis.pipeline(transaction=False)
+    pipe.zrem(RETRY_QUEUE_NAME, *ids)
+    pipe.zrem(SCHEDULE_QUEUE_NAME, *ids)
+    for job_type, type_ids in by_type.items():
+        pipe.zrem(queue_stats.ready_key(job_type), *type_ids)
+    for i in range(0, len(running), ANNOUNCE_CHUNK):
+        pipe.publish(CANCEL_CHANNEL, ",".join(running[i : i + ANNOUNCE_CHUNK]))
+    await pipe.execute()
+    return len(running)
+
+
+def filter_conditions(filters) -> list:
+    conditions = []
+    if filters.type is not None:
+        conditions.append(jobs.c.type == filters.type)
+    if filters.status is not None:
+        conditions.append(jobs.c.status.in_([status.value for status in filters.status]))
+    if filters.created_after is not None:
+        conditions.append(jobs.c.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        conditions.append(jobs.c.created_at < filters.created_before)
+    return conditions
+
+
+async def cancel_matching(session, redis, filters) -> tuple[int, int]:
+    """Cancel every job matching ``filters``; returns (cancelled, were running)."""
+    conditions = filter_conditions(filters)
+    cancelled = running = 0
+    skip_locked = True
+    while True:
+        result = await session.execute(
+            cancel_statement(*conditions, limit=CANCEL_BATCH_SIZE, skip_locked=skip_locked)
+        )
+        rows = result.all()
+        await session.commit()
+        running += await announce(redis, rows)
+        cancelled += len(rows)
+        if len(rows) < CANCEL_BATCH_SIZE:
+            if not skip_locked:
+                return cancelled, running
+            skip_locked = False
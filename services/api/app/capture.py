@@ -0,0 +1,130 @@
+"""Opt-in capture of POST /jobs traffic for replay (scripts/replay_traffic.py).
+
+With TRAFFIC_CAPTURE_FILE set, every validated create request is appended
+as one JSON line to a size-rotated file (TRAFFIC_CAPTURE_MAX_BYTES, keeping
+TRAFFIC_CAPTURE_BACKUPS old files). The request handler only enqueues the
+record; a listener thread does the file I/O.
+
+By default records are anonymized: the payload is reduced to its shape
+(keys kept, values replaced by their type and size) and idempotency and
+dedupe keys by a short hash, so repeats are still visible without keeping
+customer data. TRAFFIC_CAPTURE_ANONYMIZE=false keeps them verbatim.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import time
+from datetime import timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from app.schemas import JobCreateRequest
+
+CAPTURE_FILE = os.getenv("TRAFFIC_CAPTURE_FILE")
+CAPTURE_ANONYMIZE = os.getenv("TRAFFIC_CAPTURE_ANONYMIZE", "true").lower() == "true"
+CAPTURE_MAX_BYTES = int(os.getenv("TRAFFIC_CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+CAPTURE_BACKUPS = int(os.getenv("TRAFFIC_CAPTURE_BACKUPS", "5"))
+
+# Records are dropped rather than queued without bound if the disk stalls
+CAPTURE_QUEUE_SIZE = 10000
+
+logger = logging.getLogger("app.capture")
+logger.propagate = False
+
+_listener: QueueListener | None = None
+
+
+def shape(value):
+    """Structure of a JSON value with the data itself replaced by type and size."""
+    if isinstance(value, dict):
+        return {key: shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [shape(item) for item in value]
+    if isinstance(value, str):
+        return f"str:{len(value)}"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "num"
+    return "null"
+
+
+def _digest(value: str | None) -> str | None:
+    if value is None:
+        return None
+    return hashlib.sha256(value.encode()).hexdigest()[:16]
+
+
+def capture_record(body: JobCreateRequest, idempotency_key: str | None, anonymize: bool) -> dict:
+    now = time.time()
+    payload_json = json.dumps(body.payload, separators=(",", ":"))
+    record = {
+        "ts": round(now, 6),
+        "type": body.type.value,
+        "payload_bytes": len(payload_json),
+        "max_attempts": body.max_attempts,
+        "timeout_seconds": body.timeout_seconds,
+        # Delay relative to arrival, so a replay can reproduce it
+        "run_in_s": (
+            round(body.run_at.replace(tzinfo=timezone.utc).timestamp() - now, 3)
+            if body.run_at is not None
+            else None
+        ),
+        "cron": body.cron is not None,
+    }
+    if anonymize:
+        record["payload_shape"] = shape(body.payload)
+        record["idempotency_key"] = _digest(idempotency_key)
+        record["dedupe_key"] = _digest(body.dedupe_key)
+    else:
+        record["payload"] = body.payload
+        record["idempotency_key"] = idempotency_key
+        record["dedupe_key"] = body.dedupe_key
+    return record
+
+
+def record_request(body: JobCreateRequest, idempotency_key: str | None) -> None:
+    """Capture one create request; a no-op unless capture is enabled."""
+    if _listener is None:
+        return
+    record = capture_record(body, idempotency_key, CAPTURE_ANONYMIZE)
+    logger.info(json.dumps(record, separators=(",", ":")))
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def init_capture(
+    path: str | None = CAPTURE_FILE,
+    max_bytes: int = CAPTURE_MAX_BYTES,
+    backups: int = CAPTURE_BACKUPS,
+) -> None:
+    global _listener
+    if not path:
+        return
+    file_handler = RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    queue_handler = _DroppingQueueHandler(queue.Queue(CAPTURE_QUEUE_SIZE))
+    logger.handlers[:] = [queue_handler]
+    logger.setLevel(logging.INFO)
+    _listener = QueueListener(queue_handler.queue, file_handler)
+    _listener.start()
+
+
+def close_capture() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        logger.handlers.clear()
@@ -0,0 +1,85 @@
+"""Minimal 5-field cron expressions (minute hour day-of-month month day-of-week).
+
+Supports ``*``, lists (``1,15``), ranges (``1-5``) and steps (``*/10``,
+``0-30/5``). Day-of-week is 0-6 with 0 = Sunday (7 is accepted as Sunday).
+All times are naive UTC. Kept in sync with services/worker/app/cron.py.
+"""
+
+from datetime import datetime, timedelta
+
+_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 7),
+)
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_field(spec: str, name: str, low: int, high: int) -> frozenset[int]:
+    values: set[int] = set()
+    for part in spec.split(","):
+        range_spec, _, step_spec = part.partition("/")
+        step = 1
+        if step_spec:
+            if not step_spec.isdigit() or int(step_spec) == 0:
+                raise CronError(f"Invalid step in {name} field: '{part}'")
+            step = int(step_spec)
+
+        if range_spec == "*":
+            start, end = low, high
+        else:
+            start_spec, _, end_spec = range_spec.partition("-")
+            if not start_spec.isdigit() or (end_spec and not end_spec.isdigit()):
+                raise CronError(f"Invalid {name} field: '{part}'")
+            start = int(start_spec)
+            end = int(end_spec) if end_spec else (high if step_spec else start)
+
+        if not low <= start <= end <= high:
+            raise CronError(f"{name.capitalize()} out of range {low}-{high}: '{part}'")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise CronError(f"Cron expression needs 5 fields, got {len(parts)}: '{expression}'")
+        self.expression = expression
+        fields = [_parse_field(p, *f) for p, f in zip(parts, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, dow = fields
+        self.weekdays = frozenset(d % 7 for d in dow)
+        # Vixie cron semantics: when both day fields are restricted, a day
+        # matches if either one does.
+        self._dom_any = parts[2].startswith("*")
+        self._dow_any = parts[4].startswith("*")
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom_ok = dt.day in self.days
+        dow_ok = (dt.isoweekday() % 7) in self.weekdays
+        if self._dom_any or self._dow_any:
+            return dom_ok and dow_ok
+        return dom_ok or dow_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """First firing time strictly after ``after``."""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        # Jump whole months/days/hours at a time so sparse schedules stay cheap
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise CronError(f"Cron expression never fires: '{self.expression}'")
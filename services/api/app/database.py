@@ -1,5 +1,7 @@
 import os
+import time
 
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -10,18 +12,41 @@ from sqlalchemy.ext.asyncio import (
 engine: AsyncEngine | None = None
 async_session_factory: async_sessionmaker[AsyncSession] | None = None
 
+# Optional streaming replica for read-only routes (DATABASE_REPLICA_URL)
+replica_engine: AsyncEngine | None = None
+replica_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+# Reads from a client within this many seconds of its last write go to the
+# primary, so it sees its own writes despite replication lag
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# Server time of the client's last write, set on write responses by
+# ReadYourWritesMiddleware and sent back as a header or cookie
+LAST_WRITE_HEADER = "X-Last-Write"
+LAST_WRITE_COOKIE = "last_write"
+
 
 def init_db() -> None:
-    global engine, async_session_factory
+    global engine, async_session_factory, replica_engine, replica_session_factory
     url = os.environ["DATABASE_URL"]
     engine = create_async_engine(url, echo=False)
     async_session_factory = async_sessionmaker(
         engine, class_=AsyncSession, expire_on_commit=False
     )
+    replica_url = os.getenv("DATABASE_REPLICA_URL")
+    if replica_url:
+        replica_engine = create_async_engine(replica_url, echo=False)
+        replica_session_factory = async_sessionmaker(
+            replica_engine, class_=AsyncSession, expire_on_commit=False
+        )
 
 
 async def close_db() -> None:
-    global engine
+    global engine, replica_engine, replica_session_factory
+    if replica_engine:
+        await replica_engine.dispose()
+        replica_engine = None
+        replica_session_factory = None
     if engine:
         await engine.dispose()
         engine = None
@@ -30,3 +55,28 @@ async def close_db() -> None:
 async def get_session():
     async with async_session_factory() as session:
         yield session
+
+
+def wrote_recently(request: Request) -> bool:
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        last_write = float(value)
+    except (TypeError, ValueError):
+        return False
+    return time.time() - last_write < REPLICA_STICKY_SECONDS
+
+
+async def get_read_session(request: Request, primary: AsyncSession = Depends(get_session)):
+    """Session for read-only routes: the replica if configured, else the primary.
+
+    Clients that wrote within REPLICA_STICKY_SECONDS stay on the primary.
+    ``request.state.read_replica`` tells the route which one it got. The
+    primary session only checks out a connection if it is used.
+    """
+    request.state.read_replica = False
+    if replica_session_factory is None or wrote_recently(request):
+        yield primary
+        return
+    request.state.read_replica = True
+    async with replica_session_factory() as session:
+        yield session
@@ -0,0 +1,325 @@
+"""Bulk requeue and purge of dead-lettered jobs.
+
+An operation selects ``dead_letter`` jobs by type, error message prefix and
+the time they were dead-lettered (``updated_at``), then works through them
+in batches of DLQ_BATCH_SIZE, oldest first, with a keyset cursor on
+``(updated_at, id)``. Each batch locks its rows (``FOR UPDATE SKIP
+LOCKED``), requeues or deletes them with one ``UPDATE``/``DELETE ...
+RETURNING``, pushes requeued jobs in one pipelined round trip and removes
+the ids from ``dead_letter_queue`` with one script call. Batches follow
+the order workers appended the jobs, so the script finds them near the
+head of the list.
+
+Requeues are paced to at most DLQ_REQUEUE_RATE jobs/s (a request may ask
+for less) so a large DLQ doesn't land on the workers at once. Progress is
+kept in a Redis hash (``dlq_operation:<id>``) so any API replica can report
+it, and expires DLQ_OPERATION_TTL seconds after the last update.
+
+Jobs whose dedupe_key is held by an active job are left in the DLQ and
+counted as skipped. When several selected dead jobs share a dedupe_key,
+the first one reached (the earliest dead-lettered) is requeued; it then
+holds the key, so the others are skipped, whichever batch they fall in. Rows locked or
+changed by someone else while the operation runs are neither processed nor
+skipped.
+
+The API process that started an operation refreshes ``heartbeat_at`` with
+every batch. If it dies, the operation is reported as failed once the
+heartbeat is DLQ_OPERATION_STALE seconds old.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, exists, func, select, tuple_, update
+from sqlalchemy.orm import aliased
+
+from app import database as db
+from app import queue_stats
+from app.models import Job
+from app.queue_message import encode_job
+
+DLQ_NAME = "dead_letter_queue"  # Must match the worker's DLQ_NAME
+QUEUE_NAME = "job_queue"
+
+DLQ_BATCH_SIZE = int(os.getenv("DLQ_BATCH_SIZE", "500"))
+DLQ_REQUEUE_RATE = float(os.getenv("DLQ_REQUEUE_RATE", "200"))
+DLQ_OPERATION_TTL = int(os.getenv("DLQ_OPERATION_TTL", "86400"))
+DLQ_OPERATION_STALE = float(os.getenv("DLQ_OPERATION_STALE", "60"))
+
+OPERATION_PREFIX = "dlq_operation"
+
+# Identifies the API process running an operation
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Remove the given ids from a list in one pass: scan from the head until all
+# are found, overwrite each with a tombstone, then drop the tombstones. The
+# ids sit near the head (oldest first), so the scan usually stops early.
+REMOVE_IDS_SCRIPT = """
+local wanted, remaining = {}, 0
+for _, id in ipairs(ARGV) do
+    if not wanted[id] then
+        wanted[id] = true
+        remaining = remaining + 1
+    end
+end
+local tombstone = '__dlq_removed__'
+local removed, offset = 0, 0
+while remaining > 0 do
+    local chunk = redis.call('LRANGE', KEYS[1], offset, offset + 999)
+    if #chunk == 0 then
+        break
+    end
+    for i, member in ipairs(chunk) do
+        if wanted[member] then
+            wanted[member] = nil
+            remaining = remaining - 1
+            removed = removed + 1
+            redis.call('LSET', KEYS[1], offset + i - 1, tombstone)
+        end
+    end
+    offset = offset + #chunk
+end
+if removed > 0 then
+    redis.call('LREM', KEYS[1], removed, tombstone)
+end
+return removed
+"""
+
+ACTIVE_STATUSES = ("pending", "processing", "retrying")
+
+logger = logging.getLogger(__name__)
+
+# Strong references to running operations (the event loop only keeps weak ones)
+_tasks: set[asyncio.Task] = set()
+
+
+def _utcnow() -> datetime:
+    """Return a naive UTC datetime (matches TIMESTAMP WITHOUT TIME ZONE columns)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def operation_key(operation_id: str) -> str:
+    return f"{OPERATION_PREFIX}:{operation_id}"
+
+
+def _conditions(filters) -> list:
+    conditions = [Job.status == "dead_letter"]
+    if filters.type is not None:
+        conditions.append(Job.type == filters.type)
+    if filters.error_prefix is not None:
+        conditions.append(Job.error_message.startswith(filters.error_prefix, autoescape=True))
+    if filters.failed_after is not None:
+        conditions.append(Job.updated_at >= filters.failed_after)
+    if filters.failed_before is not None:
+        conditions.append(Job.updated_at < filters.failed_before)
+    return conditions
+
+
+def _requeueable():
+    # Requeuing would break the unique index on active dedupe keys
+    other = aliased(Job)
+    return Job.dedupe_key.is_(None) | ~exists().where(
+        other.dedupe_key == Job.dedupe_key, other.status.in_(ACTIVE_STATUSES)
+    )
+
+
+def _to_apply(action: str, selected) -> list:
+    """Ids from a locked batch to requeue or purge.
+
+    Only one of the batch's rows per dedupe_key is requeued (the first, in
+    cursor order): requeuing two would break the unique index.
+    """
+    if action == "purge":
+        return [row.id for row in selected]
+    ids, keys = [], set()
+    for row in selected:
+        if not row.requeueable or (row.dedupe_key is not None and row.dedupe_key in keys):
+            continue
+        keys.add(row.dedupe_key)
+        ids.append(row.id)
+    return ids
+
+
+def _select_batch(filters, action: str, size: int, after: tuple | None):
+    """Lock the next ``size`` matching rows after the ``(updated_at, id)`` cursor."""
+    columns = [Job.id, Job.updated_at]
+    if action == "requeue":
+        columns += [Job.dedupe_key, _requeueable().label("requeueable")]
+    query = select(*columns).where(*_conditions(filters))
+    if after is not None:
+        query = query.where(tuple_(Job.updated_at, Job.id) > tuple_(*after))
+    return (
+        query.order_by(Job.updated_at, Job.id)
+        .limit(size)
+        .with_for_update(skip_locked=True, of=Job)
+    )
+
+
+def _apply(action: str, ids: list):
+    if action == "purge":
+        return delete(Job).where(Job.id.in_(ids)).returning(Job.id)
+    return (
+        update(Job)
+        # Checked again under the lock: an active job may have taken the key
+        .where(Job.id.in_(ids), _requeueable())
+        .values(
+            status="pending",
+            error_message=None,
+            attempts=0,
+            # Requeued jobs start without a trace, like manual retries start a new one
+            traceparent=None,
+            updated_at=_utcnow(),
+        )
+        .returning(Job.id, Job.type, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def count_matching(session, filters) -> int:
+    result = await session.execute(
+        select(func.count()).select_from(Job).where(*_conditions(filters))
+    )
+    return result.scalar_one()
+
+
+async def start_operation(
+    redis, action: str, filters, matched: int, rate: float | None = None
+) -> dict:
+    """Record a new operation over ``matched`` jobs and run it in the background."""
+    operation = {
+        "id": str(uuid.uuid4()),
+        "action": action,
+        "status": "running",
+        "matched": matched,
+        "processed": 0,
+        "skipped": 0,
+        "rate": min(rate, DLQ_REQUEUE_RATE) if rate else DLQ_REQUEUE_RATE,
+        "started_at": time.time(),
+        "finished_at": None,
+        "error": None,
+        "owner": OWNER,
+        "heartbeat_at": time.time(),
+    }
+    if action == "purge":
+        operation["rate"] = None  # Nothing reaches the workers
+    await _save(redis, operation)
+
+    task = asyncio.create_task(run_operation(redis, operation, filters))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return operation
+
+
+async def run_operation(redis, operation: dict, filters) -> dict:
+    action, rate = operation["action"], operation["rate"]
+    size = DLQ_BATCH_SIZE if rate is None else max(1, min(DLQ_BATCH_SIZE, int(rate)))
+    remove_ids = redis.register_script(REMOVE_IDS_SCRIPT)
+    started = time.monotonic()
+    after = None
+    try:
+        while True:
+            async with db.async_session_factory() as session:
+                result = await session.execute(_select_batch(filters, action, size, after))
+                selected = result.all()
+                ids = _to_apply(action, selected)
+                rows = []
+                if ids:
+                    rows = (await session.execute(_apply(action, ids))).all()
+                await session.commit()
+
+            if rows:
+                if action == "requeue":
+                    pipe = redis.pipeline(transaction=False)
+                    now = time.time()
+                    for row in rows:
+                        pipe.rpush(QUEUE_NAME, encode_job(row))
+                        queue_stats.mark_ready(pipe, row.type, str(row.id), now)
+                    await pipe.execute()
+                await remove_ids(keys=[DLQ_NAME], args=[str(row.id) for row in rows])
+
+            operation["processed"] += len(rows)
+            operation["skipped"] += len(selected) - len(rows)
+            await _save(redis, operation)
+            if len(selected) < size:
+                break
+            after = (selected[-1].updated_at, selected[-1].id)
+
+            if rate is not None:
+                # Pace to the requested rate over the whole operation
+                ahead = operation["processed"] / rate - (time.monotonic() - started)
+                await asyncio.sleep(max(0.0, ahead))
+            else:
+                await asyncio.sleep(0)
+
+        operation["status"] = "completed"
+    except asyncio.CancelledError:
+        operation["status"] = "cancelled"
+        raise
+    except Exception as exc:
+        logger.error("Dead-letter %s %s failed: %s", action, operation["id"], exc, exc_info=True)
+        operation["status"] = "failed"
+        operation["error"] = str(exc)
+    finally:
+        operation["finished_at"] = time.time()
+        try:
+            await _save(redis, operation)
+        except Exception as exc:
+            logger.error("Failed to record dead-letter operation %s: %s", operation["id"], exc)
+        logger.info(
+            "Dead-letter %s %s %s: %d processed, %d skipped",
+            action,
+            operation["id"],
+            operation["status"],
+            operation["processed"],
+            operation["skipped"],
+        )
+    return operation
+
+
+async def _save(redis, operation: dict) -> None:
+    operation["heartbeat_at"] = time.time()
+    key = operation_key(operation["id"])
+    pipe = redis.pipeline(transaction=False)
+    pipe.hset(key, mapping={k: "" if v is None else str(v) for k, v in operation.items()})
+    pipe.expire(key, DLQ_OPERATION_TTL)
+    await pipe.execute()
+
+
+async def get_operation(redis, operation_id: str) -> dict | None:
+    fields = await redis.hgetall(operation_key(operation_id))
+    if not fields:
+        return None
+    operation = {k: (v if v != "" else None) for k, v in fields.items()}
+    for name in ("matched", "processed", "skipped"):
+        operation[name] = int(operation[name])
+    for name in ("rate", "started_at", "finished_at", "heartbeat_at"):
+        if operation.get(name) is not None:
+            operation[name] = float(operation[name])
+
+    heartbeat_at = operation.get("heartbeat_at") or operation["started_at"]
+    if operation["status"] == "running" and time.time() - heartbeat_at > DLQ_OPERATION_STALE:
+        # The process running it died (or lost Redis) mid-operation
+        operation["status"] = "failed"
+        operation["error"] = f"Stopped reporting progress (owner {operation.get('owner')})"
+        operation["finished_at"] = heartbeat_at
+        await redis.hset(
+            operation_key(operation_id),
+            mapping={
+                "status": "failed",
+                "error": operation["error"],
+                "finished_at": str(heartbeat_at),
+            },
+        )
+    return operation
+
+
+async def cancel_operations() -> None:
+    """Stop running operations on shutdown; each records itself as cancelled."""
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
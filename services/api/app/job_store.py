@@ -0,0 +1,56 @@
+"""Core statements for the API's per-request hot paths (create, get by id).
+
+Rows come back as plain ``Row`` tuples, which ``JobResponse`` and
+``encode_job`` read by attribute, so these paths skip the ORM identity map,
+unit-of-work flush and the post-commit refresh SELECT. The statements are
+built once at import so SQLAlchemy's compiled cache and asyncpg's prepared
+statement cache are hit on every call. Mirrors services/worker/app/job_store.py.
+"""
+
+import uuid
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import Job
+
+jobs = Job.__table__
+
+GET_JOB = select(jobs).where(jobs.c.id == bindparam("job_id"))
+
+GET_JOB_BY_IDEMPOTENCY_KEY = select(jobs).where(
+    jobs.c.idempotency_key == bindparam("idempotency_key")
+)
+
+GET_ACTIVE_JOB_BY_DEDUPE_KEY = select(jobs).where(
+    jobs.c.dedupe_key == bindparam("dedupe_key"),
+    jobs.c.status.in_(("pending", "processing", "retrying")),
+)
+
+# INSERT ... RETURNING replaces add() + commit() + refresh(). A job already
+# holding the same idempotency key, or an active one with the same dedupe
+# key, makes it return no row instead of raising IntegrityError.
+INSERT_JOB = insert(jobs).on_conflict_do_nothing().returning(*jobs.c)
+
+
+async def get_job(session, job_id: uuid.UUID):
+    result = await session.execute(GET_JOB, {"job_id": job_id})
+    return result.one_or_none()
+
+
+async def get_job_by_idempotency_key(session, idempotency_key: str):
+    result = await session.execute(
+        GET_JOB_BY_IDEMPOTENCY_KEY, {"idempotency_key": idempotency_key}
+    )
+    return result.one_or_none()
+
+
+async def get_active_job_by_dedupe_key(session, dedupe_key: str):
+    result = await session.execute(GET_ACTIVE_JOB_BY_DEDUPE_KEY, {"dedupe_key": dedupe_key})
+    return result.one_or_none()
+
+
+async def insert_job(session, **values):
+    """Insert a job; returns the new row, or None if its idempotency or dedupe key is taken."""
+    result = await session.execute(INSERT_JOB, values)
+    return result.one_or_none()
@@ -5,11 +5,15 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import close_db, init_db
+from app.capture import close_capture, init_capture
+from app.database import LAST_WRITE_HEADER, close_db, init_db
+from app.dead_letter import cancel_operations
 from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
 from app.redis_client import close_redis, init_redis
 from app.routes.jobs import router as jobs_router
 from app.routes.metrics import router as metrics_router
+from app.tracing import close_tracing, init_tracing
 
 
 @asynccontextmanager
@@ -25,7 +29,18 @@ async def lifespan(app: FastAPI):
 
     init_db()
     init_redis()
+    init_tracing(
+        "job-flow-api",
+        float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+        os.getenv("TRACE_EXPORT_FILE"),
+        os.getenv("TRACE_EXPORT_URL"),
+        float(os.getenv("TRACE_EXPORT_INTERVAL", "2.0")),
+    )
+    init_capture()
     yield
+    close_capture()
+    await cancel_operations()
+    await close_tracing()
     await close_db()
     await close_redis()
 
@@ -38,8 +53,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
 app.add_middleware(RateLimitMiddleware, max_requests=60, window_seconds=60)
+app.add_middleware(ReadYourWritesMiddleware)
 app.include_router(jobs_router)
 app.include_router(metrics_router)
 
@@ -0,0 +1,31 @@
+import math
+import time
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app import database
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """Stamp successful writes so the client's next reads skip the replica."""
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        response = await call_next(request)
+        if (
+            database.replica_session_factory is None
+            or request.method in ("GET", "HEAD", "OPTIONS")
+            or response.status_code >= 400
+        ):
+            return response
+
+        stamp = f"{time.time():.3f}"
+        response.headers[database.LAST_WRITE_HEADER] = stamp
+        response.set_cookie(
+            database.LAST_WRITE_COOKIE,
+            stamp,
+            max_age=math.ceil(database.REPLICA_STICKY_SECONDS),
+            httponly=True,
+            samesite="lax",
+        )
+        return response
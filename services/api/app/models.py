@@ -25,6 +25,16 @@ class Job(Base):
     max_attempts: Mapped[int] = mapped_column(nullable=False, default=3)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
     idempotency_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # Coalesces duplicate work: unique among pending/processing/retrying jobs
+    dedupe_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    timeout_seconds: Mapped[int | None] = mapped_column(nullable=True)
+    # Delayed jobs: earliest start time. Cron templates: next firing time.
+    run_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    cron: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # W3C traceparent of the span that enqueued the job (sampled traces only)
+    traceparent: Mapped[str | None] = mapped_column(String(55), nullable=True)
+    # When the current (or last) attempt was claimed by a worker
+    started_at: Mapped[datetime | None] = mapped_column(nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         nullable=False,
         server_default=text("now()"),
@@ -38,10 +48,35 @@ class Job(Base):
     __table_args__ = (
         Index("ix_jobs_status", "status"),
         Index("ix_jobs_created_at", "created_at"),
+        # Dashboard filters: status tab / type + status, newest first
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        Index("ix_jobs_type_status_created_at", "type", "status", "created_at"),
+        # payload @> '{...}' containment searches
+        Index(
+            "ix_jobs_payload",
+            "payload",
+            postgresql_using="gin",
+            postgresql_ops={"payload": "jsonb_path_ops"},
+        ),
+        # error_message ILIKE '%...%' (needs the pg_trgm extension)
+        Index(
+            "ix_jobs_error_message_trgm",
+            "error_message",
+            postgresql_using="gin",
+            postgresql_ops={"error_message": "gin_trgm_ops"},
+        ),
         Index(
             "ix_jobs_idempotency_key",
             "idempotency_key",
             unique=True,
             postgresql_where=text("idempotency_key IS NOT NULL"),
         ),
+        Index(
+            "ix_jobs_dedupe_key_active",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text(
+                "dedupe_key IS NOT NULL AND status IN ('pending', 'processing', 'retrying')"
+            ),
+        ),
     )
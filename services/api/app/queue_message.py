@@ -0,0 +1,40 @@
+"""Queue message encoding. Kept in sync with services/worker/app/queue_message.py.
+
+A queue entry is either a bare job UUID (the original format) or, with
+QUEUE_MESSAGE_FORMAT=fat, a compact JSON object carrying what the worker
+needs to run the job without reading the row first:
+
+    {"v": 1, "id": "...", "type": "...", "attempts": 0, "max_attempts": 3, "payload": {...}}
+
+JSON rather than a binary format because both services talk to Redis with
+decode_responses=True. Messages over FAT_MESSAGE_MAX_BYTES fall back to the
+bare id, and the worker loads the payload from Postgres as before.
+"""
+
+import json
+import os
+
+from app.models import Job
+
+MESSAGE_VERSION = 1
+
+QUEUE_MESSAGE_FORMAT = os.getenv("QUEUE_MESSAGE_FORMAT", "id")
+FAT_MESSAGE_MAX_BYTES = int(os.getenv("FAT_MESSAGE_MAX_BYTES", "16384"))
+
+
+def encode_job(job: Job) -> str:
+    if QUEUE_MESSAGE_FORMAT == "fat":
+        message = json.dumps(
+            {
+                "v": MESSAGE_VERSION,
+                "id": str(job.id),
+                "type": job.type,
+                "attempts": job.attempts,
+                "max_attempts": job.max_attempts,
+                "payload": job.payload,
+            },
+            separators=(",", ":"),
+        )
+        if len(message) <= FAT_MESSAGE_MAX_BYTES:
+            return message
+    return str(job.id)
@@ -0,0 +1,64 @@
+"""Queue lag signals for /metrics. Kept in sync with services/worker/app/queue_stats.py.
+
+Producers record, next to every queue entry, when the job became runnable
+in a per-type ZSET (``queue_ready:<type>``, job id -> timestamp); the worker
+removes it when the job starts. Workers count jobs run per 10s bucket
+(``processed:<type>:<bucket>``). Reading both for every type is one
+pipelined round trip of O(log N) commands, cheap enough to scrape every
+few seconds:
+
+* waiting      = entries already runnable (ZCOUNT -inf..now)
+* oldest age   = now - lowest score (ZRANGE 0 0)
+* rate         = jobs run over the last RATE_WINDOW_BUCKETS buckets
+* drain time   = waiting / rate (None when nothing has run recently)
+"""
+
+import time
+
+READY_PREFIX = "queue_ready"
+PROCESSED_PREFIX = "processed"
+PROCESSED_BUCKET_SECONDS = 10
+RATE_WINDOW_BUCKETS = 6
+
+
+def ready_key(job_type: str) -> str:
+    return f"{READY_PREFIX}:{job_type}"
+
+
+def mark_ready(pipe, job_type: str, job_id: str, ready_at: float) -> None:
+    """Queue a ZADD on ``pipe`` recording when a job becomes runnable."""
+    pipe.zadd(ready_key(job_type), {job_id: ready_at})
+
+
+async def read_queue_stats(redis, job_types: list[str]) -> dict[str, dict]:
+    now = time.time()
+    # Skip the bucket in progress: it would understate the rate
+    current = int(now // PROCESSED_BUCKET_SECONDS)
+    buckets = range(current - RATE_WINDOW_BUCKETS, current)
+
+    pipe = redis.pipeline(transaction=False)
+    for job_type in job_types:
+        pipe.zcount(ready_key(job_type), "-inf", now)
+        pipe.zrange(ready_key(job_type), 0, 0, withscores=True)
+        pipe.mget([f"{PROCESSED_PREFIX}:{job_type}:{bucket}" for bucket in buckets])
+    results = await pipe.execute()
+
+    stats = {}
+    for i, job_type in enumerate(job_types):
+        waiting, head, counts = results[3 * i : 3 * i + 3]
+        processed = sum(int(count) for count in counts if count is not None)
+        rate = processed / (RATE_WINDOW_BUCKETS * PROCESSED_BUCKET_SECONDS)
+        oldest_age = max(0.0, now - head[0][1]) if head else 0.0
+        stats[job_type] = {
+            "waiting": waiting,
+            "oldest_age_seconds": round(oldest_age, 3),
+            "processed_per_second": round(rate, 3),
+            "drain_time_seconds": _drain_time(waiting, rate),
+        }
+    return stats
+
+
+def _drain_time(waiting: int, rate: float) -> float | None:
+    if waiting == 0:
+        return 0.0
+    return round(waiting / rate, 1) if rate > 0 else None
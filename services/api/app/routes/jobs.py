@@ -1,18 +1,79 @@
+import hashlib
+import json
+import os
+import time
 import uuid
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 from redis.asyncio import Redis
 from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_session
+from app import cancellation, capture, dead_letter, job_store, queue_stats, tracing
+from app.cron import CronSchedule
+from app.database import get_read_session, get_session
 from app.models import Job
+from app.queue_message import encode_job
 from app.redis_client import get_redis
-from app.schemas import JobCreateRequest, JobListResponse, JobResponse
+from app.schemas import (
+    CancelJobsRequest,
+    CancelJobsResponse,
+    DeadLetterFilter,
+    DeadLetterOperation,
+    DeadLetterRequeueRequest,
+    JobCreateRequest,
+    JobListResponse,
+    JobResponse,
+)
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+# Must match the worker's RETRY_QUEUE_NAME / SCHEDULE_QUEUE_NAME / RETRY_WAKE_CHANNEL
+RETRY_QUEUE_NAME = "retry_queue"
+SCHEDULE_QUEUE_NAME = "cron_schedule"
+RETRY_WAKE_CHANNEL = "retry_queue:wake"
+
+# Job types whose requests are coalesced by payload even without a dedupe_key
+AUTO_DEDUPE_TYPES = {t for t in os.getenv("AUTO_DEDUPE_TYPES", "").split(",") if t}
+
+# Attempts at inserting before giving up when the conflicting job keeps
+# finishing between our INSERT and the lookup of it
+DEDUPE_INSERT_ATTEMPTS = 3
+
+
+def _utcnow() -> datetime:
+    """Return a naive UTC datetime (matches TIMESTAMP WITHOUT TIME ZONE columns)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _timestamp(value: datetime) -> float:
+    """Unix timestamp of a naive UTC datetime, used as a Redis ZSET score."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def _enqueue(redis: Redis, job, from_dlq: bool = False) -> None:
+    """Push a job onto the main queue and record when it became runnable."""
+    pipe = redis.pipeline(transaction=False)
+    pipe.rpush("job_queue", encode_job(job))
+    queue_stats.mark_ready(pipe, job.type, str(job.id), time.time())
+    if from_dlq:
+        pipe.lrem(dead_letter.DLQ_NAME, 1, str(job.id))
+    await pipe.execute()
+
+
+def _dedupe_key(body: JobCreateRequest) -> str | None:
+    """Explicit dedupe_key, else a payload hash for AUTO_DEDUPE_TYPES."""
+    if body.dedupe_key is not None:
+        return body.dedupe_key
+    if body.cron is None and body.type.value in AUTO_DEDUPE_TYPES:
+        canonical = json.dumps(
+            [body.type.value, body.payload], sort_keys=True, separators=(",", ":")
+        )
+        return "auto:" + hashlib.sha256(canonical.encode()).hexdigest()
+    return None
+
 
 @router.post("", response_model=JobResponse)
 async def create_job(
@@ -22,38 +83,76 @@ async def create_job(
     session: AsyncSession = Depends(get_session),
     redis: Redis = Depends(get_redis),
 ):
+    capture.record_request(body, idempotency_key)
+
     # If idempotency key provided, check for existing job
     if idempotency_key is not None:
-        result = await session.execute(
-            select(Job).where(Job.idempotency_key == idempotency_key)
-        )
-        existing_job = result.scalar_one_or_none()
+        existing_job = await job_store.get_job_by_idempotency_key(session, idempotency_key)
         if existing_job is not None:
             response.status_code = 200
             return existing_job
 
-    job = Job(
-        type=body.type.value,
-        payload=body.payload,
-        max_attempts=body.max_attempts,
-        idempotency_key=idempotency_key,
-    )
-    session.add(job)
-
-    try:
-        await session.commit()
-    except IntegrityError:
-        # Race condition: another request with the same key committed first
-        await session.rollback()
-        result = await session.execute(
-            select(Job).where(Job.idempotency_key == idempotency_key)
-        )
-        existing_job = result.scalar_one()
-        response.status_code = 200
-        return existing_job
+    with tracing.span("job.create", root=True, job_type=body.type.value) as create_span:
+        values = {
+            "type": body.type.value,
+            "payload": body.payload,
+            "max_attempts": body.max_attempts,
+            "idempotency_key": idempotency_key,
+            "dedupe_key": _dedupe_key(body),
+            "timeout_seconds": body.timeout_seconds,
+            "run_at": body.run_at,
+            "cron": body.cron,
+            # Stored on the row so the worker continues this trace
+            "traceparent": create_span.traceparent,
+        }
+        if body.cron is not None:
+            # Recurring template: never executed itself; the worker's scheduler
+            # materializes one job per firing.
+            values["status"] = "scheduled"
+            values["run_at"] = CronSchedule(body.cron).next_after(_utcnow())
+
+        with tracing.span("db.insert_job"):
+            for _ in range(DEDUPE_INSERT_ATTEMPTS):
+                job = await job_store.insert_job(session, **values)
+                if job is not None:
+                    break
+                # Conflict: another request with the same idempotency key committed
+                # first, or an identical job is still pending/processing/retrying
+                existing_job = None
+                if idempotency_key is not None:
+                    existing_job = await job_store.get_job_by_idempotency_key(
+                        session, idempotency_key
+                    )
+                if existing_job is None and values["dedupe_key"] is not None:
+                    existing_job = await job_store.get_active_job_by_dedupe_key(
+                        session, values["dedupe_key"]
+                    )
+                if existing_job is not None:
+                    response.status_code = 200
+                    return existing_job
+                # The duplicate finished in between: try inserting again
+            else:
+                raise HTTPException(
+                    status_code=409, detail="Conflicting job changed state, retry the request"
+                )
+            await session.commit()
 
-    await session.refresh(job)
-    await redis.rpush("job_queue", str(job.id))
+        create_span.set_attribute("job_id", str(job.id))
+        with tracing.span("redis.enqueue"):
+            if job.cron is not None:
+                score = _timestamp(job.run_at)
+                await redis.zadd(SCHEDULE_QUEUE_NAME, {str(job.id): score})
+                await redis.publish(RETRY_WAKE_CHANNEL, score)
+            elif job.run_at is not None and job.run_at > _utcnow():
+                # Delayed jobs share the retry ZSET; the worker promotes them when due
+                score = _timestamp(job.run_at)
+                pipe = redis.pipeline(transaction=False)
+                pipe.zadd(RETRY_QUEUE_NAME, {str(job.id): score})
+                queue_stats.mark_ready(pipe, job.type, str(job.id), score)
+                pipe.publish(RETRY_WAKE_CHANNEL, score)
+                await pipe.execute()
+            else:
+                await _enqueue(redis, job)
 
     response.status_code = 201
     return job
@@ -75,46 +174,170 @@ async def retry_job(
             detail="Job can only be retried when failed or dead_letter",
         )
 
-    job.status = "pending"
-    job.error_message = None
-    job.attempts = 0
+    from_dlq = job.status == "dead_letter"
+    with tracing.span("job.retry", root=True, job_id=str(job_id), job_type=job.type) as retry_span:
+        job.status = "pending"
+        job.error_message = None
+        job.attempts = 0
+        # Manual retries start a new trace rather than extending the failed one
+        job.traceparent = retry_span.traceparent
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Its dedupe_key is held by another active job
+            await session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="An identical job is already pending or processing",
+            )
+        await session.refresh(job)
+        await _enqueue(redis, job, from_dlq)
+    return job
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: uuid.UUID,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+):
+    result = await session.execute(cancellation.cancel_statement(Job.id == job_id))
+    job = result.one_or_none()
     await session.commit()
-    await session.refresh(job)
-    await redis.rpush("job_queue", str(job.id))
+    if job is None:
+        if await job_store.get_job(session, job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(
+            status_code=409,
+            detail="Job can only be cancelled when pending, retrying, processing or scheduled",
+        )
+    await cancellation.announce(redis, [job])
     return job
 
 
+@router.post("/cancel", response_model=CancelJobsResponse)
+async def cancel_jobs(
+    body: CancelJobsRequest,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+):
+    """Cancel every cancellable job matching the filters."""
+    cancelled, running = await cancellation.cancel_matching(session, redis, body)
+    return CancelJobsResponse(cancelled=cancelled, running=running)
+
+
+@router.post("/dead-letter/requeue", response_model=DeadLetterOperation, status_code=202)
+async def requeue_dead_letters(
+    body: DeadLetterRequeueRequest,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+):
+    """Put matching dead-lettered jobs back on the queue, paced, in the background."""
+    matched = await dead_letter.count_matching(session, body)
+    return await dead_letter.start_operation(redis, "requeue", body, matched, body.rate)
+
+
+@router.post("/dead-letter/purge", response_model=DeadLetterOperation, status_code=202)
+async def purge_dead_letters(
+    body: DeadLetterFilter,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+):
+    """Delete matching dead-lettered jobs, in the background."""
+    matched = await dead_letter.count_matching(session, body)
+    return await dead_letter.start_operation(redis, "purge", body, matched)
+
+
+@router.get("/dead-letter/operations/{operation_id}", response_model=DeadLetterOperation)
+async def get_dead_letter_operation(
+    operation_id: uuid.UUID,
+    redis: Redis = Depends(get_redis),
+):
+    operation = await dead_letter.get_operation(redis, str(operation_id))
+    if operation is None:
+        raise HTTPException(status_code=404, detail="Operation not found")
+    return operation
+
+
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job(
     job_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    primary: AsyncSession = Depends(get_session),
 ):
-    result = await session.execute(select(Job).where(Job.id == job_id))
-    job = result.scalar_one_or_none()
+    job = await job_store.get_job(session, job_id)
+    if job is None and request.state.read_replica:
+        # Possibly created moments ago by another client: not replicated yet
+        job = await job_store.get_job(primary, job_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
 
 
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _contains_pattern(text: str) -> str:
+    """ILIKE pattern matching ``text`` anywhere, with wildcards in it escaped."""
+    escaped = text.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escaped}%"
+
+
 @router.get("", response_model=JobListResponse)
 async def list_jobs(
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
     status: str | None = Query(default=None),
-    session: AsyncSession = Depends(get_session),
+    job_type: str | None = Query(default=None, alias="type"),
+    created_after: datetime | None = Query(default=None),
+    created_before: datetime | None = Query(default=None),
+    updated_after: datetime | None = Query(default=None),
+    updated_before: datetime | None = Query(default=None),
+    # Case-insensitive substring; 3+ characters so the trigram index applies
+    error: str | None = Query(default=None, min_length=3),
+    # JSON object the payload must contain, e.g. {"to": "a@example.com"}
+    payload: str | None = Query(default=None),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    base_query = select(Job)
-    count_query = select(func.count()).select_from(Job)
-
+    conditions = []
     if status is not None:
-        base_query = base_query.where(Job.status == status)
-        count_query = count_query.where(Job.status == status)
+        conditions.append(Job.status == status)
+    if job_type is not None:
+        conditions.append(Job.type == job_type)
+    if created_after is not None:
+        conditions.append(Job.created_at >= _naive_utc(created_after))
+    if created_before is not None:
+        conditions.append(Job.created_at < _naive_utc(created_before))
+    if updated_after is not None:
+        conditions.append(Job.updated_at >= _naive_utc(updated_after))
+    if updated_before is not None:
+        conditions.append(Job.updated_at < _naive_utc(updated_before))
+    if error is not None:
+        conditions.append(Job.error_message.ilike(_contains_pattern(error), escape="/"))
+    if payload is not None:
+        try:
+            fragment = json.loads(payload)
+        except ValueError:
+            fragment = None
+        if not isinstance(fragment, dict):
+            raise HTTPException(status_code=422, detail="payload must be a JSON object")
+        conditions.append(Job.payload.contains(fragment))
 
-    count_result = await session.execute(count_query)
+    count_result = await session.execute(
+        select(func.count()).select_from(Job).where(*conditions)
+    )
     total = count_result.scalar_one()
 
     result = await session.execute(
-        base_query.order_by(Job.created_at.desc()).limit(limit).offset(offset)
+        select(Job)
+        .where(*conditions)
+        .order_by(Job.created_at.desc())
+        .limit(limit)
+        .offset(offset)
     )
     items = result.scalars().all()
 
@@ -1,18 +1,22 @@
+import time
+
 from fastapi import APIRouter, Depends
 from redis.asyncio import Redis
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_session
+from app.database import get_read_session
 from app.models import Job
+from app.queue_stats import read_queue_stats
 from app.redis_client import get_redis
+from app.schemas import JobType
 
 router = APIRouter(tags=["metrics"])
 
 
 @router.get("/metrics")
 async def get_metrics(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     redis: Redis = Depends(get_redis),
 ):
     result = await session.execute(
@@ -29,6 +33,8 @@ async def get_metrics(
     queue_length = await redis.llen("job_queue")
     retry_queue_length = await redis.zcard("retry_queue")
     dlq_length = await redis.llen("dead_letter_queue")
+    retry_head = await redis.zrange("retry_queue", 0, 0, withscores=True)
+    job_types = await read_queue_stats(redis, [job_type.value for job_type in JobType])
 
     return {
         "total_jobs": row.total_jobs,
@@ -39,4 +45,20 @@ async def get_metrics(
         "queue_length": queue_length,
         "retry_queue_length": retry_queue_length,
         "dlq_length": dlq_length,
+        "queues": {
+            "job_queue": {
+                "length": queue_length,
+                "oldest_age_seconds": max(
+                    (stats["oldest_age_seconds"] for stats in job_types.values()), default=0.0
+                ),
+            },
+            "retry_queue": {
+                "length": retry_queue_length,
+                # How far behind the scheduler is promoting due entries
+                "overdue_seconds": (
+                    round(max(0.0, time.time() - retry_head[0][1]), 3) if retry_head else 0.0
+                ),
+            },
+        },
+        "job_types": job_types,
     }
@@ -1,8 +1,10 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from app.cron import CronSchedule
 
 
 class JobStatus(str, Enum):
@@ -12,6 +14,8 @@ class JobStatus(str, Enum):
     failed = "failed"
     retrying = "retrying"
     dead_letter = "dead_letter"
+    scheduled = "scheduled"
+    cancelled = "cancelled"
 
 
 class JobType(str, Enum):
@@ -24,6 +28,38 @@ class JobCreateRequest(BaseModel):
     type: JobType
     payload: dict
     max_attempts: int = Field(default=3, ge=1)
+    # Overrides the worker's per-type default handler timeout
+    timeout_seconds: int | None = Field(default=None, ge=1)
+    # Either a one-off start time or a 5-field UTC cron expression
+    run_at: datetime | None = None
+    cron: str | None = Field(default=None, max_length=255)
+    # Returns the existing job instead of queuing another while one with the
+    # same key is pending, processing or retrying
+    dedupe_key: str | None = Field(default=None, min_length=1, max_length=200)
+
+    @field_validator("run_at")
+    @classmethod
+    def normalize_run_at(cls, value: datetime | None) -> datetime | None:
+        # Store naive UTC to match TIMESTAMP WITHOUT TIME ZONE columns
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @field_validator("cron")
+    @classmethod
+    def validate_cron(cls, value: str | None) -> str | None:
+        if value is not None:
+            # CronError is a ValueError, so bad expressions surface as 422s
+            CronSchedule(value).next_after(datetime.now(timezone.utc).replace(tzinfo=None))
+        return value
+
+    @model_validator(mode="after")
+    def check_schedule(self) -> "JobCreateRequest":
+        if self.run_at is not None and self.cron is not None:
+            raise ValueError("Specify at most one of run_at and cron")
+        if self.cron is not None and self.dedupe_key is not None:
+            raise ValueError("dedupe_key does not apply to cron templates")
+        return self
 
 
 class JobResponse(BaseModel):
@@ -35,12 +71,90 @@ class JobResponse(BaseModel):
     max_attempts: int
     error_message: str | None
     idempotency_key: str | None
+    dedupe_key: str | None = None
+    traceparent: str | None = None
+    timeout_seconds: int | None = None
+    run_at: datetime | None = None
+    cron: str | None = None
+    started_at: datetime | None = None
     created_at: datetime
     updated_at: datetime
 
     model_config = {"from_attributes": True}
 
 
+class DeadLetterFilter(BaseModel):
+    # All given filters must match; none selects the whole DLQ
+    type: str | None = Field(default=None, max_length=255)
+    error_prefix: str | None = Field(default=None, min_length=1)
+    # Bounds on when the job was dead-lettered (its updated_at)
+    failed_after: datetime | None = None
+    failed_before: datetime | None = None
+
+    @field_validator("failed_after", "failed_before")
+    @classmethod
+    def normalize_bounds(cls, value: datetime | None) -> datetime | None:
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class DeadLetterRequeueRequest(DeadLetterFilter):
+    # Jobs per second pushed back to the workers, capped by DLQ_REQUEUE_RATE
+    rate: float | None = Field(default=None, gt=0)
+
+
+class DeadLetterOperation(BaseModel):
+    id: uuid.UUID
+    action: str
+    # running -> completed | failed | cancelled
+    status: str
+    matched: int
+    processed: int
+    # Left in the DLQ because its dedupe_key is held by an active job
+    skipped: int
+    rate: float | None = None
+    started_at: float
+    finished_at: float | None = None
+    error: str | None = None
+    # API process running the operation, and when it last reported progress
+    owner: str | None = None
+    heartbeat_at: float | None = None
+
+
+class CancelJobsRequest(BaseModel):
+    # All given filters must match; at least one is required
+    type: str | None = Field(default=None, max_length=255)
+    status: list[JobStatus] | None = Field(default=None, min_length=1)
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+
+    @field_validator("created_after", "created_before")
+    @classmethod
+    def normalize_bounds(cls, value: datetime | None) -> datetime | None:
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @model_validator(mode="after")
+    def check_filters(self) -> "CancelJobsRequest":
+        if all(
+            value is None
+            for value in (self.type, self.status, self.created_after, self.created_before)
+        ):
+            raise ValueError("Specify at least one filter")
+        cancellable = {"pending", "retrying", "processing", "scheduled"}
+        if self.status is not None and not {s.value for s in self.status} <= cancellable:
+            raise ValueError(f"status must be among {sorted(cancellable)}")
+        return self
+
+
+class CancelJobsResponse(BaseModel):
+    cancelled: int
+    # Of those, jobs that were running and were signalled to their worker
+    running: int
+
+
 class JobListResponse(BaseModel):
     items: list[JobResponse]
     total: int
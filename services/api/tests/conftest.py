@@ -17,6 +17,9 @@ class FakeRedis:
     def __init__(self):
         self._lists: dict[str, list] = {}
         self._zsets: dict[str, dict] = {}
+        self._strings: dict[str, str] = {}
+        self._hashes: dict[str, dict] = {}
+        self.published: list[tuple[str, str]] = []
 
     async def rpush(self, key: str, *values):
         self._lists.setdefault(key, []).extend(values)
@@ -25,16 +28,71 @@ class FakeRedis:
     async def llen(self, key: str) -> int:
         return len(self._lists.get(key, []))
 
+    async def lrem(self, key: str, count: int, value) -> int:
+        items = self._lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
     async def zcard(self, key: str) -> int:
         return len(self._zsets.get(key, {}))
 
     async def zadd(self, key: str, mapping: dict):
         self._zsets.setdefault(key, {}).update(mapping)
 
+    async def zrem(self, key: str, *members) -> int:
+        zset = self._zsets.get(key, {})
+        return sum(1 for member in members if zset.pop(member, None) is not None)
+
     async def zremrangebyscore(self, key, min_score, max_score):
         return 0
 
-    def pipeline(self):
+    async def zcount(self, key: str, min_score, max_score) -> int:
+        low, high = float(min_score), float(max_score)
+        return sum(1 for score in self._zsets.get(key, {}).values() if low <= score <= high)
+
+    async def zrange(self, key: str, start: int, end: int, withscores: bool = False):
+        items = sorted(self._zsets.get(key, {}).items(), key=lambda item: item[1])
+        items = items[start : None if end == -1 else end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    async def set(self, key: str, value) -> bool:
+        self._strings[key] = str(value)
+        return True
+
+    async def mget(self, keys: list[str]) -> list:
+        return [self._strings.get(key) for key in keys]
+
+    async def hset(self, key: str, mapping: dict) -> int:
+        self._hashes.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def hgetall(self, key: str) -> dict:
+        return dict(self._hashes.get(key, {}))
+
+    async def publish(self, channel: str, message) -> int:
+        self.published.append((channel, message))
+        return 0
+
+    async def _remove_ids(self, key: str, *ids) -> int:
+        removed = 0
+        for value in dict.fromkeys(ids):
+            removed += await self.lrem(key, 1, value)
+        return removed
+
+    def register_script(self, script: str):
+        # Lua scripts are emulated in Python, keyed by their source
+        from app import dead_letter
+
+        handler = {dead_letter.REMOVE_IDS_SCRIPT: self._remove_ids}[script]
+
+        async def run(keys=(), args=()):
+            return await handler(*keys, *args)
+
+        return run
+
+    def pipeline(self, transaction: bool = True):
         return FakePipeline(self)
 
 
@@ -43,6 +101,14 @@ class FakePipeline:
         self._redis = redis
         self._commands: list[tuple] = []
 
+    def __getattr__(self, name):
+        # Any other command is queued and replayed against FakeRedis
+        def queue(*args, **kwargs):
+            self._commands.append((name, *args, kwargs))
+            return self
+
+        return queue
+
     def zremrangebyscore(self, key, min_s, max_s):
         self._commands.append(("zremrangebyscore", key, min_s, max_s))
         return self
@@ -71,6 +137,9 @@ class FakePipeline:
                 results.append(await self._redis.zcard(cmd[1]))
             elif cmd[0] == "expire":
                 results.append(True)
+            else:
+                name, *args, kwargs = cmd
+                results.append(await getattr(self._redis, name)(*args, **kwargs))
         return results
 
 
@@ -86,6 +155,12 @@ def make_job(**kwargs):
         "max_attempts": 3,
         "error_message": None,
         "idempotency_key": None,
+        "dedupe_key": None,
+        "traceparent": None,
+        "started_at": None,
+        "timeout_seconds": None,
+        "run_at": None,
+        "cron": None,
         "created_at": now,
         "updated_at": now,
     }
@@ -131,6 +206,7 @@ def mock_session_with_result(result_value):
     mock_session = AsyncMock()
     mock_result = MagicMock()
     mock_result.scalar_one_or_none.return_value = result_value
+    mock_result.one_or_none.return_value = result_value
     mock_session.execute = AsyncMock(return_value=mock_result)
     mock_session.commit = AsyncMock()
     mock_session.refresh = AsyncMock()
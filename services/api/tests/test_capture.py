@@ -0,0 +1,72 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app import capture
+from app.database import get_session
+from app.main import app
+from app.schemas import JobCreateRequest
+from tests.conftest import make_job, override_session
+
+
+def request(**kwargs) -> JobCreateRequest:
+    return JobCreateRequest(**{"type": "email.send", "payload": {"to": "a@example.com"}, **kwargs})
+
+
+class TestCaptureRecord:
+    def test_anonymized_record_keeps_shape_not_data(self):
+        body = request(payload={"to": "alice@example.com", "tags": ["x", 1], "vip": True})
+        record = capture.capture_record(body, "order-42", anonymize=True)
+
+        assert record["payload_shape"] == {"to": "str:17", "tags": ["str:1", "num"], "vip": "bool"}
+        assert "payload" not in record
+        assert "alice" not in json.dumps(record)
+        assert record["payload_bytes"] == len('{"to":"alice@example.com","tags":["x",1],"vip":true}')
+        # Same key -> same digest, so replays keep idempotent repeats
+        again = capture.capture_record(body, "order-42", anonymize=True)
+        assert record["idempotency_key"] == again["idempotency_key"] != "order-42"
+
+    def test_verbatim_record(self):
+        record = capture.capture_record(request(), "order-42", anonymize=False)
+
+        assert record["payload"] == {"to": "a@example.com"}
+        assert record["idempotency_key"] == "order-42"
+        assert record["run_in_s"] is None
+
+
+@pytest.mark.asyncio
+class TestCaptureFile:
+    async def test_create_requests_appended_to_file(self, client, tmp_path):
+        path = tmp_path / "capture.jsonl"
+        mock_session = AsyncMock()
+        result = MagicMock()
+        result.one_or_none.return_value = make_job()
+        mock_session.execute = AsyncMock(return_value=result)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        capture.init_capture(str(path))
+        try:
+            for _ in range(3):
+                response = await client.post(
+                    "/jobs", json={"type": "email.send", "payload": {"to": "a@example.com"}}
+                )
+                assert response.status_code == 201
+        finally:
+            capture.close_capture()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["type"] for line in lines] == ["email.send"] * 3
+        assert lines[0]["payload_shape"] == {"to": "str:13"}
+
+    async def test_file_rotates_at_size_limit(self, tmp_path):
+        path = tmp_path / "capture.jsonl"
+        capture.init_capture(str(path), max_bytes=500, backups=2)
+        try:
+            for _ in range(20):
+                capture.record_request(request(), None)
+        finally:
+            capture.close_capture()
+
+        assert (tmp_path / "capture.jsonl.1").exists()
+        assert path.stat().st_size <= 500
@@ -0,0 +1,236 @@
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app import dead_letter
+from app.database import get_session
+from app.main import app
+from app.schemas import DeadLetterFilter
+from tests.conftest import make_job, override_session
+
+
+def count_session(matched: int):
+    session = AsyncMock()
+    result = MagicMock()
+    result.scalar_one.return_value = matched
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def batch_factory(*batches):
+    """async_session_factory whose sessions each lock one batch of rows.
+
+    The second statement (the requeue or purge) returns the rows it names.
+    """
+    sessions = []
+    pending = list(batches)
+
+    def factory():
+        selected = pending.pop(0) if pending else []
+
+        async def execute(stmt):
+            if not session.execute.await_args_list[:-1]:
+                return MagicMock(**{"all.return_value": selected})
+            [ids] = [v for k, v in stmt.compile().params.items() if k.startswith("id_")]
+            return MagicMock(**{"all.return_value": [row for row in selected if row.id in ids]})
+
+        session = AsyncMock()
+        session.execute = AsyncMock(side_effect=execute)
+        session.__aenter__.return_value = session
+        sessions.append(session)
+        return session
+
+    factory.sessions = sessions
+    return factory
+
+
+async def finish_operations():
+    await asyncio.gather(*dead_letter._tasks)
+
+
+@pytest.mark.asyncio
+class TestBulkRequeue:
+    async def test_requeue_pushes_jobs_and_removes_them_from_dlq(self, client, fake_redis):
+        jobs = [make_job(status="pending"), make_job(status="pending")]
+        other = str(uuid.uuid4())
+        await fake_redis.rpush("dead_letter_queue", str(jobs[0].id), other, str(jobs[1].id))
+        app.dependency_overrides[get_session] = override_session(count_session(2))
+
+        with patch("app.dead_letter.db") as mock_db:
+            mock_db.async_session_factory = batch_factory(jobs)
+            response = await client.post(
+                "/jobs/dead-letter/requeue", json={"type": "email.send", "error_prefix": "SMTP"}
+            )
+            await finish_operations()
+
+        assert response.status_code == 202
+        assert response.json()["status"] == "running"
+        assert response.json()["matched"] == 2
+        assert fake_redis._lists["job_queue"] == [str(job.id) for job in jobs]
+        assert fake_redis._lists["dead_letter_queue"] == [other]
+
+        status = await client.get(f"/jobs/dead-letter/operations/{response.json()['id']}")
+        assert status.json()["status"] == "completed"
+        assert status.json()["processed"] == 2
+        assert status.json()["skipped"] == 0
+
+    async def test_requeue_is_paced_to_rate(self, fake_redis):
+        jobs = [make_job(status="pending") for _ in range(5)]
+        factory = batch_factory(jobs[:2], jobs[2:4], jobs[4:])
+
+        with (
+            patch("app.dead_letter.db") as mock_db,
+            patch("app.dead_letter.asyncio.sleep", new=AsyncMock()) as sleep,
+        ):
+            mock_db.async_session_factory = factory
+            operation = await dead_letter.start_operation(
+                fake_redis, "requeue", DeadLetterFilter(), matched=5, rate=2
+            )
+            await finish_operations()
+
+        # Batches are capped at the rate, with a pause after each full one
+        assert len(factory.sessions) == 3
+        assert sleep.await_count == 2
+        assert sleep.await_args_list[0].args[0] == pytest.approx(1.0, abs=0.1)
+        stored = await dead_letter.get_operation(fake_redis, operation["id"])
+        assert stored["processed"] == 5
+        assert stored["rate"] == 2.0
+
+    async def test_jobs_with_held_dedupe_key_are_counted_as_skipped(self, fake_redis):
+        held = make_job(status="dead_letter", dedupe_key="report-1", requeueable=False)
+        free = make_job(status="pending")
+        first = make_job(status="pending", dedupe_key="report-2", requeueable=True)
+        duplicate = make_job(status="dead_letter", dedupe_key="report-2", requeueable=True)
+        batch = [held, free, first, duplicate]
+        await fake_redis.rpush("dead_letter_queue", *(str(job.id) for job in batch))
+
+        with patch("app.dead_letter.db") as mock_db:
+            mock_db.async_session_factory = batch_factory(batch)
+            operation = await dead_letter.start_operation(
+                fake_redis, "requeue", DeadLetterFilter(), matched=5
+            )
+            await finish_operations()
+
+        stored = await dead_letter.get_operation(fake_redis, operation["id"])
+        # The fifth matched job changed under us: neither processed nor skipped
+        assert (stored["processed"], stored["skipped"]) == (2, 2)
+        # Of two dead jobs sharing a key, only the first reached is requeued
+        assert fake_redis._lists["dead_letter_queue"] == [str(held.id), str(duplicate.id)]
+        assert fake_redis._lists["job_queue"] == [str(free.id), str(first.id)]
+
+    async def test_rate_capped_by_server_limit(self, fake_redis):
+        with patch("app.dead_letter.db") as mock_db:
+            mock_db.async_session_factory = batch_factory()
+            operation = await dead_letter.start_operation(
+                fake_redis, "requeue", DeadLetterFilter(), matched=0, rate=1e9
+            )
+            await finish_operations()
+
+        assert operation["rate"] == dead_letter.DLQ_REQUEUE_RATE
+
+    async def test_failure_is_reported(self, fake_redis):
+        with patch("app.dead_letter.db") as mock_db:
+            session = AsyncMock()
+            session.__aenter__.return_value = session
+            session.execute = AsyncMock(side_effect=RuntimeError("connection lost"))
+            mock_db.async_session_factory = MagicMock(return_value=session)
+            operation = await dead_letter.start_operation(
+                fake_redis, "requeue", DeadLetterFilter(), matched=3
+            )
+            await finish_operations()
+
+        stored = await dead_letter.get_operation(fake_redis, operation["id"])
+        assert stored["status"] == "failed"
+        assert stored["error"] == "connection lost"
+        # Not reached is not the same as skipped
+        assert (stored["processed"], stored["skipped"]) == (0, 0)
+
+    async def test_operation_without_heartbeat_is_reported_failed(self, fake_redis):
+        with patch("app.dead_letter.db") as mock_db:
+            mock_db.async_session_factory = batch_factory()
+            operation = await dead_letter.start_operation(
+                fake_redis, "requeue", DeadLetterFilter(), matched=10
+            )
+            await finish_operations()
+        # As left behind by an API process that died mid-operation
+        stale = time.time() - dead_letter.DLQ_OPERATION_STALE - 1
+        await fake_redis.hset(
+            dead_letter.operation_key(operation["id"]),
+            mapping={"status": "running", "heartbeat_at": str(stale), "finished_at": ""},
+        )
+
+        stored = await dead_letter.get_operation(fake_redis, operation["id"])
+        assert stored["status"] == "failed"
+        assert dead_letter.OWNER in stored["error"]
+        assert stored["finished_at"] == pytest.approx(stale)
+        reread = await dead_letter.get_operation(fake_redis, operation["id"])
+        assert reread["status"] == "failed"
+
+
+@pytest.mark.asyncio
+class TestBulkPurge:
+    async def test_purge_removes_from_dlq_without_enqueueing(self, client, fake_redis):
+        job_id = uuid.uuid4()
+        await fake_redis.rpush("dead_letter_queue", str(job_id))
+        app.dependency_overrides[get_session] = override_session(count_session(1))
+
+        with patch("app.dead_letter.db") as mock_db:
+            mock_db.async_session_factory = batch_factory([MagicMock(id=job_id)])
+            response = await client.post("/jobs/dead-letter/purge", json={})
+            await finish_operations()
+
+        assert response.status_code == 202
+        assert response.json()["rate"] is None
+        assert await fake_redis.llen("dead_letter_queue") == 0
+        assert await fake_redis.llen("job_queue") == 0
+
+    async def test_unknown_operation_returns_404(self, client):
+        response = await client.get(f"/jobs/dead-letter/operations/{uuid.uuid4()}")
+        assert response.status_code == 404
+
+
+class TestFilters:
+    def test_batch_statement_filters_and_skips_locked_rows(self):
+        from datetime import datetime
+
+        from sqlalchemy.dialects import postgresql
+
+        filters = DeadLetterFilter(
+            type="report.generate",
+            error_prefix="Timeout_",
+            failed_after="2026-01-01T00:00:00Z",
+        )
+        after = (datetime(2026, 1, 2), uuid.uuid4())
+        sql = str(
+            dead_letter._select_batch(filters, "requeue", 100, after).compile(
+                dialect=postgresql.dialect()
+            )
+        )
+
+        assert "jobs.type = " in sql
+        assert "LIKE" in sql and "ESCAPE" in sql
+        assert "jobs.updated_at >= " in sql
+        assert "(jobs.updated_at, jobs.id) > " in sql
+        assert "FOR UPDATE OF jobs SKIP LOCKED" in sql
+        # Rows whose dedupe_key is taken are flagged, to be counted as skipped.
+        # Only active jobs count; dead ones outside the filter don't block.
+        assert "jobs_1.dedupe_key = jobs.dedupe_key" in sql
+        assert "jobs_1.id < jobs.id" not in sql
+
+    def test_requeue_rechecks_dedupe_key_under_lock(self):
+        from sqlalchemy.dialects import postgresql
+
+        sql = str(
+            dead_letter._apply("requeue", [uuid.uuid4()]).compile(dialect=postgresql.dialect())
+        )
+
+        assert sql.startswith("UPDATE jobs SET status=")
+        assert "jobs_1.dedupe_key = jobs.dedupe_key" in sql
+
+    def test_aware_bounds_become_naive_utc(self):
+        filters = DeadLetterFilter(failed_before="2026-01-01T02:00:00+02:00")
+        assert filters.failed_before.tzinfo is None
+        assert filters.failed_before.hour == 0
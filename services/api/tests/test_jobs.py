@@ -1,5 +1,5 @@
 import uuid
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -8,6 +8,19 @@ from app.main import app
 from tests.conftest import make_job, mock_session_with_result, override_session
 
 
+def session_returning_inserted_row():
+    """Mock session whose INSERT ... RETURNING echoes the inserted values."""
+
+    async def execute(stmt, params=None):
+        result = MagicMock()
+        result.one_or_none.return_value = make_job(**params)
+        return result
+
+    mock_session = AsyncMock()
+    mock_session.execute = AsyncMock(side_effect=execute)
+    return mock_session
+
+
 @pytest.mark.asyncio
 class TestCreateJob:
     async def test_invalid_type_returns_422(self, client):
@@ -24,20 +37,7 @@ class TestCreateJob:
         assert response.status_code == 422
 
     async def test_create_job_success(self, client, fake_redis):
-        def populate_job_fields(job):
-            """Simulate DB populating server-default fields after refresh."""
-            from datetime import datetime, timezone
-            job.id = uuid.uuid4()
-            job.status = job.status or "pending"
-            job.attempts = job.attempts if job.attempts is not None else 0
-            now = datetime.now(timezone.utc).replace(tzinfo=None)
-            job.created_at = now
-            job.updated_at = now
-
-        mock_session = AsyncMock()
-        mock_session.add = MagicMock()
-        mock_session.commit = AsyncMock()
-        mock_session.refresh = AsyncMock(side_effect=populate_job_fields)
+        mock_session = session_returning_inserted_row()
 
         app.dependency_overrides[get_session] = override_session(mock_session)
 
@@ -49,7 +49,85 @@ class TestCreateJob:
         data = response.json()
         assert data["type"] == "email.send"
         assert data["status"] == "pending"
-        mock_session.add.assert_called_once()
+        sql = str(mock_session.execute.await_args.args[0])
+        assert sql.startswith("INSERT INTO jobs")
+        mock_session.execute.assert_awaited_once()
+        mock_session.commit.assert_awaited_once()
+        mock_session.refresh.assert_not_awaited()
+        assert await fake_redis.llen("job_queue") == 1
+        # Enqueue time recorded for the queue lag metrics
+        assert list(fake_redis._zsets["queue_ready:email.send"]) == [data["id"]]
+
+    async def test_idempotency_race_returns_existing(self, client, fake_redis):
+        """ON CONFLICT DO NOTHING returned no row -> load the winner's job."""
+        existing = make_job(idempotency_key="race-key")
+        results = []
+        for row in (None, None, existing):
+            result = MagicMock()
+            result.one_or_none.return_value = row
+            results.append(result)
+        mock_session = AsyncMock()
+        mock_session.execute = AsyncMock(side_effect=results)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post(
+            "/jobs",
+            json={"type": "email.send", "payload": {}},
+            headers={"Idempotency-Key": "race-key"},
+        )
+        assert response.status_code == 200
+        assert response.json()["id"] == str(existing.id)
+        mock_session.commit.assert_not_awaited()
+        assert await fake_redis.llen("job_queue") == 0
+
+    async def test_delayed_job_goes_to_retry_zset(self, client, fake_redis):
+        mock_session = session_returning_inserted_row()
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post("/jobs", json={
+            "type": "email.send",
+            "payload": {},
+            "run_at": "2099-01-01T00:00:00+02:00",
+        })
+        assert response.status_code == 201
+        assert response.json()["run_at"] == "2098-12-31T22:00:00"
+        assert await fake_redis.llen("job_queue") == 0
+        assert list(fake_redis._zsets["retry_queue"].values()) == [4070901600.0]
+        assert list(fake_redis._zsets["queue_ready:email.send"].values()) == [4070901600.0]
+
+    async def test_cron_job_creates_scheduled_template(self, client, fake_redis):
+        mock_session = session_returning_inserted_row()
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post("/jobs", json={
+            "type": "report.generate",
+            "payload": {"name": "nightly"},
+            "cron": "0 3 * * *",
+        })
+        assert response.status_code == 201
+        data = response.json()
+        assert data["status"] == "scheduled"
+        assert data["cron"] == "0 3 * * *"
+        assert data["run_at"].endswith("T03:00:00")
+        assert await fake_redis.llen("job_queue") == 0
+        assert list(fake_redis._zsets["cron_schedule"]) == [data["id"]]
+
+    async def test_invalid_cron_returns_422(self, client):
+        response = await client.post("/jobs", json={
+            "type": "email.send",
+            "payload": {},
+            "cron": "61 * * * *",
+        })
+        assert response.status_code == 422
+
+    async def test_run_at_and_cron_are_exclusive(self, client):
+        response = await client.post("/jobs", json={
+            "type": "email.send",
+            "payload": {},
+            "cron": "* * * * *",
+            "run_at": "2099-01-01T00:00:00Z",
+        })
+        assert response.status_code == 422
 
     async def test_idempotency_key_returns_existing(self, client, fake_redis):
         job = make_job(idempotency_key="test-key-1")
@@ -65,6 +143,74 @@ class TestCreateJob:
         assert response.status_code == 200
         assert response.json()["id"] == str(job.id)
 
+    async def test_dedupe_key_returns_active_duplicate(self, client, fake_redis):
+        existing = make_job(status="processing", dedupe_key="nightly-sales")
+        results = []
+        for row in (None, existing):
+            result = MagicMock()
+            result.one_or_none.return_value = row
+            results.append(result)
+        mock_session = AsyncMock()
+        mock_session.execute = AsyncMock(side_effect=results)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post("/jobs", json={
+            "type": "report.generate",
+            "payload": {"name": "sales"},
+            "dedupe_key": "nightly-sales",
+        })
+        assert response.status_code == 200
+        assert response.json()["id"] == str(existing.id)
+        assert mock_session.execute.await_args.args[1] == {"dedupe_key": "nightly-sales"}
+        assert await fake_redis.llen("job_queue") == 0
+
+    async def test_auto_dedupe_hashes_canonical_payload(self, client, monkeypatch):
+        monkeypatch.setattr("app.routes.jobs.AUTO_DEDUPE_TYPES", {"report.generate"})
+        keys = []
+        for payload in ({"name": "sales", "year": 2024}, {"year": 2024, "name": "sales"}):
+            mock_session = session_returning_inserted_row()
+            app.dependency_overrides[get_session] = override_session(mock_session)
+            response = await client.post("/jobs", json={"type": "report.generate", "payload": payload})
+            assert response.status_code == 201
+            keys.append(mock_session.execute.await_args.args[1]["dedupe_key"])
+
+        assert keys[0] == keys[1]
+        assert keys[0].startswith("auto:")
+
+        mock_session = session_returning_inserted_row()
+        app.dependency_overrides[get_session] = override_session(mock_session)
+        await client.post("/jobs", json={"type": "email.send", "payload": {}})
+        assert mock_session.execute.await_args.args[1]["dedupe_key"] is None
+
+    async def test_dedupe_key_rejected_for_cron(self, client):
+        response = await client.post("/jobs", json={
+            "type": "report.generate",
+            "payload": {},
+            "cron": "0 3 * * *",
+            "dedupe_key": "nightly",
+        })
+        assert response.status_code == 422
+
+    async def test_create_job_starts_trace_for_worker(self, client, tmp_path):
+        from app import tracing
+
+        tracing.exporter = tracing.BatchExporter(
+            "test", 1.0, str(tmp_path / "spans.jsonl"), None, 60
+        )
+        mock_session = session_returning_inserted_row()
+        app.dependency_overrides[get_session] = override_session(mock_session)
+        try:
+            response = await client.post("/jobs", json={"type": "email.send", "payload": {}})
+            spans = [span.name for span in tracing.exporter._buffer]
+        finally:
+            tracing.exporter = None
+
+        assert response.status_code == 201
+        traceparent = response.json()["traceparent"]
+        assert tracing.parse_traceparent(traceparent)[2] is True
+        assert mock_session.execute.await_args.args[1]["traceparent"] == traceparent
+        assert spans == ["db.insert_job", "redis.enqueue", "job.create"]
+
 
 @pytest.mark.asyncio
 class TestGetJob:
@@ -147,6 +293,51 @@ class TestListJobs:
         assert len(data["items"]) == 3
 
 
+    async def test_search_filters_build_indexed_predicates(self, client):
+        from sqlalchemy.dialects import postgresql
+
+        mock_session = AsyncMock()
+        count_result = MagicMock()
+        count_result.scalar_one.return_value = 0
+        items_result = MagicMock()
+        items_result.scalars.return_value.all.return_value = []
+        mock_session.execute = AsyncMock(side_effect=[count_result, items_result])
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.get(
+            "/jobs",
+            params={
+                "status": "failed",
+                "type": "report.generate",
+                "created_after": "2026-01-01T00:00:00Z",
+                "updated_before": "2026-02-01T00:00:00+01:00",
+                "error": "50%_off",
+                "payload": '{"name": "sales"}',
+            },
+        )
+
+        assert response.status_code == 200
+        count_stmt = mock_session.execute.await_args_list[0].args[0]
+        compiled = count_stmt.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        assert "jobs.type = " in sql
+        assert "jobs.created_at >= " in sql
+        assert "jobs.updated_at < " in sql
+        assert "jobs.error_message ILIKE " in sql
+        assert "jobs.payload @> " in sql
+        params = compiled.params
+        assert "%50/%/_off%" in params.values()
+        assert params["updated_at_1"].hour == 23
+
+    async def test_payload_filter_must_be_json_object(self, client):
+        response = await client.get("/jobs", params={"payload": "[1, 2]"})
+        assert response.status_code == 422
+
+    async def test_error_filter_needs_three_characters(self, client):
+        response = await client.get("/jobs", params={"error": "ab"})
+        assert response.status_code == 422
+
+
 @pytest.mark.asyncio
 class TestRetryJob:
     async def test_retry_failed_job(self, client, fake_redis):
@@ -161,12 +352,27 @@ class TestRetryJob:
 
     async def test_retry_dead_letter_job(self, client, fake_redis):
         job = make_job(status="dead_letter", attempts=3, error_message="max retries")
+        await fake_redis.rpush("dead_letter_queue", str(job.id))
 
         mock_session = mock_session_with_result(job)
         app.dependency_overrides[get_session] = override_session(mock_session)
 
         response = await client.post(f"/jobs/{job.id}/retry")
         assert response.status_code == 200
+        assert await fake_redis.llen("dead_letter_queue") == 0
+
+    async def test_retry_conflicting_with_active_duplicate_returns_409(self, client, fake_redis):
+        from sqlalchemy.exc import IntegrityError
+
+        job = make_job(status="failed", dedupe_key="nightly-sales")
+        mock_session = mock_session_with_result(job)
+        mock_session.commit = AsyncMock(side_effect=IntegrityError("UPDATE", {}, Exception()))
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post(f"/jobs/{job.id}/retry")
+        assert response.status_code == 409
+        mock_session.rollback.assert_awaited_once()
+        assert await fake_redis.llen("job_queue") == 0
 
     async def test_retry_completed_job_returns_409(self, client):
         job = make_job(status="completed")
@@ -183,3 +389,189 @@ class TestRetryJob:
 
         response = await client.post(f"/jobs/{uuid.uuid4()}/retry")
         assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+class TestCancelJob:
+    async def test_cancel_running_job_signals_worker(self, client, fake_redis):
+        job = make_job(status="cancelled", previous_status="processing")
+        mock_session = mock_session_with_result(job)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post(f"/jobs/{job.id}/cancel")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "cancelled"
+        assert fake_redis.published == [("job_cancel", str(job.id))]
+        mock_session.commit.assert_awaited_once()
+
+    async def test_cancel_retrying_job_removes_it_from_retry_zset(self, client, fake_redis):
+        job = make_job(status="cancelled", previous_status="retrying")
+        await fake_redis.zadd("retry_queue", {str(job.id): 1.0, "other": 2.0})
+        await fake_redis.zadd("queue_ready:email.send", {str(job.id): 1.0})
+        mock_session = mock_session_with_result(job)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post(f"/jobs/{job.id}/cancel")
+
+        assert response.status_code == 200
+        assert list(fake_redis._zsets["retry_queue"]) == ["other"]
+        assert fake_redis._zsets["queue_ready:email.send"] == {}
+        # Not running: nothing for the workers to do
+        assert fake_redis.published == []
+
+    async def test_cancel_finished_job_returns_409(self, client):
+        mock_session = AsyncMock()
+        no_row, existing = MagicMock(), MagicMock()
+        no_row.one_or_none.return_value = None
+        existing.one_or_none.return_value = make_job(status="completed")
+        mock_session.execute = AsyncMock(side_effect=[no_row, existing])
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post(f"/jobs/{uuid.uuid4()}/cancel")
+        assert response.status_code == 409
+
+    async def test_cancel_not_found(self, client):
+        mock_session = mock_session_with_result(None)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        response = await client.post(f"/jobs/{uuid.uuid4()}/cancel")
+        assert response.status_code == 404
+
+    async def test_bulk_cancel_batches_and_signals_running_jobs(self, client, fake_redis):
+        from app import cancellation
+
+        running = [make_job(previous_status="processing") for _ in range(2)]
+        queued = make_job(previous_status="pending")
+        batches = [running, [queued], []]
+        mock_session = AsyncMock()
+
+        def execute(statement, *args):
+            result = MagicMock()
+            result.all.return_value = batches.pop(0)
+            return result
+
+        mock_session.execute = AsyncMock(side_effect=execute)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        with patch.object(cancellation, "CANCEL_BATCH_SIZE", 2):
+            response = await client.post(
+                "/jobs/cancel",
+                json={"type": "report.generate", "status": ["pending", "processing"]},
+            )
+
+        assert response.status_code == 200
+        assert response.json() == {"cancelled": 3, "running": 2}
+        assert fake_redis.published == [
+            ("job_cancel", ",".join(str(job.id) for job in running))
+        ]
+        # A short batch is followed by one pass that waits for locked rows
+        assert mock_session.execute.await_count == 3
+
+    async def test_bulk_cancel_requires_a_filter(self, client):
+        response = await client.post("/jobs/cancel", json={})
+        assert response.status_code == 422
+
+    async def test_bulk_cancel_rejects_finished_statuses(self, client):
+        response = await client.post("/jobs/cancel", json={"status": ["completed"]})
+        assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+class TestReadReplica:
+    @staticmethod
+    def replica_factory(row):
+        replica = mock_session_with_result(row)
+        replica.__aenter__.return_value = replica
+        return MagicMock(return_value=replica), replica
+
+    async def test_reads_go_to_replica(self, client):
+        job = make_job()
+        factory, replica = self.replica_factory(job)
+        primary = mock_session_with_result(None)
+        app.dependency_overrides[get_session] = override_session(primary)
+
+        with patch("app.database.replica_session_factory", factory):
+            response = await client.get(f"/jobs/{job.id}")
+
+        assert response.status_code == 200
+        replica.execute.assert_awaited_once()
+        primary.execute.assert_not_awaited()
+
+    async def test_not_yet_replicated_job_read_from_primary(self, client):
+        job = make_job()
+        factory, replica = self.replica_factory(None)
+        primary = mock_session_with_result(job)
+        app.dependency_overrides[get_session] = override_session(primary)
+
+        with patch("app.database.replica_session_factory", factory):
+            response = await client.get(f"/jobs/{job.id}")
+
+        assert response.status_code == 200
+        assert response.json()["id"] == str(job.id)
+        replica.execute.assert_awaited_once()
+
+    async def test_recent_writer_reads_primary(self, client):
+        import time
+
+        job = make_job()
+        factory, _ = self.replica_factory(job)
+        primary = mock_session_with_result(job)
+        app.dependency_overrides[get_session] = override_session(primary)
+
+        with patch("app.database.replica_session_factory", factory):
+            response = await client.get(
+                f"/jobs/{job.id}", headers={"X-Last-Write": str(time.time() - 1)}
+            )
+            stale = await client.get(
+                f"/jobs/{job.id}", headers={"X-Last-Write": str(time.time() - 60)}
+            )
+
+        assert response.status_code == stale.status_code == 200
+        # Only the request with the stale stamp went to the replica
+        factory.assert_called_once()
+
+    async def test_writes_are_stamped_for_read_your_writes(self, client, fake_redis):
+        job = make_job(status="failed")
+        mock_session = mock_session_with_result(job)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+        factory, _ = self.replica_factory(job)
+
+        with patch("app.database.replica_session_factory", factory):
+            write = await client.post(f"/jobs/{job.id}/retry")
+            read = await client.get(f"/jobs/{job.id}")
+
+        assert float(write.headers["X-Last-Write"]) > 0
+        assert "last_write=" in write.headers["set-cookie"]
+        assert "X-Last-Write" not in read.headers
+        # The cookie keeps this client's next read on the primary
+        factory.assert_not_called()
+
+
+class TestQueueMessage:
+    def test_default_format_is_bare_id(self):
+        from app.queue_message import encode_job
+
+        job = make_job()
+        assert encode_job(job) == str(job.id)
+
+    def test_fat_format_carries_payload(self, monkeypatch):
+        import json
+
+        from app import queue_message
+
+        monkeypatch.setattr(queue_message, "QUEUE_MESSAGE_FORMAT", "fat")
+        job = make_job(payload={"to": "a@b.c"})
+        data = json.loads(queue_message.encode_job(job))
+        assert data == {
+            "v": 1, "id": str(job.id), "type": "email.send",
+            "attempts": 0, "max_attempts": 3, "payload": {"to": "a@b.c"},
+        }
+
+    def test_oversized_payload_falls_back_to_id(self, monkeypatch):
+        from app import queue_message
+
+        monkeypatch.setattr(queue_message, "QUEUE_MESSAGE_FORMAT", "fat")
+        monkeypatch.setattr(queue_message, "FAT_MESSAGE_MAX_BYTES", 64)
+        job = make_job(payload={"body": "x" * 100})
+        assert queue_message.encode_job(job) == str(job.id)
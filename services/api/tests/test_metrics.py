@@ -64,3 +64,41 @@ class TestMetrics:
         assert data["queue_length"] == 2
         assert data["retry_queue_length"] == 1
         assert data["dlq_length"] == 1
+
+    async def test_queue_lag_per_type(self, client, fake_redis):
+        import time
+
+        now = time.time()
+        await fake_redis.zadd("queue_ready:report.generate", {
+            "job-1": now - 30, "job-2": now - 5, "job-3": now + 100,
+        })
+        bucket = int(now // 10)
+        # 60 reports run over the last minute; the current bucket is ignored
+        for offset in range(1, 7):
+            await fake_redis.set(f"processed:report.generate:{bucket - offset}", 10)
+        await fake_redis.set(f"processed:report.generate:{bucket}", 500)
+        await fake_redis.zadd("retry_queue", {"job-4": now - 2})
+
+        mock_session = AsyncMock()
+        mock_result = MagicMock()
+        mock_result.one.return_value = MagicMock(
+            total_jobs=0, active_jobs=0, completed_jobs=0, failed_jobs=0, dead_letter_jobs=0
+        )
+        mock_session.execute = AsyncMock(return_value=mock_result)
+        app.dependency_overrides[get_session] = override_session(mock_session)
+
+        data = (await client.get("/metrics")).json()
+
+        reports = data["job_types"]["report.generate"]
+        assert reports["waiting"] == 2
+        assert 29 < reports["oldest_age_seconds"] < 35
+        assert reports["processed_per_second"] == 1.0
+        assert reports["drain_time_seconds"] == 2.0
+        assert data["job_types"]["email.send"] == {
+            "waiting": 0,
+            "oldest_age_seconds": 0.0,
+            "processed_per_second": 0.0,
+            "drain_time_seconds": 0.0,
+        }
+        assert data["queues"]["job_queue"]["oldest_age_seconds"] == reports["oldest_age_seconds"]
+        assert data["queues"]["retry_queue"]["overdue_seconds"] >= 2
@@ -0,0 +1,98 @@
+"""Micro-batching for job types registered with a batch handler.
+
+Each job is still claimed, timed out, retried and dead-lettered on its own
+by ``process_job``; only the handler call is shared. ``MicroBatcher.submit``
+parks the payload until ``max_size`` payloads are waiting or ``max_wait``
+seconds have passed since the first one, then calls the batch handler once
+with all of them and resolves every job's future with its own outcome.
+
+Batch handler contract: take a list of payloads and return a list of the
+same length, in the same order, where each item is the job's result or an
+``Exception`` instance for a job that failed. Raising fails the whole batch.
+
+Every waiting job holds a concurrency slot, so batches never grow beyond
+the worker's current concurrency limit.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        job_type: str,
+        func: Callable[[list[dict]], Awaitable[list[Any]]],
+        max_size: int,
+        max_wait: float,
+    ):
+        self.job_type = job_type
+        self.func = func
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._items: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, payload: dict) -> Any:
+        """Queue one payload for the next batch and wait for its own outcome."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append((payload, future))
+        if len(self._items) >= self.max_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Jobs that timed out while waiting are already cancelled
+        items = [(payload, future) for payload, future in self._items if not future.done()]
+        self._items = []
+        if not items:
+            return
+        task = asyncio.create_task(self._run(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            outcomes = await self.func([payload for payload, _ in items])
+            if len(outcomes) != len(items):
+                raise ValueError(
+                    f"Batch handler for '{self.job_type}' returned {len(outcomes)} "
+                    f"outcomes for {len(items)} jobs"
+                )
+        except Exception as exc:
+            logger.error("Batch of %d '%s' job(s) failed: %s", len(items), self.job_type, exc)
+            outcomes = [exc] * len(items)
+
+        for (_, future), outcome in zip(items, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+
+batchers: dict[str, MicroBatcher] = {}
+
+
+def get_batcher(
+    job_type: str,
+    func: Callable[[list[dict]], Awaitable[list[Any]]],
+    max_size: int,
+    max_wait: float,
+) -> MicroBatcher:
+    """The shared batcher for a job type, created on first use."""
+    batcher = batchers.get(job_type)
+    if batcher is None:
+        batcher = batchers[job_type] = MicroBatcher(job_type, func, max_size, max_wait)
+    return batcher
@@ -0,0 +1,122 @@
+import asyncio
+import collections
+import math
+
+
+class AdaptiveLimiter:
+    """Semaphore whose limit adapts with AIMD (additive increase, multiplicative decrease).
+
+    Drop-in for ``asyncio.Semaphore`` (``async with limiter:``). After each
+    job, ``observe()`` feeds back handler latency, DB latency and outcome:
+
+    * congestion = DB latency above target, a job type's recent handler
+      latency above ``latency_tolerance`` x its long-run baseline, or the
+      recent error rate above ``error_rate_threshold``;
+    * on congestion the limit is multiplied by ``decrease_factor``, then
+      further cuts are held off for one limit's worth of completions so
+      jobs that started under the old limit don't cut it again;
+    * otherwise every ``limit`` healthy completions raise it by one.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        db_latency_target: float,
+        latency_tolerance: float = 2.0,
+        error_rate_threshold: float = 0.5,
+        decrease_factor: float = 0.7,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.db_latency_target = db_latency_target
+        self.latency_tolerance = latency_tolerance
+        self.error_rate_threshold = error_rate_threshold
+        self.decrease_factor = decrease_factor
+
+        self.in_flight = 0
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+        self._healthy_streak = 0
+        self._cooldown = 0
+        self.error_rate = 0.0
+        # job type -> [long-run baseline, recent] handler latency EWMAs
+        self._latency: dict[str, list[float]] = {}
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just as we were cancelled: give it back
+                self.release()
+            else:
+                self._waiters.remove(future)
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+    def _handler_congested(self, job_type: str, handler_latency: float) -> bool:
+        ewma = self._latency.get(job_type)
+        if ewma is None:
+            self._latency[job_type] = [handler_latency, handler_latency]
+            return False
+        ewma[0] += 0.01 * (handler_latency - ewma[0])
+        ewma[1] += 0.2 * (handler_latency - ewma[1])
+        return ewma[1] > ewma[0] * self.latency_tolerance
+
+    def observe(self, job_type: str, handler_latency: float, db_latency: float, failed: bool) -> None:
+        self.error_rate += 0.1 * ((1.0 if failed else 0.0) - self.error_rate)
+        # Always update the latency EWMAs, even when another signal fires
+        handler_congested = self._handler_congested(job_type, handler_latency)
+        congested = (
+            handler_congested
+            or db_latency > self.db_latency_target
+            or self.error_rate > self.error_rate_threshold
+        )
+
+        if self._cooldown > 0:
+            self._cooldown -= 1
+        if congested:
+            self._healthy_streak = 0
+            if self._cooldown == 0:
+                self.limit = max(self.min_limit, math.floor(self.limit * self.decrease_factor))
+                self._cooldown = self.limit
+            return
+
+        self._healthy_streak += 1
+        if self._healthy_streak >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._healthy_streak = 0
+            self._wake_waiters()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "min": self.min_limit,
+            "max": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "error_rate": round(self.error_rate, 3),
+        }
@@ -11,14 +11,83 @@ class Config:
     # Retry queue (Redis sorted set, scored by retry-at timestamp)
     RETRY_QUEUE_NAME: str = os.getenv("RETRY_QUEUE_NAME", "retry_queue")
 
+    # Cron templates (Redis sorted set, scored by next firing timestamp) —
+    # must match the API's SCHEDULE_QUEUE_NAME in routes/jobs.py
+    SCHEDULE_QUEUE_NAME: str = os.getenv("SCHEDULE_QUEUE_NAME", "cron_schedule")
+
     # Dead-letter queue (Redis list for jobs exceeding max_attempts)
     DLQ_NAME: str = os.getenv("DLQ_NAME", "dead_letter_queue")
 
-    # Max concurrent jobs per worker instance
+    # Starting concurrency per worker instance; the AIMD limiter then moves
+    # it between CONCURRENCY_MIN and CONCURRENCY_MAX (set them equal to pin it)
     MAX_CONCURRENCY: int = int(os.getenv("MAX_CONCURRENCY", "5"))
+    CONCURRENCY_MIN: int = int(os.getenv("CONCURRENCY_MIN", "1"))
+    CONCURRENCY_MAX: int = int(os.getenv("CONCURRENCY_MAX", "50"))
+
+    # AIMD congestion signals: claim-commit latency above this (ms), a job
+    # type's recent handler latency above TOLERANCE x its baseline, or a
+    # recent error rate above ERROR_RATE trigger a multiplicative decrease
+    AIMD_DB_LATENCY_TARGET_MS: float = float(os.getenv("AIMD_DB_LATENCY_TARGET_MS", "100"))
+    AIMD_LATENCY_TOLERANCE: float = float(os.getenv("AIMD_LATENCY_TOLERANCE", "2.0"))
+    AIMD_ERROR_RATE: float = float(os.getenv("AIMD_ERROR_RATE", "0.5"))
+    AIMD_DECREASE_FACTOR: float = float(os.getenv("AIMD_DECREASE_FACTOR", "0.7"))
 
     # BLPOP timeout in seconds (controls shutdown responsiveness)
     QUEUE_POLL_TIMEOUT: int = int(os.getenv("QUEUE_POLL_TIMEOUT", "1"))
 
-    # How often the retry scheduler checks for due jobs (seconds)
-    RETRY_POLL_INTERVAL: float = float(os.getenv("RETRY_POLL_INTERVAL", "1.0"))
+    # Upper bound on how long the retry scheduler sleeps between checks
+    # (seconds). It normally sleeps until the earliest due retry or until a
+    # wake-up on RETRY_WAKE_CHANNEL; this is only a safety net.
+    RETRY_POLL_INTERVAL: float = float(os.getenv("RETRY_POLL_INTERVAL", "5.0"))
+
+    # Retry promotion batch size adapts between these bounds
+    RETRY_BATCH_MIN: int = int(os.getenv("RETRY_BATCH_MIN", "100"))
+    RETRY_BATCH_MAX: int = int(os.getenv("RETRY_BATCH_MAX", "1000"))
+
+    # Pub/sub channel announcing newly scheduled retries (payload: retry-at score)
+    RETRY_WAKE_CHANNEL: str = os.getenv("RETRY_WAKE_CHANNEL", "retry_queue:wake")
+
+    # Pub/sub channel carrying comma-separated ids of cancelled running jobs —
+    # must match the API's CANCEL_CHANNEL in app/cancellation.py
+    CANCEL_CHANNEL: str = os.getenv("CANCEL_CHANNEL", "job_cancel")
+
+    # Redis lease electing the single replica that runs the retry scheduler
+    RETRY_LEADER_KEY: str = os.getenv("RETRY_LEADER_KEY", "retry_scheduler:leader")
+    LEADER_LEASE_TTL: float = float(os.getenv("LEADER_LEASE_TTL", "10.0"))
+
+    # Pool sizes for handlers declared with mode="thread" / mode="process"
+    THREAD_POOL_SIZE: int = int(os.getenv("THREAD_POOL_SIZE", "8"))
+    PROCESS_POOL_SIZE: int = int(os.getenv("PROCESS_POOL_SIZE", str(os.cpu_count() or 1)))
+
+    # Handler timeout (seconds) for job types whose HandlerSpec sets none
+    DEFAULT_JOB_TIMEOUT: float = float(os.getenv("DEFAULT_JOB_TIMEOUT", "300"))
+
+    # Group-commit job status transitions (see app/status_writer.py for the
+    # durability trade-off). Off by default.
+    STATUS_WRITE_BEHIND: bool = os.getenv("STATUS_WRITE_BEHIND", "false").lower() == "true"
+    STATUS_FLUSH_INTERVAL_MS: float = float(os.getenv("STATUS_FLUSH_INTERVAL_MS", "5"))
+    STATUS_FLUSH_MAX_BATCH: int = int(os.getenv("STATUS_FLUSH_MAX_BATCH", "500"))
+
+    # Tracing (app/tracing.py): fraction of new traces sampled, and where
+    # finished spans go (JSON-lines file and/or HTTP collector). Off by default.
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    TRACE_EXPORT_FILE: str | None = os.getenv("TRACE_EXPORT_FILE")
+    TRACE_EXPORT_URL: str | None = os.getenv("TRACE_EXPORT_URL")
+    TRACE_EXPORT_INTERVAL: float = float(os.getenv("TRACE_EXPORT_INTERVAL", "2.0"))
+
+    # Event-loop lag sampling (app/diagnostics.py): sample period, and how
+    # long the loop must be blocked before the watchdog logs its stack
+    LOOP_LAG_INTERVAL: float = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+    LOOP_STALL_THRESHOLD_MS: float = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "500"))
+
+    # /debug/tasks and /debug/profile on the health server (stack traces,
+    # source paths and a sampling profiler). Off by default because the
+    # health server listens on all interfaces; only enable on an internal port.
+    DEBUG_ENDPOINTS: bool = os.getenv("DEBUG_ENDPOINTS", "false").lower() == "true"
+
+    # Logging (app/log_config.py): cap on per-job INFO lines per second
+    # (0 = keep all; warnings and errors are never dropped), and how many
+    # INFO records may wait for the writer thread before new ones are
+    # dropped (warnings and errors get extra headroom on top)
+    LOG_JOB_INFO_RATE: float = float(os.getenv("LOG_JOB_INFO_RATE", "0"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
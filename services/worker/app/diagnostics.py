@@ -0,0 +1,207 @@
+"""Live diagnostics for a stalled or slow worker, served by the health server.
+
+* ``LoopMonitor`` samples event-loop lag: a task sleeps ``interval`` and
+  records how late it woke up into a fixed-bucket histogram. A watchdog
+  thread notices when that task stops waking up at all (something is
+  blocking the loop) and logs the loop thread's stack while it is still
+  stuck, so the offending call shows up by name.
+* ``dump_tasks`` describes in-flight job tasks: job id, what the job is
+  doing (``set_phase``), for how long, what it is awaiting and its stack.
+* ``sample_profile`` is a sampling profiler for the loop thread, run from
+  another thread for N seconds; output is folded stacks (flame-graph input).
+"""
+
+import asyncio
+import io
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Loop lag histogram upper bounds (ms); the last bucket is unbounded
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Profile captures are capped so a typo can't tie up a thread for an hour
+MAX_PROFILE_SECONDS = 60
+
+# task -> (phase, monotonic time it was entered)
+task_phases: "weakref.WeakKeyDictionary[asyncio.Task, tuple[str, float]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def set_phase(phase: str) -> None:
+    """Record what the current task is doing, for ``dump_tasks``."""
+    task = asyncio.current_task()
+    if task is not None:
+        task_phases[task] = (phase, time.monotonic())
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, stall_threshold: float):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.stalls = 0
+        self.last_stall: dict | None = None
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._heartbeat = now = time.monotonic()
+            self.record(max(0.0, now - expected))
+
+    def record(self, lag: float) -> None:
+        lag_ms = lag * 1000
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self.last_lag = lag
+        for i, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def _watch(self) -> None:
+        """Runs in its own thread: log the loop's stack once per stall."""
+        reported = None
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.stall_threshold or heartbeat == reported:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            self.stalls += 1
+            self.last_stall = {
+                "at": time.time(),
+                "blocked_for_ms": round(blocked_for * 1000, 1),
+                "stack": stack,
+            }
+            logger.warning(
+                "Event loop blocked for over %.0fms, currently in:\n%s",
+                blocked_for * 1000,
+                stack,
+            )
+
+    def snapshot(self) -> dict:
+        cumulative, histogram = 0, {}
+        for bound, count in zip((*LAG_BUCKETS_MS, "+Inf"), self.buckets):
+            cumulative += count
+            histogram[str(bound)] = cumulative
+        avg = self.total_lag / self.samples if self.samples else 0.0
+        return {
+            "lag_ms": round(self.last_lag * 1000, 2),
+            "lag_avg_ms": round(avg * 1000, 2),
+            "lag_max_ms": round(self.max_lag * 1000, 2),
+            "lag_histogram_ms": histogram,
+            "samples": self.samples,
+            "stalls": self.stalls,
+            "last_stall": self.last_stall,
+        }
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+
+
+monitor: LoopMonitor | None = None
+
+
+def init_loop_monitor(interval: float, stall_threshold: float) -> None:
+    global monitor
+    monitor = LoopMonitor(interval, stall_threshold)
+    monitor.start()
+
+
+async def close_loop_monitor() -> None:
+    global monitor
+    if monitor:
+        await monitor.close()
+        monitor = None
+
+
+def _awaiting(task: asyncio.Task) -> str | None:
+    """Innermost object the task's coroutine chain is suspended on."""
+    awaited, target = task.get_coro(), None
+    while awaited is not None:
+        target = awaited
+        awaited = getattr(awaited, "cr_await", None) or getattr(awaited, "gi_yieldfrom", None)
+    return None if target is task.get_coro() else repr(target)[:200]
+
+
+def dump_tasks(tasks) -> list[dict]:
+    now = time.monotonic()
+    dump = []
+    for task in tasks:
+        if task.done():
+            continue
+        name = task.get_name()
+        phase, since = task_phases.get(task, (None, None))
+        stack = io.StringIO()
+        task.print_stack(file=stack)
+        dump.append({
+            "task": name,
+            "job_id": name.removeprefix("job:") if name.startswith("job:") else None,
+            "phase": phase,
+            "phase_age_s": round(now - since, 3) if since is not None else None,
+            "awaiting": _awaiting(task),
+            "stack": stack.getvalue(),
+        })
+    dump.sort(key=lambda entry: entry["phase_age_s"] or 0.0, reverse=True)
+    return dump
+
+
+def sample_profile(thread_id: int, seconds: float, interval: float = 0.005) -> Counter:
+    """Sample ``thread_id``'s stack every ``interval`` for ``seconds``.
+
+    Blocking: call it from a worker thread. Returns folded stacks
+    (``file:function;...`` root first) -> sample count.
+    """
+    samples: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_filename}:{code.co_name}")
+                frame = frame.f_back
+            samples[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return samples
+
+
+def format_folded(samples: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
@@ -0,0 +1,170 @@
+"""Managed thread/process pools for handlers that block or burn CPU.
+
+Handlers declared with ``mode="thread"`` or ``mode="process"`` are plain
+(sync) functions. They run here instead of on the event loop so a slow
+library call or a tight CPU loop can't stall every other in-flight job.
+
+This module is deliberately free of ``app.config`` imports: process-pool
+children import it to unpickle ``_timed_call`` and should stay cheap.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+pools: dict[str, Executor] = {}
+
+# Process pools replaced after a call timed out (an insertion-ordered set),
+# and the number of calls each pool is still awaiting
+_retired: dict[Executor, None] = {}
+_awaited: dict[Executor, int] = {}
+_process_workers = 1
+
+
+class PoolStats:
+    """Running counters for one pool, including time spent waiting for a free slot."""
+
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.completed = 0
+        self.abandoned = 0
+        self.queue_wait_total_s = 0.0
+        self.queue_wait_max_s = 0.0
+
+    def record(self, wait_s: float) -> None:
+        self.completed += 1
+        self.queue_wait_total_s += wait_s
+        self.queue_wait_max_s = max(self.queue_wait_max_s, wait_s)
+
+    def snapshot(self) -> dict:
+        avg = self.queue_wait_total_s / self.completed if self.completed else 0.0
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "abandoned": self.abandoned,
+            "queued": self.submitted - self.completed - self.abandoned,
+            "queue_wait_avg_ms": round(avg * 1000, 2),
+            "queue_wait_max_ms": round(self.queue_wait_max_s * 1000, 2),
+        }
+
+
+stats: dict[str, PoolStats] = {}
+
+
+def _timed_call(
+    func: Callable[[dict], Any], payload: dict, submitted_at: float
+) -> tuple[float, BaseException | None, Any]:
+    """Run ``func`` inside the pool and report how long it sat in the pool's queue.
+
+    Exceptions are returned rather than raised so the wait time is still
+    recorded for failed jobs. ``time.monotonic`` is a host-wide clock on
+    Linux, so the delta is valid across the process boundary as well.
+    """
+    started_at = time.monotonic()
+    try:
+        return started_at - submitted_at, None, func(payload)
+    except Exception as exc:
+        return started_at - submitted_at, exc, None
+
+
+def _new_process_pool() -> ProcessPoolExecutor:
+    # "spawn" avoids forking a process that already has an event loop and
+    # open sockets
+    return ProcessPoolExecutor(
+        max_workers=_process_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def _terminate(pool: Executor) -> None:
+    """Shut ``pool`` down without waiting; kill its processes if it has any."""
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    for process in processes:
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _retire(pool: Executor) -> None:
+    """Swap in a fresh process pool after a call in ``pool`` was abandoned.
+
+    A timed-out call keeps its child busy until it returns, possibly never.
+    New calls go to the fresh pool; the old one is terminated as soon as
+    the calls still awaiting it are done.
+    """
+    if pools.get("process") is pool:
+        pools["process"] = _new_process_pool()
+        _retired[pool] = None
+
+
+def _reap() -> None:
+    for pool in [pool for pool in _retired if not _awaited.get(pool)]:
+        del _retired[pool]
+        _awaited.pop(pool, None)
+        _terminate(pool)
+
+
+def init_executors(thread_workers: int, process_workers: int) -> None:
+    global _process_workers
+    _process_workers = process_workers
+    # Both pools spin up workers lazily on first submit, so creating them
+    # costs nothing when no handler uses that mode.
+    pools["thread"] = ThreadPoolExecutor(
+        max_workers=thread_workers, thread_name_prefix="job-handler"
+    )
+    pools["process"] = _new_process_pool()
+    for mode in pools:
+        stats[mode] = PoolStats()
+
+
+def close_executors() -> None:
+    """Shut the pools down without blocking on calls that never returned.
+
+    In-flight jobs have been drained by now, so anything still running in
+    a pool was abandoned after a timeout. Process workers are terminated.
+    Threads can't be killed: a hung thread-mode handler is left running.
+    """
+    for pool in [*pools.values(), *_retired]:
+        _terminate(pool)
+    pools.clear()
+    _retired.clear()
+    _awaited.clear()
+
+
+async def run_in_pool(mode: str, func: Callable[[dict], Any], payload: dict) -> Any:
+    """Run a sync handler in the pool for ``mode`` and await its result.
+
+    ``func`` must be a module-level function in process mode: only its
+    qualified name and the payload dict are pickled to the child.
+    """
+    pool = pools.get(mode)
+    if pool is None:
+        raise RuntimeError(f"No executor pool initialized for mode '{mode}'")
+
+    pool_stats = stats[mode]
+    pool_stats.submitted += 1
+    loop = asyncio.get_running_loop()
+    _awaited[pool] = _awaited.get(pool, 0) + 1
+    try:
+        wait_s, error, result = await loop.run_in_executor(
+            pool, _timed_call, func, payload, time.monotonic()
+        )
+    except asyncio.CancelledError:
+        # Timed out or cancelled: the pool keeps running the call, but the
+        # job no longer waits on it. A thread can't be stopped; a process
+        # pool is replaced so the stuck child doesn't hold a slot.
+        pool_stats.abandoned += 1
+        if mode == "process":
+            _retire(pool)
+        raise
+    finally:
+        _awaited[pool] -= 1
+        _reap()
+    pool_stats.record(wait_s)
+    if error is not None:
+        raise error
+    return result
+
+
+def get_stats() -> dict[str, dict]:
+    return {mode: pool_stats.snapshot() for mode, pool_stats in stats.items()}
@@ -1,16 +1,129 @@
-from typing import Awaitable, Callable
+import functools
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Literal
 
-from app.handlers.email_send import handle_email_send
+from app import batching, executors, result_cache
+from app.handlers.email_send import handle_email_send, handle_email_send_batch
 from app.handlers.report_generate import handle_report_generate
+from app.retry_policy import DEFAULT_RETRY_POLICY, InvalidPayloadError, RetryPolicy
 
 JobHandler = Callable[[dict], Awaitable[dict | None]]
 
-HANDLERS: dict[str, JobHandler] = {
-    "report.generate": handle_report_generate,
-    "email.send": handle_email_send,
+# Takes the payloads of several same-type jobs and returns one outcome per
+# payload, in order: the job's result, or an Exception instance if it failed.
+BatchJobHandler = Callable[[list[dict]], Awaitable[list[Any]]]
+
+# "async"   -> coroutine function awaited directly on the event loop
+# "thread"  -> sync function run in the shared ThreadPoolExecutor (blocking I/O)
+# "process" -> module-level sync function run in the ProcessPoolExecutor (CPU work)
+ExecutionMode = Literal["async", "thread", "process"]
+
+
+class JobTimeoutError(Exception):
+    """Raised when a handler runs past its timeout and is cancelled."""
+
+
+@dataclass(frozen=True)
+class BatchSpec:
+    # Same execution mode as the owning HandlerSpec
+    func: Callable[[list[dict]], Any]
+    # Call the batch handler once this many jobs are waiting...
+    max_size: int = 50
+    # ...or this many seconds after the first one arrived
+    max_wait: float = 0.02
+
+
+@dataclass(frozen=True)
+class ResultCacheSpec:
+    # Only for deterministic types: identical (type, payload) -> same result
+    ttl: float = 3600.0
+    max_entries: int = 1000
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    # Cluster-wide: shared by all worker replicas through one Redis bucket
+    rate: float  # jobs per second
+    burst: int = 1
+
+
+@dataclass(frozen=True)
+class HandlerSpec:
+    func: Callable[[dict], Any]
+    mode: ExecutionMode = "async"
+    # Default handler timeout in seconds; a job's own timeout_seconds wins.
+    # None falls back to Config.DEFAULT_JOB_TIMEOUT.
+    timeout: float | None = None
+    retry: RetryPolicy = DEFAULT_RETRY_POLICY
+    # When set, jobs of this type are grouped and run through batch.func
+    batch: BatchSpec | None = None
+    # When set, results are cached and identical jobs in flight run once
+    cache: ResultCacheSpec | None = None
+    # Throughput cap protecting a downstream service; excess jobs are deferred
+    rate_limit: RateLimit | None = None
+
+
+HANDLERS: dict[str, HandlerSpec] = {
+    "report.generate": HandlerSpec(
+        handle_report_generate,
+        timeout=30.0,
+        retry=RetryPolicy(base_delay=2.0, max_delay=300.0, jitter="decorrelated"),
+        cache=ResultCacheSpec(ttl=3600.0, max_entries=1000),
+    ),
+    "email.send": HandlerSpec(
+        handle_email_send,
+        timeout=10.0,
+        retry=RetryPolicy(
+            base_delay=1.0, max_delay=60.0, jitter="full", fail_fast=(InvalidPayloadError,)
+        ),
+        batch=BatchSpec(handle_email_send_batch, max_size=50, max_wait=0.02),
+        rate_limit=RateLimit(rate=50.0, burst=50),
+    ),
 }
 
 
-def get_handler(job_type: str) -> JobHandler | None:
-    """Look up a handler for the given job type. Returns None if unknown."""
+def get_spec(job_type: str) -> HandlerSpec | None:
+    """Look up the registry entry for the given job type. Returns None if unknown."""
     return HANDLERS.get(job_type)
+
+
+def get_retry_policy(job_type: str) -> RetryPolicy:
+    """Retry policy for the job type, or the default for unknown types."""
+    spec = HANDLERS.get(job_type)
+    return spec.retry if spec is not None else DEFAULT_RETRY_POLICY
+
+
+def get_rate_limit(job_type: str) -> RateLimit | None:
+    """Throughput limit for the job type, or None if it is unlimited."""
+    spec = HANDLERS.get(job_type)
+    return spec.rate_limit if spec is not None else None
+
+
+def get_handler(job_type: str) -> JobHandler | None:
+    """Look up a handler for the given job type. Returns None if unknown.
+
+    The result is always awaitable, whatever the declared execution mode.
+    For batched types it resolves when the job's batch has run; for cached
+    types it may come from the result cache without running anything.
+    """
+    spec = HANDLERS.get(job_type)
+    if spec is None:
+        return None
+    if spec.batch is not None:
+        batch_func = _awaitable(spec.mode, spec.batch.func)
+        handler = batching.get_batcher(
+            job_type, batch_func, spec.batch.max_size, spec.batch.max_wait
+        ).submit
+    else:
+        handler = _awaitable(spec.mode, spec.func)
+    if spec.cache is not None:
+        handler = functools.partial(
+            result_cache.run_cached, job_type, handler, spec.cache.ttl, spec.cache.max_entries
+        )
+    return handler
+
+
+def _awaitable(mode: ExecutionMode, func: Callable) -> Callable:
+    if mode == "async":
+        return func
+    return functools.partial(executors.run_in_pool, mode, func)
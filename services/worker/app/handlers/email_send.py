@@ -1,12 +1,21 @@
 import asyncio
 import logging
 
+from app.retry_policy import InvalidPayloadError
+
 logger = logging.getLogger(__name__)
 
 
+def _recipient(payload: dict) -> str:
+    to = payload.get("to")
+    if not isinstance(to, str) or not to:
+        raise InvalidPayloadError("email.send payload needs a 'to' address")
+    return to
+
+
 async def handle_email_send(payload: dict) -> dict:
-    """Simulate sending an email. Always succeeds."""
-    to = payload.get("to", "unknown@example.com")
+    """Simulate sending an email. Succeeds for any payload with a recipient."""
+    to = _recipient(payload)
     subject = payload.get("subject", "(no subject)")
 
     logger.info("Sending email to '%s' with subject '%s'", to, subject)
@@ -14,3 +23,22 @@ async def handle_email_send(payload: dict) -> dict:
     logger.info("Email sent successfully to '%s'", to)
 
     return {"to": to, "subject": subject, "delivered": True}
+
+
+async def handle_email_send_batch(payloads: list[dict]) -> list[dict]:
+    """Simulate sending several emails over one SMTP session."""
+    logger.info("Opening SMTP session for %d email(s)", len(payloads))
+    # One connect/auth handshake, then a short send per message
+    await asyncio.sleep(1.0 + 0.05 * len(payloads))
+
+    results = []
+    for payload in payloads:
+        try:
+            to = _recipient(payload)
+        except InvalidPayloadError as exc:
+            results.append(exc)
+            continue
+        subject = payload.get("subject", "(no subject)")
+        results.append({"to": to, "subject": subject, "delivered": True})
+    logger.info("SMTP session closed, %d email(s) sent", len(payloads))
+    return results
@@ -0,0 +1,175 @@
+"""Lean data access for the worker's per-job hot path.
+
+Module-level SQLAlchemy Core statements against the ``jobs`` table with
+bind parameters: no identity map, unit-of-work flush or attribute
+instrumentation per job. Because each statement object is built once, its
+compiled form is reused from SQLAlchemy's statement cache, and asyncpg
+reuses the server-side prepared statement for it (the dialect's
+prepared_statement_cache_size). The ORM model is still used for schema.
+"""
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import bindparam, case, select, update
+
+from app.models import Job
+
+jobs = Job.__table__
+
+CLAIMABLE = ("pending", "retrying")
+
+# Claim by id (bare-id messages): SELECT + UPDATE collapsed into one statement
+CLAIM_JOB = (
+    update(jobs)
+    .where(jobs.c.id == bindparam("job_id"), jobs.c.status.in_(CLAIMABLE))
+    .values(
+        status="processing",
+        attempts=jobs.c.attempts + 1,
+        started_at=bindparam("now"),
+        updated_at=bindparam("now"),
+    )
+    .returning(
+        jobs.c.id,
+        jobs.c.type,
+        jobs.c.payload,
+        jobs.c.attempts,
+        jobs.c.max_attempts,
+        jobs.c.timeout_seconds,
+        jobs.c.traceparent,
+    )
+)
+
+# Claim for fat messages: the payload is already in hand, don't read it back
+CLAIM_JOB_NO_PAYLOAD = (
+    update(jobs)
+    .where(jobs.c.id == bindparam("job_id"), jobs.c.status.in_(CLAIMABLE))
+    .values(
+        status="processing",
+        attempts=jobs.c.attempts + 1,
+        started_at=bindparam("now"),
+        updated_at=bindparam("now"),
+    )
+    .returning(
+        jobs.c.attempts, jobs.c.max_attempts, jobs.c.timeout_seconds, jobs.c.traceparent
+    )
+)
+
+# Undo a claim for a job that is being deferred, not run: it goes back to
+# the status it was claimed from without having used an attempt. Only
+# retries have attempts behind them (new, requeued and manually retried
+# jobs start at 0), so the claim's attempt count tells the two apart.
+UNCLAIM_JOB = (
+    update(jobs)
+    .where(jobs.c.id == bindparam("job_id"), jobs.c.status == "processing")
+    .values(
+        status=case((jobs.c.attempts > 1, "retrying"), else_="pending"),
+        attempts=jobs.c.attempts - 1,
+        started_at=None,
+        updated_at=bindparam("now"),
+    )
+)
+
+GET_STATE = select(jobs.c.status, jobs.c.type).where(jobs.c.id == bindparam("job_id"))
+
+LOAD_JOB = select(
+    jobs.c.id,
+    jobs.c.type,
+    jobs.c.payload,
+    jobs.c.attempts,
+    jobs.c.max_attempts,
+    jobs.c.timeout_seconds,
+    jobs.c.traceparent,
+).where(jobs.c.id == bindparam("job_id"))
+
+# A job cancelled through the API while it ran keeps its "cancelled" status
+SET_STATUS = (
+    update(jobs)
+    .where(jobs.c.id == bindparam("job_id"), jobs.c.status != "cancelled")
+    .values(
+        status=bindparam("new_status"),
+        error_message=bindparam("error_message"),
+        updated_at=bindparam("now"),
+    )
+)
+
+
+@dataclass(slots=True)
+class JobRecord:
+    """The columns the worker needs for a claimed job, plus its pending transition."""
+
+    id: uuid.UUID
+    type: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+    timeout_seconds: int | None = None
+    traceparent: str | None = None
+    status: str = "processing"
+    error_message: str | None = None
+    updated_at: datetime | None = None
+
+    @classmethod
+    def from_row(cls, row) -> "JobRecord":
+        return cls(
+            id=row.id,
+            type=row.type,
+            payload=row.payload,
+            attempts=row.attempts,
+            max_attempts=row.max_attempts,
+            timeout_seconds=row.timeout_seconds,
+            traceparent=row.traceparent,
+        )
+
+
+async def claim(session, job_id: uuid.UUID, now: datetime) -> JobRecord | None:
+    result = await session.execute(CLAIM_JOB, {"job_id": job_id, "now": now})
+    row = result.one_or_none()
+    return JobRecord.from_row(row) if row is not None else None
+
+
+async def claim_with_payload(
+    session, job_id: uuid.UUID, job_type: str, payload: dict, now: datetime
+) -> JobRecord | None:
+    result = await session.execute(CLAIM_JOB_NO_PAYLOAD, {"job_id": job_id, "now": now})
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return JobRecord(
+        id=job_id,
+        type=job_type,
+        payload=payload,
+        attempts=row.attempts,
+        max_attempts=row.max_attempts,
+        timeout_seconds=row.timeout_seconds,
+        traceparent=row.traceparent,
+    )
+
+
+async def unclaim(session, job_id: uuid.UUID, now: datetime) -> None:
+    await session.execute(UNCLAIM_JOB, {"job_id": job_id, "now": now})
+
+
+async def get_state(session, job_id: uuid.UUID):
+    """(status, type) row of a job, or None if it doesn't exist."""
+    result = await session.execute(GET_STATE, {"job_id": job_id})
+    return result.one_or_none()
+
+
+async def load(session, job_id: uuid.UUID) -> JobRecord | None:
+    result = await session.execute(LOAD_JOB, {"job_id": job_id})
+    row = result.one_or_none()
+    return JobRecord.from_row(row) if row is not None else None
+
+
+async def set_status(session, record: JobRecord) -> None:
+    await session.execute(
+        SET_STATUS,
+        {
+            "job_id": record.id,
+            "new_status": record.status,
+            "error_message": record.error_message,
+            "now": record.updated_at,
+        },
+    )
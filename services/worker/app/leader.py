@@ -0,0 +1,67 @@
+import uuid
+
+from redis.asyncio import Redis
+
+# Extend the lease only if we still own it (a paused leader must not
+# re-extend a lease another replica has since taken over).
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# (client, renew, release): registered once per Redis client, since the
+# result cache creates a short-lived lease for every miss
+_scripts: tuple | None = None
+
+
+def _registered(redis: Redis) -> tuple:
+    global _scripts
+    if _scripts is None or _scripts[0] is not redis:
+        _scripts = (
+            redis,
+            redis.register_script(RENEW_LEASE_SCRIPT),
+            redis.register_script(RELEASE_LEASE_SCRIPT),
+        )
+    return _scripts[1], _scripts[2]
+
+
+class LeaderLease:
+    """Redis lease electing one replica to run a singleton loop.
+
+    Call ``acquire()`` at least every ``renew_interval`` seconds: it renews
+    the lease when held and tries to take it over when it has expired.
+    """
+
+    def __init__(self, redis: Redis, key: str, ttl_seconds: float):
+        self.redis = redis
+        self.key = key
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.token = uuid.uuid4().hex
+        self.is_leader = False
+        self._renew, self._release = _registered(redis)
+
+    @property
+    def renew_interval(self) -> float:
+        return self.ttl_ms / 1000 / 3
+
+    async def acquire(self) -> bool:
+        if self.is_leader and await self._renew(keys=[self.key], args=[self.token, self.ttl_ms]):
+            return True
+        acquired = await self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms)
+        self.is_leader = bool(acquired)
+        return self.is_leader
+
+    async def release(self) -> None:
+        if self.is_leader:
+            await self._release(keys=[self.key], args=[self.token])
+            self.is_leader = False
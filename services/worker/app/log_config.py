@@ -1,18 +1,48 @@
-import json
+"""JSON logging kept off the event loop.
+
+Log calls only filter the record and put it on an in-memory queue; a
+``QueueListener`` thread formats it (orjson when installed) and writes it to
+stdout, so a slow stdout pipe can't stall the loop. The last
+``reserve`` slots of the queue are kept for warnings and errors: once the
+rest is full, INFO and DEBUG records are dropped and counted. Warnings and
+errors still fit in the reserve, so they survive a burst of INFO lines;
+only if that fills too (the writer is stuck) are they dropped, counted
+separately. Nothing ever waits on the event loop thread.
+
+Per-job INFO lines (records carrying a ``job_id``) can be capped at
+``job_info_rate`` per second; warnings and errors are always kept.
+"""
+
 import logging
+import queue
 import sys
 from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import orjson
+
+    def _dumps(entry: dict) -> str:
+        return orjson.dumps(entry).decode()
+
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    import json
+
+    _dumps = json.dumps
+
+EXTRA_FIELDS = ("job_id", "job_type", "status", "attempts", "error", "duration_ms", "retry_delay_s")
 
 
 class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         log_entry = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            # When the call was made, not when the listener got to it
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
-        for key in ("job_id", "job_type", "status", "attempts", "error", "duration_ms", "retry_delay_s"):
+        for key in EXTRA_FIELDS:
             value = getattr(record, key, None)
             if value is not None:
                 log_entry[key] = value if isinstance(value, (int, float, bool)) else str(value)
@@ -20,18 +50,110 @@ class JSONFormatter(logging.Formatter):
         if record.exc_info and record.exc_info[0] is not None:
             log_entry["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_entry)
+        return _dumps(log_entry)
+
+
+class JobLogSampler(logging.Filter):
+    """Keep at most ``rate`` per-job INFO/DEBUG records per second (0 = all)."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+        self._window = 0
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        if getattr(record, "job_id", None) is None:
+            return True
+        window = int(record.created)
+        if window != self._window:
+            self._window, self._count = window, 0
+        self._count += 1
+        if self._count <= self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
 
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue, reserve: int = 0):
+        super().__init__(log_queue)
+        # INFO/DEBUG records only fill the queue up to this size
+        self.limit = max(1, log_queue.maxsize - reserve) if log_queue.maxsize > 0 else 0
+        self.dropped = 0
+        self.dropped_errors = 0
 
-def setup_logging() -> None:
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JSONFormatter())
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve %-args now (they may be mutated later); the listener
+        # thread does the formatting. Unlike the stdlib version, exc_info is
+        # kept: this queue never leaves the process.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if record.levelno < logging.WARNING and self.limit and self.queue.qsize() >= self.limit:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                self.dropped_errors += 1
+            else:
+                self.dropped += 1
+
+
+class _FlushingListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail the final flush on a full queue
+        self.queue.put(self._sentinel)
+
+
+_listener: QueueListener | None = None
+_handler: NonBlockingQueueHandler | None = None
+_sampler: JobLogSampler | None = None
+
+
+def setup_logging(job_info_rate: float = 0, queue_size: int = 10000) -> None:
+    global _listener, _handler, _sampler
+    close_logging()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+
+    _sampler = JobLogSampler(job_info_rate)
+    reserve = max(100, queue_size // 10)
+    _handler = NonBlockingQueueHandler(queue.Queue(queue_size + reserve), reserve)
+    _handler.addFilter(_sampler)
+    _listener = _FlushingListener(_handler.queue, stream_handler)
+    _listener.start()
 
     root_logger = logging.getLogger()
     root_logger.handlers.clear()
-    root_logger.addHandler(handler)
+    root_logger.addHandler(_handler)
     root_logger.setLevel(logging.INFO)
 
     # Quiet down noisy libraries
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
     logging.getLogger("redis").setLevel(logging.WARNING)
+
+
+def close_logging() -> None:
+    """Write out everything still queued (call last on shutdown)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_stats() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "dropped_errors": _handler.dropped_errors if _handler else 0,
+        "sampled_out": _sampler.sampled_out if _sampler else 0,
+    }
@@ -2,6 +2,7 @@ import asyncio
 import logging
 import os
 import signal
+import threading
 import time
 import uuid
 from aiohttp import web
@@ -12,31 +13,63 @@ def _utcnow() -> datetime:
     """Return a naive UTC datetime (matches TIMESTAMP WITHOUT TIME ZONE columns)."""
     return datetime.now(timezone.utc).replace(tzinfo=None)
 
-from sqlalchemy import select
-
 from app.config import Config
+from app.concurrency import AdaptiveLimiter
 from app import database as db
-from app.handlers import get_handler
-from app.log_config import setup_logging
-from app.models import Job
+from app import diagnostics
+from app import executors
+from app.handlers import (
+    JobTimeoutError,
+    get_handler,
+    get_rate_limit,
+    get_retry_policy,
+    get_spec,
+)
+from app import job_store
+from app import queue_stats
+from app.job_store import JobRecord
+from app.leader import LeaderLease
+from app.schedules import materialize_due_schedules
+from app import status_writer
+from app import throttle
+from app import tracing
+from app import log_config
+from app.queue_message import QueueMessage, decode_message
 from app import redis_client as rc
 
 logger = logging.getLogger(__name__)
 
 shutdown_event = asyncio.Event()
 in_flight_tasks: set[asyncio.Task] = set()
-
-# Lua script: atomically move due jobs from retry ZSET to main queue.
-# Prevents double-queuing even with multiple worker instances.
+# Jobs whose task was cancelled through CANCEL_CHANNEL, to tell that apart
+# from other cancellations
+cancel_requested: set[uuid.UUID] = set()
+limiter: AdaptiveLimiter | None = None
+
+# Lua script: atomically move up to ARGV[2] due jobs from retry ZSET to main
+# queue. Prevents double-queuing even with multiple worker instances.
+# Returns {promoted_count, earliest_remaining_score} (score omitted when the
+# set is empty; returned as a string so Lua doesn't truncate it to an int).
+# Members are moved in chunks: unpack() fails past Lua's C stack limit
+# (~8000 values), and RETRY_BATCH_MAX may be configured above that.
 PROMOTE_RETRY_SCRIPT = """
-local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 10)
-for _, member in ipairs(members) do
-    redis.call('ZREM', KEYS[1], member)
-    redis.call('RPUSH', KEYS[2], member)
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for i = 1, #members, 1000 do
+    local last = math.min(i + 999, #members)
+    redis.call('ZREM', KEYS[1], unpack(members, i, last))
+    redis.call('RPUSH', KEYS[2], unpack(members, i, last))
+end
+local head = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if #head == 0 then
+    return {#members}
 end
-return #members
+return {#members, head[2]}
 """
 
+# Set when a retry is scheduled earlier than the scheduler's planned wake-up
+retry_wakeup = asyncio.Event()
+retry_next_wake_at: float = 0.0
+
 
 def handle_signal(sig: int, _frame) -> None:
     logger.info(
@@ -46,68 +79,247 @@ def handle_signal(sig: int, _frame) -> None:
     shutdown_event.set()
 
 
-async def process_job(job_id_str: str, semaphore: asyncio.Semaphore) -> None:
-    async with semaphore:
-        start_time = time.monotonic()
+def resolve_timeout(job: JobRecord) -> float:
+    """Per-job timeout if set, else the handler's default, else the global default."""
+    if job.timeout_seconds is not None:
+        return float(job.timeout_seconds)
+    spec = get_spec(job.type)
+    if spec is not None and spec.timeout is not None:
+        return spec.timeout
+    return Config.DEFAULT_JOB_TIMEOUT
+
+
+async def save_status(session, job: JobRecord, wait: bool = True) -> None:
+    """Persist a status transition already applied to ``job``.
+
+    Writes it with one UPDATE and commits, or hands it to the group-commit
+    writer when STATUS_WRITE_BEHIND is on (``wait=False`` = don't wait for
+    the flush).
+    """
+    writer = status_writer.writer
+    if writer is None:
+        await job_store.set_status(session, job)
+        await session.commit()
+        return
+    future = writer.submit(job.id, job.status, job.error_message, job.updated_at, wait=wait)
+    if future is not None:
+        await future
+
+
+def report_outcome(
+    semaphore: asyncio.Semaphore | AdaptiveLimiter,
+    job_type: str,
+    handler_latency: float,
+    db_latency: float,
+    failed: bool,
+) -> None:
+    """Feed a finished job back into the adaptive limiter (no-op for a plain semaphore)."""
+    if isinstance(semaphore, AdaptiveLimiter):
+        semaphore.observe(job_type, handler_latency, db_latency, failed)
+
+
+async def claim_from_message(session, message: QueueMessage, log_extra: dict) -> JobRecord | None:
+    """Claim a job from a fat queue message; the payload comes from the message."""
+    log_extra["job_type"] = message.job_type
+    job = await job_store.claim_with_payload(
+        session, message.job_id, message.job_type, message.payload, _utcnow()
+    )
+    if job is None:
+        logger.warning(
+            "Job not found or not 'pending'/'retrying', skipping", extra=log_extra
+        )
+        await queue_stats.mark_started(message.job_type, message.job_id)
+        return None
+    await session.commit()
+    return job
+
+
+async def claim_from_db(session, job_id: uuid.UUID, log_extra: dict) -> JobRecord | None:
+    """Move the job to 'processing' and read its row back (id-only queue messages)."""
+    job = await job_store.claim(session, job_id, _utcnow())
+    if job is None:
+        # Only the unhappy path pays for a second query, to say why
+        state = await job_store.get_state(session, job_id)
+        if state is None:
+            logger.warning("Job not found in database, skipping", extra=log_extra)
+        else:
+            if state.status == "cancelled":
+                logger.info("Job was cancelled, skipping", extra=log_extra)
+            else:
+                logger.warning(
+                    "Job status is '%s', expected 'pending' or 'retrying', skipping",
+                    state.status,
+                    extra=log_extra,
+                )
+            await queue_stats.mark_started(state.type, job_id)
+        return None
+
+    log_extra["job_type"] = job.type
+    await session.commit()
+    return job
+
+
+async def throttle_delay(job_type: str) -> float:
+    """Seconds to defer a job of this type by, or 0.0 if it may run now."""
+    limit = get_rate_limit(job_type)
+    if limit is None:
+        return 0.0
+    return await throttle.acquire(job_type, limit.rate, limit.burst)
+
+
+async def defer_job(job_id: uuid.UUID, delay: float, log_extra: dict) -> None:
+    """Re-queue a rate-limited job through the retry ZSET without using an attempt.
+
+    Schedulers already plan to wake for the earliest entry, so they are only
+    woken when this deferral goes ahead of it. A backlog of throttled jobs
+    would otherwise publish (and wake every replica) once per deferral.
+    """
+    run_at = time.time() + delay
+    pipe = rc.redis_client.pipeline(transaction=False)
+    pipe.zrange(Config.RETRY_QUEUE_NAME, 0, 0, withscores=True)
+    pipe.zadd(Config.RETRY_QUEUE_NAME, {str(job_id): run_at})
+    head, _ = await pipe.execute()
+    if not head or run_at < float(head[0][1]):
+        await notify_retry_scheduled(run_at)
+    logger.info(
+        "Job rate-limited, deferred %.2fs",
+        delay,
+        extra={**log_extra, "status": "deferred"},
+    )
+
 
+async def process_job(
+    message: str | QueueMessage, semaphore: asyncio.Semaphore | AdaptiveLimiter
+) -> None:
+    if isinstance(message, str):
         try:
-            job_id = uuid.UUID(job_id_str)
+            message = decode_message(message)
         except ValueError:
-            logger.error("Invalid job ID from queue: '%s', skipping", job_id_str)
+            logger.error("Invalid queue message: '%s', skipping", message[:200])
             return
+    job_id = message.job_id
 
-        log_extra: dict = {"job_id": str(job_id)}
+    log_extra: dict = {"job_id": str(job_id)}
 
+    # Fat messages carry the type: throttle before taking a slot or claiming
+    if message.job_type is not None:
         try:
-            async with db.async_session_factory() as session:
-                result = await session.execute(select(Job).where(Job.id == job_id))
-                job = result.scalar_one_or_none()
+            delay = await throttle_delay(message.job_type)
+            if delay > 0:
+                log_extra["job_type"] = message.job_type
+                await defer_job(job_id, delay, log_extra)
+                return
+        except Exception as exc:
+            # Run it rather than drop it from the queue
+            logger.error("Failed to defer rate-limited job: %s", exc, extra=log_extra)
 
+    diagnostics.set_phase("waiting_for_slot")
+    async with semaphore:
+        diagnostics.set_phase("claiming")
+        start_time = time.monotonic()
+        handler_started: float | None = None
+        db_latency = 0.0
+        job: JobRecord | None = None
+        job_trace: str | None = None
+
+        try:
+            async with db.async_session_factory() as session:
+                db_started = time.monotonic()
+                claim_started_ns = time.time_ns()
+                if message.payload is not None:
+                    job = await claim_from_message(session, message, log_extra)
+                else:
+                    job = await claim_from_db(session, job_id, log_extra)
                 if job is None:
-                    logger.warning("Job not found in database, skipping", extra=log_extra)
                     return
-
-                log_extra["job_type"] = job.type
-
-                if job.status not in ("pending", "retrying"):
-                    logger.warning(
-                        "Job status is '%s', expected 'pending' or 'retrying', skipping",
-                        job.status,
-                        extra=log_extra,
+                db_latency = time.monotonic() - db_started
+                claimed_ns = time.time_ns()
+
+                if message.job_type is None:
+                    # Type only known after the claim: hand the claim back
+                    delay = await throttle_delay(job.type)
+                    if delay > 0:
+                        await job_store.unclaim(session, job_id, _utcnow())
+                        await session.commit()
+                        await defer_job(job_id, delay, log_extra)
+                        return
+
+                # Continue the trace the API started when the job was created
+                with tracing.span(
+                    "job.process",
+                    traceparent=job.traceparent,
+                    root=True,
+                    start_ns=claim_started_ns,
+                    job_id=str(job_id),
+                    job_type=job.type,
+                    attempt=job.attempts,
+                ) as job_span:
+                    job_trace = job_span.traceparent
+                    tracing.record("db.claim", claim_started_ns, claimed_ns)
+
+                    await queue_stats.mark_started(job.type, job_id)
+                    log_extra["attempts"] = job.attempts
+                    logger.info("Job started", extra=log_extra)
+
+                    # Look up and execute handler
+                    handler = get_handler(job.type)
+                    if handler is None:
+                        raise ValueError(f"Unknown job type: '{job.type}'")
+
+                    # Bound the handler so a hung job can't hold a slot forever.
+                    # On timeout wait_for cancels the handler task; thread/process
+                    # handlers can't be interrupted, but their slot here is freed.
+                    timeout = resolve_timeout(job)
+                    handler_started = time.monotonic()
+                    diagnostics.set_phase("handler")
+                    with tracing.span("handler"):
+                        try:
+                            await asyncio.wait_for(handler(job.payload), timeout=timeout)
+                        except TimeoutError:
+                            raise JobTimeoutError(
+                                f"Handler exceeded {timeout:g}s timeout"
+                            ) from None
+                    handler_latency = time.monotonic() - handler_started
+
+                    # Success
+                    job.status = "completed"
+                    job.error_message = None
+                    job.updated_at = _utcnow()
+                    diagnostics.set_phase("saving_status")
+                    with tracing.span("db.save_status", status="completed"):
+                        await save_status(session, job, wait=False)
+
+                    duration_ms = int((time.monotonic() - start_time) * 1000)
+                    logger.info(
+                        "Job completed",
+                        extra={**log_extra, "status": "completed", "duration_ms": duration_ms},
                     )
-                    return
-
-                # Transition to processing
-                job.status = "processing"
-                job.attempts += 1
-                job.updated_at = _utcnow()
-                await session.commit()
-
-                log_extra["attempts"] = job.attempts
-                logger.info("Job started", extra=log_extra)
-
-                # Look up and execute handler
-                handler = get_handler(job.type)
-                if handler is None:
-                    raise ValueError(f"Unknown job type: '{job.type}'")
-
-                await handler(job.payload)
-
-                # Success
-                job.status = "completed"
-                job.error_message = None
-                job.updated_at = _utcnow()
-                await session.commit()
+                    report_outcome(semaphore, job.type, handler_latency, db_latency, failed=False)
+                    await queue_stats.record_processed(job.type)
 
-                duration_ms = int((time.monotonic() - start_time) * 1000)
-                logger.info(
-                    "Job completed",
-                    extra={**log_extra, "status": "completed", "duration_ms": duration_ms},
-                )
+        except asyncio.CancelledError:
+            if job_id not in cancel_requested:
+                raise
+            # Cancelled through the API, which already set the status: the
+            # handler is interrupted and the slot freed without any writes
+            duration_ms = int((time.monotonic() - start_time) * 1000)
+            logger.info(
+                "Job cancelled",
+                extra={**log_extra, "status": "cancelled", "duration_ms": duration_ms},
+            )
+            return
 
         except Exception as exc:
             duration_ms = int((time.monotonic() - start_time) * 1000)
             error_msg = f"{type(exc).__name__}: {exc}"
+            if handler_started is not None:
+                report_outcome(
+                    semaphore,
+                    log_extra["job_type"],
+                    time.monotonic() - handler_started,
+                    db_latency,
+                    failed=True,
+                )
 
             logger.error(
                 "Job failed: %s",
@@ -115,51 +327,72 @@ async def process_job(job_id_str: str, semaphore: asyncio.Semaphore) -> None:
                 extra={**log_extra, "status": "failed", "error": error_msg, "duration_ms": duration_ms},
             )
 
+            diagnostics.set_phase("recording_failure")
             try:
-                async with db.async_session_factory() as session:
-                    result = await session.execute(select(Job).where(Job.id == job_id))
-                    job = result.scalar_one_or_none()
-                    if job:
-                        if job.attempts < job.max_attempts:
-                            # Schedule retry with exponential backoff
-                            delay = 2 ** job.attempts
-                            retry_at = time.time() + delay
-                            job.status = "retrying"
-                            job.error_message = error_msg[:2000]
-                            job.updated_at = _utcnow()
-                            await session.commit()
-
-                            await rc.redis_client.zadd(
-                                Config.RETRY_QUEUE_NAME, {str(job_id): retry_at}
-                            )
-
-                            logger.info(
-                                "Job scheduled for retry in %ds (attempt %d/%d)",
-                                delay,
-                                job.attempts,
-                                job.max_attempts,
-                                extra={
-                                    **log_extra,
-                                    "status": "retrying",
-                                    "retry_delay_s": delay,
-                                },
-                            )
-                        else:
-                            # Max attempts exceeded -> dead-letter queue
-                            job.status = "dead_letter"
-                            job.error_message = error_msg[:2000]
-                            job.updated_at = _utcnow()
-                            await session.commit()
-
-                            await rc.redis_client.rpush(
-                                Config.DLQ_NAME, str(job_id)
-                            )
-
-                            logger.warning(
-                                "Job moved to dead-letter queue after %d attempts",
-                                job.attempts,
-                                extra={**log_extra, "status": "dead_letter"},
-                            )
+                with tracing.span("job.failure", traceparent=job_trace, error=error_msg[:200]):
+                    async with db.async_session_factory() as session:
+                        # The claim already returned attempts/max_attempts; only
+                        # re-read the row if the failure happened before that
+                        if job is None:
+                            job = await job_store.load(session, job_id)
+                        if job:
+                            await queue_stats.record_processed(job.type)
+                            policy = get_retry_policy(job.type)
+                            if not policy.is_retryable(exc):
+                                # Permanent error for this job type -> fail fast
+                                job.status = "failed"
+                                job.error_message = error_msg[:2000]
+                                job.updated_at = _utcnow()
+                                await save_status(session, job)
+
+                                logger.warning(
+                                    "Job failed with non-retryable error",
+                                    extra={**log_extra, "status": "failed"},
+                                )
+                            elif job.attempts < job.max_attempts:
+                                # Schedule retry with the type's backoff + jitter
+                                delay = policy.next_delay(job.attempts)
+                                retry_at = time.time() + delay
+                                job.status = "retrying"
+                                job.error_message = error_msg[:2000]
+                                job.updated_at = _utcnow()
+                                await save_status(session, job)
+
+                                with tracing.span("redis.schedule_retry", delay_s=round(delay, 3)):
+                                    await rc.redis_client.zadd(
+                                        Config.RETRY_QUEUE_NAME, {str(job_id): retry_at}
+                                    )
+                                    await queue_stats.mark_ready(job.type, job_id, retry_at)
+                                    await notify_retry_scheduled(retry_at)
+
+                                logger.info(
+                                    "Job scheduled for retry in %.1fs (attempt %d/%d)",
+                                    delay,
+                                    job.attempts,
+                                    job.max_attempts,
+                                    extra={
+                                        **log_extra,
+                                        "status": "retrying",
+                                        "retry_delay_s": round(delay, 3),
+                                    },
+                                )
+                            else:
+                                # Max attempts exceeded -> dead-letter queue
+                                job.status = "dead_letter"
+                                job.error_message = error_msg[:2000]
+                                job.updated_at = _utcnow()
+                                await save_status(session, job)
+
+                                with tracing.span("redis.dead_letter"):
+                                    await rc.redis_client.rpush(
+                                        Config.DLQ_NAME, str(job_id)
+                                    )
+
+                                logger.warning(
+                                    "Job moved to dead-letter queue after %d attempts",
+                                    job.attempts,
+                                    extra={**log_extra, "status": "dead_letter"},
+                                )
             except Exception as db_exc:
                 logger.error(
                     "Failed to update job status in DB: %s",
@@ -168,43 +401,200 @@ async def process_job(job_id_str: str, semaphore: asyncio.Semaphore) -> None:
                 )
 
 
+async def notify_retry_scheduled(retry_at: float) -> None:
+    """Wake the retry scheduler (on whichever replica leads) for a new retry."""
+    if retry_at < retry_next_wake_at:
+        retry_wakeup.set()
+    await rc.redis_client.publish(Config.RETRY_WAKE_CHANNEL, retry_at)
+
+
+def cancel_running(job_ids: list[uuid.UUID]) -> int:
+    """Cancel the in-flight tasks of these jobs; returns how many ran here."""
+    wanted = {f"job:{job_id}": job_id for job_id in job_ids}
+    cancelled = 0
+    for task in list(in_flight_tasks):
+        job_id = wanted.get(task.get_name())
+        if job_id is None or task.done():
+            continue
+        cancel_requested.add(job_id)
+        task.add_done_callback(lambda _task, job_id=job_id: cancel_requested.discard(job_id))
+        task.cancel()
+        cancelled += 1
+    return cancelled
+
+
+async def listen_for_cancellations() -> None:
+    """Cancel local tasks of running jobs the API has cancelled."""
+    async with rc.redis_client.pubsub() as pubsub:
+        await pubsub.subscribe(Config.CANCEL_CHANNEL)
+        while not shutdown_event.is_set():
+            try:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                break
+            except Exception as exc:
+                logger.error("Error in cancellation listener: %s", exc)
+                await asyncio.sleep(1.0)
+                continue
+            if not message:
+                continue
+            try:
+                job_ids = [uuid.UUID(job_id) for job_id in message["data"].split(",")]
+            except ValueError:
+                logger.error("Invalid cancellation message: '%s'", message["data"][:200])
+                continue
+            cancelled = cancel_running(job_ids)
+            if cancelled:
+                logger.info("Cancelling %d running job(s)", cancelled)
+
+
+async def listen_for_retry_wakeups() -> None:
+    """Relay retry announcements from other replicas to the local scheduler."""
+    async with rc.redis_client.pubsub() as pubsub:
+        await pubsub.subscribe(Config.RETRY_WAKE_CHANNEL)
+        while not shutdown_event.is_set():
+            try:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                break
+            except Exception as exc:
+                logger.error("Error in retry wake-up listener: %s", exc)
+                await asyncio.sleep(1.0)
+                continue
+            if not message:
+                continue
+            try:
+                due_at = float(message["data"])
+            except (TypeError, ValueError):
+                logger.warning("Ignoring malformed retry wake-up: %r", message["data"])
+                continue
+            if due_at < retry_next_wake_at:
+                retry_wakeup.set()
+
+
+async def promote_due_retries(promote_script, batch_size: int) -> tuple[int, int, float | None]:
+    """Drain every due retry, growing the batch while batches come back full.
+
+    Returns (promoted, next batch size, earliest remaining score or None).
+    """
+    total = 0
+    while True:
+        result = await promote_script(
+            keys=[Config.RETRY_QUEUE_NAME, Config.QUEUE_NAME],
+            args=[time.time(), batch_size],
+        )
+        promoted = int(result[0])
+        next_due = float(result[1]) if len(result) > 1 else None
+        total += promoted
+        if promoted < batch_size:
+            break
+        batch_size = min(batch_size * 2, Config.RETRY_BATCH_MAX)
+
+    if promoted < batch_size // 4:
+        batch_size = max(batch_size // 2, Config.RETRY_BATCH_MIN)
+    return total, batch_size, next_due
+
+
+async def wait_for_retry_wakeup(timeout: float) -> None:
+    """Sleep up to ``timeout`` seconds, returning early on wake-up or shutdown."""
+    waiters = [
+        asyncio.ensure_future(retry_wakeup.wait()),
+        asyncio.ensure_future(shutdown_event.wait()),
+    ]
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+    retry_wakeup.clear()
+
+
 async def retry_scheduler() -> None:
-    """Periodically move due jobs from retry ZSET to main queue."""
+    """Run the timer indexes on the elected replica.
+
+    The leader promotes due retries and delayed jobs from the retry ZSET in
+    batches until nothing is due, materializes due cron firings, then sleeps
+    until the earliest remaining score (or a wake-up for an earlier one).
+    Other replicas only try to take over the lease.
+    """
+    global retry_next_wake_at
+
     logger.info(
-        "Retry scheduler started (poll_interval=%.1fs)",
+        "Retry scheduler started (batch=%d..%d, max_sleep=%.1fs)",
+        Config.RETRY_BATCH_MIN,
+        Config.RETRY_BATCH_MAX,
         Config.RETRY_POLL_INTERVAL,
     )
 
     promote_script = rc.redis_client.register_script(PROMOTE_RETRY_SCRIPT)
+    lease = LeaderLease(rc.redis_client, Config.RETRY_LEADER_KEY, Config.LEADER_LEASE_TTL)
+    listener = asyncio.create_task(listen_for_retry_wakeups())
+    batch_size = Config.RETRY_BATCH_MIN
 
     while not shutdown_event.is_set():
+        sleep_for = lease.renew_interval
         try:
-            now = time.time()
-            promoted = await promote_script(
-                keys=[Config.RETRY_QUEUE_NAME, Config.QUEUE_NAME],
-                args=[now],
-            )
-            if promoted and promoted > 0:
-                logger.info("Promoted %d job(s) from retry queue", promoted)
+            was_leader = lease.is_leader
+            if await lease.acquire():
+                if not was_leader:
+                    logger.info("Acquired retry scheduler lease")
+                promoted, batch_size, next_due = await promote_due_retries(
+                    promote_script, batch_size
+                )
+                if promoted > 0:
+                    logger.info("Promoted %d job(s) from retry queue", promoted)
+                fired, next_firing = await materialize_due_schedules(batch_size)
+                if fired > 0:
+                    logger.info("Materialized %d scheduled job(s)", fired)
+                sleep_for = min(sleep_for, Config.RETRY_POLL_INTERVAL)
+                for due_at in (next_due, next_firing):
+                    if due_at is not None:
+                        sleep_for = min(sleep_for, max(0.0, due_at - time.time()))
+            elif was_leader:
+                logger.warning("Lost retry scheduler lease")
         except asyncio.CancelledError:
             break
         except Exception as exc:
             logger.error("Error in retry scheduler: %s", exc, exc_info=True)
+            sleep_for = 1.0
 
-        await asyncio.sleep(Config.RETRY_POLL_INTERVAL)
+        retry_next_wake_at = time.time() + sleep_for if lease.is_leader else 0.0
+        await wait_for_retry_wakeup(sleep_for)
+
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+    try:
+        await lease.release()
+    except Exception as exc:
+        logger.error("Failed to release retry scheduler lease: %s", exc)
 
     logger.info("Retry scheduler stopped")
 
 
 async def worker_loop() -> None:
-    semaphore = asyncio.Semaphore(Config.MAX_CONCURRENCY)
+    global limiter
+    limiter = AdaptiveLimiter(
+        initial=Config.MAX_CONCURRENCY,
+        min_limit=Config.CONCURRENCY_MIN,
+        max_limit=Config.CONCURRENCY_MAX,
+        db_latency_target=Config.AIMD_DB_LATENCY_TARGET_MS / 1000,
+        latency_tolerance=Config.AIMD_LATENCY_TOLERANCE,
+        error_rate_threshold=Config.AIMD_ERROR_RATE,
+        decrease_factor=Config.AIMD_DECREASE_FACTOR,
+    )
     queue_name = Config.QUEUE_NAME
     poll_timeout = Config.QUEUE_POLL_TIMEOUT
 
     logger.info(
-        "Worker loop started (queue=%s, concurrency=%d, poll_timeout=%ds)",
+        "Worker loop started (queue=%s, concurrency=%d [%d..%d], poll_timeout=%ds)",
         queue_name,
-        Config.MAX_CONCURRENCY,
+        limiter.limit,
+        Config.CONCURRENCY_MIN,
+        Config.CONCURRENCY_MAX,
         poll_timeout,
     )
 
@@ -215,11 +605,19 @@ async def worker_loop() -> None:
             if result is None:
                 continue
 
-            _key, job_id_str = result
+            _key, raw_message = result
+
+            try:
+                message = decode_message(raw_message)
+            except ValueError:
+                logger.error("Invalid queue message: '%s', skipping", raw_message[:200])
+                continue
 
-            logger.info("Job received from queue", extra={"job_id": job_id_str})
+            logger.info("Job received from queue", extra={"job_id": str(message.job_id)})
 
-            task = asyncio.create_task(process_job(job_id_str, semaphore))
+            task = asyncio.create_task(
+                process_job(message, limiter), name=f"job:{message.job_id}"
+            )
             in_flight_tasks.add(task)
             task.add_done_callback(in_flight_tasks.discard)
 
@@ -237,13 +635,58 @@ async def worker_loop() -> None:
 
 
 async def health_handler(_request: web.Request) -> web.Response:
-    return web.json_response({"status": "ok"})
+    # Answered late if the loop is blocked; loop_lag_ms says by how much
+    monitor = diagnostics.monitor
+    return web.json_response({
+        "status": "ok",
+        "loop_lag_ms": round(monitor.last_lag * 1000, 2) if monitor else None,
+    })
+
+
+async def metrics_handler(_request: web.Request) -> web.Response:
+    return web.json_response({
+        "concurrency": limiter.snapshot() if limiter else None,
+        "executors": executors.get_stats(),
+        "event_loop": diagnostics.monitor.snapshot() if diagnostics.monitor else None,
+        "logging": log_config.get_stats(),
+    })
+
+
+async def debug_tasks_handler(_request: web.Request) -> web.Response:
+    """Every in-flight job task: phase, time in it, awaited object and stack."""
+    return web.json_response({"tasks": diagnostics.dump_tasks(list(in_flight_tasks))})
+
+
+profile_lock = asyncio.Lock()
+
+
+async def debug_profile_handler(request: web.Request) -> web.Response:
+    """Sample the event loop thread for ?seconds=N; returns folded stacks."""
+    try:
+        seconds = float(request.query.get("seconds", "5"))
+    except ValueError:
+        raise web.HTTPBadRequest(text="seconds must be a number")
+    if not 0 < seconds <= diagnostics.MAX_PROFILE_SECONDS:
+        raise web.HTTPBadRequest(
+            text=f"seconds must be in (0, {diagnostics.MAX_PROFILE_SECONDS}]"
+        )
+    if profile_lock.locked():
+        raise web.HTTPConflict(text="A profile capture is already running")
+    async with profile_lock:
+        samples = await asyncio.to_thread(
+            diagnostics.sample_profile, threading.get_ident(), seconds
+        )
+    return web.Response(text=diagnostics.format_folded(samples))
 
 
 async def start_health_server() -> None:
-    """Minimal HTTP server so Railway knows the container is alive."""
+    """Health probe for Railway, plus metrics and (optionally) debug endpoints."""
     app = web.Application()
     app.router.add_get("/health", health_handler)
+    app.router.add_get("/metrics", metrics_handler)
+    if Config.DEBUG_ENDPOINTS:
+        app.router.add_get("/debug/tasks", debug_tasks_handler)
+        app.router.add_get("/debug/profile", debug_profile_handler)
     port = int(os.environ.get("PORT", "8001"))
     runner = web.AppRunner(app)
     await runner.setup()
@@ -253,7 +696,7 @@ async def start_health_server() -> None:
 
 
 async def main() -> None:
-    setup_logging()
+    log_config.setup_logging(Config.LOG_JOB_INFO_RATE, Config.LOG_QUEUE_SIZE)
 
     signal.signal(signal.SIGTERM, handle_signal)
     signal.signal(signal.SIGINT, handle_signal)
@@ -262,20 +705,44 @@ async def main() -> None:
 
     db.init_db()
     rc.init_redis()
+    executors.init_executors(Config.THREAD_POOL_SIZE, Config.PROCESS_POOL_SIZE)
+    if Config.STATUS_WRITE_BEHIND:
+        status_writer.init_status_writer(
+            db.async_session_factory,
+            Config.STATUS_FLUSH_INTERVAL_MS / 1000,
+            Config.STATUS_FLUSH_MAX_BATCH,
+        )
+    tracing.init_tracing(
+        "job-flow-worker",
+        Config.TRACE_SAMPLE_RATE,
+        Config.TRACE_EXPORT_FILE,
+        Config.TRACE_EXPORT_URL,
+        Config.TRACE_EXPORT_INTERVAL,
+    )
 
     logger.info("Connected to database and Redis")
 
+    diagnostics.init_loop_monitor(
+        Config.LOOP_LAG_INTERVAL, Config.LOOP_STALL_THRESHOLD_MS / 1000
+    )
     await start_health_server()
 
     try:
         await asyncio.gather(
             worker_loop(),
             retry_scheduler(),
+            listen_for_cancellations(),
         )
     finally:
+        # Force out buffered status transitions before the engine goes away
+        await status_writer.close_status_writer()
+        await tracing.close_tracing()
+        await diagnostics.close_loop_monitor()
+        executors.close_executors()
         await rc.close_redis()
         await db.close_db()
         logger.info("Worker shut down gracefully")
+        log_config.close_logging()
 
 
 if __name__ == "__main__":
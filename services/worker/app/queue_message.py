@@ -0,0 +1,48 @@
+"""Queue message decoding. Kept in sync with services/api/app/queue_message.py.
+
+Entries are either a bare job UUID or a versioned JSON object carrying the
+job's id, type, attempts, max_attempts and payload ("fat" messages). Fat
+messages let the worker claim the job with one conditional UPDATE instead
+of SELECTing the row first.
+"""
+
+import json
+import uuid
+from dataclasses import dataclass
+
+MESSAGE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class QueueMessage:
+    job_id: uuid.UUID
+    # Only set for fat messages; None means "load the job from the DB"
+    job_type: str | None = None
+    attempts: int | None = None
+    max_attempts: int | None = None
+    payload: dict | None = None
+
+
+def decode_message(raw: str) -> QueueMessage:
+    """Parse a queue entry. Raises ValueError for anything unusable."""
+    if not raw.startswith("{"):
+        return QueueMessage(job_id=uuid.UUID(raw))
+
+    data = json.loads(raw)
+    if not isinstance(data, dict) or "id" not in data:
+        raise ValueError("Queue message has no job id")
+    job_id = uuid.UUID(data["id"])
+    if (
+        data.get("v") != MESSAGE_VERSION
+        or not isinstance(data.get("type"), str)
+        or not isinstance(data.get("payload"), dict)
+    ):
+        # Unknown version: still safe to fall back to the DB by id
+        return QueueMessage(job_id=job_id)
+    return QueueMessage(
+        job_id=job_id,
+        job_type=data["type"],
+        attempts=data.get("attempts"),
+        max_attempts=data.get("max_attempts"),
+        payload=data["payload"],
+    )
@@ -0,0 +1,60 @@
+"""Per-type queue lag bookkeeping read by the API's /metrics.
+
+Kept in sync with services/api/app/queue_stats.py:
+
+* ``queue_ready:<type>`` ZSET: job id -> time it became runnable (enqueue
+  time, or due time for retries and delayed jobs). Producers add to it
+  next to every queue entry; the worker removes the job once it starts.
+* ``processed:<type>:<bucket>`` counters of jobs run per
+  PROCESSED_BUCKET_SECONDS bucket, for the recent completion rate.
+
+Failures here are logged and ignored: stats must never fail a job.
+"""
+
+import logging
+import time
+import uuid
+
+from app import redis_client as rc
+
+logger = logging.getLogger(__name__)
+
+READY_PREFIX = "queue_ready"
+PROCESSED_PREFIX = "processed"
+PROCESSED_BUCKET_SECONDS = 10
+# Counters outlive the API's read window (6 buckets) with some margin
+PROCESSED_TTL_SECONDS = 120
+
+
+def ready_key(job_type: str) -> str:
+    return f"{READY_PREFIX}:{job_type}"
+
+
+def processed_key(job_type: str, bucket: int) -> str:
+    return f"{PROCESSED_PREFIX}:{job_type}:{bucket}"
+
+
+async def mark_ready(job_type: str, job_id: uuid.UUID, ready_at: float) -> None:
+    try:
+        await rc.redis_client.zadd(ready_key(job_type), {str(job_id): ready_at})
+    except Exception as exc:
+        logger.warning("Failed to update queue stats: %s", exc)
+
+
+async def mark_started(job_type: str, job_id: uuid.UUID) -> None:
+    """Drop a job from its type's waiting set (also used for unclaimable ones)."""
+    try:
+        await rc.redis_client.zrem(ready_key(job_type), str(job_id))
+    except Exception as exc:
+        logger.warning("Failed to update queue stats: %s", exc)
+
+
+async def record_processed(job_type: str) -> None:
+    key = processed_key(job_type, int(time.time() // PROCESSED_BUCKET_SECONDS))
+    try:
+        pipe = rc.redis_client.pipeline(transaction=False)
+        pipe.incr(key)
+        pipe.expire(key, PROCESSED_TTL_SECONDS)
+        await pipe.execute()
+    except Exception as exc:
+        logger.warning("Failed to update queue stats: %s", exc)
@@ -0,0 +1,182 @@
+"""Opt-in result cache for deterministic job types, with single-flight.
+
+Results are stored in Redis under ``result_cache:<type>:<sha256>``, where
+the hash covers the canonical JSON of ``(type, payload)`` (sorted keys, no
+whitespace), so key order in the payload doesn't matter. Entries expire
+after the type's TTL; a per-type ZSET of last-hit times evicts the least
+recently used entries beyond ``max_entries``. Members whose entry has
+expired are dropped from the ZSET when a lookup misses them, or on the next
+store once their last hit is a TTL old. The ZSET itself expires a TTL after
+the last store, when every entry in it has expired too.
+
+Identical jobs in flight at the same time run the handler once:
+
+* on one worker, later callers await the first caller's future;
+* across workers, the runner holds a ``<key>:lock`` lease (renewed while the
+  handler runs) and the others poll the cache until the result appears or
+  the lease is gone, in which case one of them takes over.
+
+Failures are never cached: waiters on the same worker share the failure
+(and each job is retried on its own), waiters elsewhere run it themselves.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from app.leader import LeaderLease
+from app import redis_client as rc
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "result_cache"
+LOCK_TTL = 30.0
+
+# Lua: read an entry and mark it as recently used (or forget it if expired).
+GET_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    redis.call('ZADD', KEYS[2], ARGV[1], KEYS[1])
+else
+    redis.call('ZREM', KEYS[2], KEYS[1])
+end
+return value
+"""
+
+# Lua: store an entry, then evict the least recently used ones over the bound.
+# Entries last hit over a TTL ago (stored even earlier) have expired; drop
+# them first so they neither grow the ZSET nor count towards the bound.
+SET_SCRIPT = """
+local ttl_ms = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. tostring(now - ttl_ms / 1000))
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ttl_ms)
+redis.call('ZADD', KEYS[2], ARGV[3], KEYS[1])
+redis.call('PEXPIRE', KEYS[2], ttl_ms)
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+if excess > 0 then
+    local evicted = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+    redis.call('DEL', unpack(evicted))
+end
+return excess
+"""
+
+_in_flight: dict[str, asyncio.Future] = {}
+
+# (client, lookup, store): the scripts registered once per Redis client
+_scripts: tuple | None = None
+
+
+def _registered(redis) -> tuple:
+    global _scripts
+    if _scripts is None or _scripts[0] is not redis:
+        _scripts = (redis, redis.register_script(GET_SCRIPT), redis.register_script(SET_SCRIPT))
+    return _scripts[1], _scripts[2]
+
+
+def cache_key(job_type: str, payload: dict) -> str:
+    canonical = json.dumps(
+        [job_type, payload], sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    digest = hashlib.sha256(canonical.encode()).hexdigest()
+    return f"{CACHE_PREFIX}:{job_type}:{digest}"
+
+
+async def run_cached(
+    job_type: str,
+    handler: Callable[[dict], Awaitable[Any]],
+    ttl: float,
+    max_entries: int,
+    payload: dict,
+) -> Any:
+    """Return the cached result for ``payload``, or run ``handler`` once and cache it."""
+    key = cache_key(job_type, payload)
+
+    while (flight := _in_flight.get(key)) is not None:
+        try:
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if not flight.cancelled():
+                raise
+            # The job running it timed out; take over instead of inheriting that
+
+    flight = asyncio.get_running_loop().create_future()
+    _in_flight[key] = flight
+    try:
+        result = await _get_or_run(key, job_type, handler, ttl, max_entries, payload)
+    except asyncio.CancelledError:
+        flight.cancel()
+        raise
+    except Exception as exc:
+        flight.set_exception(exc)
+        flight.exception()  # retrieved: don't warn when nobody else was waiting
+        raise
+    else:
+        flight.set_result(result)
+        return result
+    finally:
+        del _in_flight[key]
+
+
+async def _get_or_run(
+    key: str,
+    job_type: str,
+    handler: Callable[[dict], Awaitable[Any]],
+    ttl: float,
+    max_entries: int,
+    payload: dict,
+) -> Any:
+    redis = rc.redis_client
+    lru_key = f"{CACHE_PREFIX}:{job_type}:lru"
+    lookup, _ = _registered(redis)
+    lock = LeaderLease(redis, f"{key}:lock", LOCK_TTL)
+
+    poll_delay = 0.05
+    while True:
+        cached = await lookup(keys=[key, lru_key], args=[time.time()])
+        if cached is not None:
+            logger.info("Result cache hit, skipping handler", extra={"job_type": job_type})
+            return json.loads(cached)
+        if await lock.acquire():
+            # The previous holder may have stored it just before releasing
+            cached = await lookup(keys=[key, lru_key], args=[time.time()])
+            if cached is None:
+                break
+            await lock.release()
+            return json.loads(cached)
+        # Another worker is running the same job: wait for its result
+        await asyncio.sleep(poll_delay)
+        poll_delay = min(poll_delay * 2, 1.0)
+
+    keeper = asyncio.create_task(_keep_lock(lock))
+    try:
+        result = await handler(payload)
+        await _store(redis, key, lru_key, result, ttl, max_entries)
+        return result
+    finally:
+        keeper.cancel()
+        await asyncio.gather(keeper, return_exceptions=True)
+        await lock.release()
+
+
+async def _keep_lock(lock: LeaderLease) -> None:
+    while True:
+        await asyncio.sleep(lock.renew_interval)
+        await lock.acquire()
+
+
+async def _store(redis, key: str, lru_key: str, result: Any, ttl: float, max_entries: int) -> None:
+    try:
+        value = json.dumps(result, separators=(",", ":"))
+    except (TypeError, ValueError) as exc:
+        logger.warning("Result not cacheable: %s", exc)
+        return
+    _, store = _registered(redis)
+    await store(
+        keys=[key, lru_key],
+        args=[value, int(ttl * 1000), time.time(), max_entries],
+    )
@@ -0,0 +1,44 @@
+import random
+from dataclasses import dataclass
+from typing import Literal
+
+# "none"         -> base * multiplier^attempts (the original fixed schedule)
+# "full"         -> uniform(0, capped exponential delay)
+# "decorrelated" -> uniform(base, 3 * previous delay), capped
+JitterMode = Literal["none", "full", "decorrelated"]
+
+
+class InvalidPayloadError(ValueError):
+    """Raised by a handler for a payload no retry can fix (list it in ``fail_fast``)."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    base_delay: float = 1.0
+    multiplier: float = 2.0
+    max_delay: float = 300.0
+    jitter: JitterMode = "full"
+    # An exception is retried if it matches `retryable` and not `fail_fast`;
+    # anything else marks the job "failed" at once, skipping retries and DLQ.
+    retryable: tuple[type[BaseException], ...] = (Exception,)
+    fail_fast: tuple[type[BaseException], ...] = ()
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        return isinstance(exc, self.retryable) and not isinstance(exc, self.fail_fast)
+
+    def exponential_delay(self, attempts: int) -> float:
+        return min(self.max_delay, self.base_delay * self.multiplier ** attempts)
+
+    def next_delay(self, attempts: int) -> float:
+        """Seconds to wait before retrying a job that has made ``attempts`` attempts."""
+        if self.jitter == "full":
+            return random.uniform(0.0, self.exponential_delay(attempts))
+        if self.jitter == "decorrelated":
+            # The previous delay isn't persisted, so the un-jittered delay of
+            # the previous attempt stands in for it.
+            previous = max(self.base_delay, self.exponential_delay(attempts - 1))
+            return min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+        return self.exponential_delay(attempts)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
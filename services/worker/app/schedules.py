@@ -0,0 +1,117 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import Config
+from app import database as db
+from app.cron import CronSchedule
+from app.models import Job
+from app import queue_stats
+from app import redis_client as rc
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    """Return a naive UTC datetime (matches TIMESTAMP WITHOUT TIME ZONE columns)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _from_timestamp(score: float) -> datetime:
+    return datetime.fromtimestamp(score, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def firing_key(template_id: uuid.UUID, fire_at: float) -> str:
+    """Idempotency key for one firing, so a failover can't materialize it twice."""
+    return f"cron:{template_id}:{int(fire_at)}"
+
+
+async def materialize_due_schedules(limit: int) -> tuple[int, float | None]:
+    """Turn due cron templates into pending jobs and reschedule the templates.
+
+    Templates live in Postgres (status "scheduled"); their next firing time
+    is the score in a single Redis ZSET, so idle schedules cost nothing.
+    Missed firings (e.g. while no worker ran) collapse into one job.
+
+    Returns (jobs created, earliest remaining firing score or None).
+    """
+    redis = rc.redis_client
+    due = await redis.zrangebyscore(
+        Config.SCHEDULE_QUEUE_NAME, "-inf", time.time(), start=0, num=limit, withscores=True
+    )
+
+    created: list[str] = []
+    if due:
+        stale: list[str] = []
+        scores: dict[uuid.UUID, float] = {}
+        for member, score in due:
+            try:
+                scores[uuid.UUID(member)] = score
+            except ValueError:
+                stale.append(member)
+
+        next_scores: dict[str, float] = {}
+        async with db.async_session_factory() as session:
+            result = await session.execute(select(Job).where(Job.id.in_(scores)))
+            templates = {job.id: job for job in result.scalars()}
+
+            rows = []
+            now = _utcnow()
+            for template_id, score in scores.items():
+                template = templates.get(template_id)
+                if template is None or template.status != "scheduled" or not template.cron:
+                    stale.append(str(template_id))
+                    continue
+                rows.append({
+                    "type": template.type,
+                    "payload": template.payload,
+                    "status": "pending",
+                    "attempts": 0,
+                    "max_attempts": template.max_attempts,
+                    "timeout_seconds": template.timeout_seconds,
+                    "idempotency_key": firing_key(template_id, score),
+                })
+                next_run = CronSchedule(template.cron).next_after(max(_from_timestamp(score), now))
+                template.run_at = next_run
+                template.updated_at = now
+                next_scores[str(template_id)] = _timestamp(next_run)
+
+            if rows:
+                result = await session.execute(
+                    insert(Job)
+                    .values(rows)
+                    .on_conflict_do_nothing(
+                        index_elements=["idempotency_key"],
+                        index_where=Job.idempotency_key.isnot(None),
+                    )
+                    .returning(Job.id, Job.type)
+                )
+                created = [(str(row.id), row.type) for row in result]
+            await session.commit()
+
+        # Same failure mode as the API: DB first, then Redis
+        pipe = redis.pipeline()
+        if created:
+            pipe.rpush(Config.QUEUE_NAME, *(job_id for job_id, _ in created))
+            enqueued_at = time.time()
+            for job_id, job_type in created:
+                pipe.zadd(queue_stats.ready_key(job_type), {job_id: enqueued_at})
+        if next_scores:
+            pipe.zadd(Config.SCHEDULE_QUEUE_NAME, next_scores)
+        if stale:
+            pipe.zrem(Config.SCHEDULE_QUEUE_NAME, *stale)
+        await pipe.execute()
+
+        if stale:
+            logger.info("Dropped %d stale schedule(s)", len(stale))
+
+    head = await redis.zrange(Config.SCHEDULE_QUEUE_NAME, 0, 0, withscores=True)
+    return len(created), (head[0][1] if head else None)
@@ -0,0 +1,194 @@
+"""Group commit for job status transitions (optional, STATUS_WRITE_BEHIND=true).
+
+Instead of one ``session.commit()`` (and one WAL flush) per finished job,
+transitions are buffered for up to STATUS_FLUSH_INTERVAL_MS and written as
+a single ``UPDATE jobs ... FROM (VALUES ...)`` in one transaction.
+
+Durability:
+
+* Failure transitions (retrying / dead_letter / failed) are awaited: the
+  worker only touches Redis (ZADD/RPUSH) after the batch has committed, so
+  the DB-before-Redis ordering is unchanged. They only gain batching.
+* Completions are write-behind: the job slot is released before the batch
+  commits. If the worker is killed (SIGKILL, OOM, host loss) within the
+  flush interval, those jobs stay "processing" in Postgres although their
+  handler ran — the same state as a crash mid-handler. SIGTERM/SIGINT
+  shutdown always flushes the buffer before the DB engine is closed.
+* If a flush fails (e.g. a transient DB error), awaited transitions get
+  the exception and go through the caller's error path, as with a direct
+  commit. Write-behind completions have no caller left, so they are put
+  back in the buffer (behind any newer transition for the same job) and
+  retried with exponential backoff, up to MAX_RETRY_DELAY between tries.
+  On shutdown the buffer gets one last flush; if that fails too, the
+  remaining jobs are logged and stay "processing".
+* Updates only apply to rows still in "processing", so a buffered write
+  never overwrites a status changed elsewhere in the meantime.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, Text, column, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Longest pause between retries of a failed flush
+MAX_RETRY_DELAY = 5.0
+
+
+class StatusWriter:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        flush_interval: float,
+        max_batch: int,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending: dict[uuid.UUID, tuple[str, str | None, datetime]] = {}
+        self._waiters: list[asyncio.Future] = []
+        # Buffered jobs nobody awaits: re-buffered when their flush fails
+        self._write_behind: set[uuid.UUID] = set()
+        self._failures = 0
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def submit(
+        self,
+        job_id: uuid.UUID,
+        status: str,
+        error_message: str | None,
+        updated_at: datetime,
+        wait: bool = True,
+    ) -> asyncio.Future | None:
+        """Buffer a transition. With ``wait`` returns a future resolved on commit."""
+        self._pending[job_id] = (status, error_message, updated_at)
+        future = None
+        if wait:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            self._write_behind.discard(job_id)
+        else:
+            self._write_behind.add(job_id)
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+        return future
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_pending.wait()
+            if not self._closing and len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except TimeoutError:
+                    pass
+            self._has_pending.clear()
+            self._batch_full.clear()
+            await self.flush()
+            if self._closing and (not self._pending or self._failures):
+                # close() makes the final attempt
+                return
+            if self._failures:
+                await asyncio.sleep(
+                    min(self.flush_interval * 2**self._failures, MAX_RETRY_DELAY)
+                )
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, waiters, write_behind = self._pending, self._waiters, self._write_behind
+        self._pending, self._waiters, self._write_behind = {}, [], set()
+
+        rows = values(
+            column("id", UUID(as_uuid=True)),
+            column("status", String),
+            column("error_message", Text),
+            column("updated_at", DateTime),
+            name="v",
+        ).data([(job_id, *fields) for job_id, fields in batch.items()])
+        stmt = (
+            update(Job)
+            .where(Job.id == rows.c.id, Job.status == "processing")
+            .values(
+                status=rows.c.status,
+                error_message=rows.c.error_message,
+                updated_at=rows.c.updated_at,
+            )
+        )
+
+        try:
+            async with self.session_factory() as session:
+                await session.execute(stmt)
+                await session.commit()
+        except Exception as exc:
+            self._failures += 1
+            retained = 0
+            for job_id in write_behind:
+                # A transition submitted since is newer: keep that one
+                if job_id not in self._pending:
+                    self._pending[job_id] = batch[job_id]
+                    self._write_behind.add(job_id)
+                    retained += 1
+            logger.error(
+                "Failed to flush %d job status update(s), %d kept for retry: %s",
+                len(batch),
+                retained,
+                exc,
+            )
+            if self._pending:
+                self._has_pending.set()
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+            return
+
+        self._failures = 0
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def close(self) -> None:
+        """Flush everything still buffered and stop the background task."""
+        self._closing = True
+        self._has_pending.set()
+        self._batch_full.set()
+        if self._task is not None:
+            await self._task
+        await self.flush()
+        if self._pending:
+            logger.error(
+                "Shutting down with %d unwritten job status update(s): %s",
+                len(self._pending),
+                ", ".join(str(job_id) for job_id in self._pending),
+            )
+
+
+writer: StatusWriter | None = None
+
+
+def init_status_writer(
+    session_factory: async_sessionmaker[AsyncSession], flush_interval: float, max_batch: int
+) -> None:
+    global writer
+    writer = StatusWriter(session_factory, flush_interval, max_batch)
+    writer.start()
+
+
+async def close_status_writer() -> None:
+    global writer
+    if writer:
+        await writer.close()
+        writer = None
@@ -0,0 +1,72 @@
+"""Cluster-wide per-type throughput limits (Redis token bucket).
+
+Every worker replica draws from the same bucket per job type, refilled at
+``rate`` tokens per second up to ``burst``. The bucket uses Redis server
+time, so replicas with skewed clocks still share one consistent rate.
+
+A job that gets no token is deferred through the retry ZSET rather than
+failed: it gives up its concurrency slot, keeps its attempt count, and is
+re-queued when a token should be available (plus jitter, so a backlog of
+throttled jobs doesn't come back in one burst).
+"""
+
+import logging
+import random
+
+from app import redis_client as rc
+
+logger = logging.getLogger(__name__)
+
+BUCKET_PREFIX = "throttle"
+
+# Lua: refill by elapsed time, take one token if available. Returns
+# {1, "0"} when granted, else {0, seconds until the next token}.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local granted = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    granted = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {granted, tostring(wait)}
+"""
+
+# (client, script): registered once per Redis client
+_script: tuple | None = None
+
+
+def _registered(redis):
+    global _script
+    if _script is None or _script[0] is not redis:
+        _script = (redis, redis.register_script(TOKEN_BUCKET_SCRIPT))
+    return _script[1]
+
+
+async def acquire(job_type: str, rate: float, burst: int) -> float:
+    """Take a token for one job. Returns 0.0 if granted, else how long to defer.
+
+    Fails open: if Redis can't be reached the job runs unthrottled.
+    """
+    try:
+        script = _registered(rc.redis_client)
+        granted, wait = await script(keys=[f"{BUCKET_PREFIX}:{job_type}"], args=[rate, burst])
+    except Exception as exc:
+        logger.warning("Rate limit check for '%s' failed, not throttling: %s", job_type, exc)
+        return 0.0
+    if int(granted):
+        return 0.0
+    wait = float(wait)
+    # Spread deferred jobs over the next refill window instead of one instant
+    return wait + random.uniform(0, wait + burst / rate)
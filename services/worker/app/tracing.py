@@ -0,0 +1,243 @@
+"""Lightweight distributed tracing. Identical copy in services/api and services/worker.
+
+Trace context travels as a W3C ``traceparent`` string
+(``00-<32 hex trace id>-<16 hex span id>-<flags>``) stored on the job row,
+so the worker continues the trace the API started, across retries too.
+
+* ``span(name, ...)`` is a context manager timing a block; spans nest
+  through a ContextVar, so children need no explicit parent.
+* A trace is sampled once at its root (``sample_rate``); unsampled or
+  disabled tracing hands out a shared no-op span, so the cost is one
+  ContextVar lookup per span.
+* Finished spans are buffered and written in batches every
+  ``export_interval`` seconds off the event loop: JSON lines appended to a
+  file, and/or POSTed as ``{"spans": [...]}`` to a collector URL. When the
+  buffer is full new spans are dropped, never blocking the caller.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import secrets
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, start_ns: int):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns = 0
+        self.attributes: dict[str, Any] = {}
+        self.status = "ok"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self, service: str) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "service": service,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+class _NoopSpan:
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Span | _NoopSpan | None] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value: str) -> tuple[str, str, bool] | None:
+    """(trace id, parent span id, sampled) from a traceparent, or None if malformed."""
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 0x01)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class BatchExporter:
+    def __init__(
+        self,
+        service: str,
+        sample_rate: float,
+        file_path: str | None,
+        url: str | None,
+        export_interval: float,
+        max_queue: int = 10000,
+    ):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.file_path = file_path
+        self.url = url
+        self.export_interval = export_interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._buffer: list[Span] = []
+        self._task: asyncio.Task | None = None
+
+    def add(self, span: Span) -> None:
+        if len(self._buffer) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._buffer.append(span)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.export_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        records = [span.to_dict(self.service) for span in batch]
+        try:
+            await asyncio.to_thread(self._export, records)
+        except Exception as exc:
+            logger.warning("Failed to export %d span(s): %s", len(records), exc)
+
+    def _export(self, records: list[dict]) -> None:
+        if self.file_path:
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+        if self.url:
+            request = urllib.request.Request(
+                self.url,
+                data=json.dumps({"spans": records}).encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=5):
+                pass
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+
+
+exporter: BatchExporter | None = None
+
+
+@contextmanager
+def span(
+    name: str,
+    traceparent: str | None = None,
+    root: bool = False,
+    start_ns: int | None = None,
+    **attributes: Any,
+) -> Iterator[Span | _NoopSpan]:
+    """Time a block as a span.
+
+    The parent is ``traceparent`` when given, else the current span. With
+    neither, ``root=True`` starts a new trace (subject to sampling) and
+    anything else is not traced.
+    """
+    parent = _current.get()
+    if exporter is None or (traceparent is None and parent is NOOP_SPAN):
+        yield NOOP_SPAN
+        return
+
+    context = parse_traceparent(traceparent) if traceparent else None
+    if context is not None:
+        trace_id, parent_id, sampled = context
+    elif isinstance(parent, Span):
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, True
+    elif root:
+        trace_id, parent_id = secrets.token_hex(16), None
+        sampled = random.random() < exporter.sample_rate
+    else:
+        sampled = False
+
+    if not sampled:
+        token = _current.set(NOOP_SPAN)
+        try:
+            yield NOOP_SPAN
+        finally:
+            _current.reset(token)
+        return
+
+    current = Span(name, trace_id, parent_id, start_ns or time.time_ns())
+    current.attributes.update(attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "error"
+        current.attributes["error"] = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(token)
+        exporter.add(current)
+
+
+def record(name: str, start_ns: int, end_ns: int, **attributes: Any) -> None:
+    """Add an already finished child span (timed before its parent existed)."""
+    parent = _current.get()
+    if exporter is None or not isinstance(parent, Span):
+        return
+    child = Span(name, parent.trace_id, parent.span_id, start_ns)
+    child.end_ns = end_ns
+    child.attributes.update(attributes)
+    exporter.add(child)
+
+
+def init_tracing(
+    service: str,
+    sample_rate: float,
+    file_path: str | None,
+    url: str | None,
+    export_interval: float,
+) -> None:
+    """Enable tracing when there is somewhere to export to and sampling is on."""
+    global exporter
+    if sample_rate <= 0 or not (file_path or url):
+        return
+    exporter = BatchExporter(service, sample_rate, file_path, url, export_interval)
+    exporter.start()
+
+
+async def close_tracing() -> None:
+    global exporter
+    if exporter:
+        await exporter.close()
+        exporter = None
@@ -0,0 +1,131 @@
+"""Timing, baselines and regression reports for the hot-path benchmarks.
+
+Identical copy in services/api/benchmarks and services/worker/benchmarks.
+
+A benchmark is ``async def bench(ctx, n, timer)``: it does its own setup,
+runs ``n`` operations inside ``with timer:``, and cleans up afterwards.
+Each one runs ``rounds`` times and the best round counts, since noise
+(GC, scheduling, other processes) only ever makes a round slower. Results
+are per operation, in microseconds of wall time and of process CPU time.
+
+``--save-baseline`` stores the results as JSON; later runs print the change
+against it as a percentage and exit non-zero when any benchmark is slower
+by more than ``--threshold`` percent.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+
+class Timer:
+    def __init__(self) -> None:
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._wall_started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.wall += time.perf_counter() - self._wall_started
+        self.cpu += time.process_time() - self._cpu_started
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[dict, int, Timer], Awaitable[None]]
+    ops: int
+    # Context keys that must be set (e.g. "redis", "db"), else it's skipped
+    requires: tuple[str, ...] = ()
+
+
+def parse_args(description: str, default_baseline: Path) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--database-url", help="scratch Postgres with migrations applied")
+    parser.add_argument("--redis-url", help="scratch Redis database")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every ops count")
+    parser.add_argument("--only", action="append", help="run only these benchmarks")
+    parser.add_argument("--baseline", type=Path, default=default_baseline)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression percent")
+    return parser.parse_args()
+
+
+async def run_benchmark(bench: Benchmark, ctx: dict, rounds: int, scale: float) -> dict:
+    n = max(1, int(bench.ops * scale))
+    # Warm-up round: imports, compiled SQL, prepared statements, script SHAs
+    await bench.func(ctx, max(1, n // 10), Timer())
+    best_wall = best_cpu = float("inf")
+    for _ in range(rounds):
+        timer = Timer()
+        await bench.func(ctx, n, timer)
+        best_wall = min(best_wall, timer.wall / n)
+        best_cpu = min(best_cpu, timer.cpu / n)
+    return {"us_per_op": round(best_wall * 1e6, 2), "cpu_us_per_op": round(best_cpu * 1e6, 2)}
+
+
+def _change(current: float, baseline: float | None) -> float | None:
+    if not baseline:
+        return None
+    return (current - baseline) / baseline * 100
+
+
+def report(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print a results table against the baseline; returns regressed benchmark names."""
+    regressed = []
+    print(f"{'benchmark':<28} {'us/op':>10} {'cpu us/op':>10} {'vs baseline':>12}")
+    for name, result in results.items():
+        change = _change(result["us_per_op"], baseline.get(name, {}).get("us_per_op"))
+        if change is None:
+            delta = "new"
+        else:
+            delta = f"{change:+.1f}%"
+            if change > threshold:
+                delta += "  REGRESSION"
+                regressed.append(name)
+        print(f"{name:<28} {result['us_per_op']:>10.2f} {result['cpu_us_per_op']:>10.2f} {delta:>12}")
+    return regressed
+
+
+async def run_suite(benchmarks: list[Benchmark], ctx: dict, args: argparse.Namespace) -> int:
+    results = {}
+    for bench in benchmarks:
+        if args.only and bench.name not in args.only:
+            continue
+        missing = [key for key in bench.requires if ctx.get(key) is None]
+        if missing:
+            print(f"{bench.name:<28} skipped (needs {', '.join(missing)})", file=sys.stderr)
+            continue
+        results[bench.name] = await run_benchmark(bench, ctx, args.rounds, args.scale)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressed = report(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    return 1 if regressed else 0
+
+
+def main(benchmarks: list[Benchmark], setup, teardown, description: str, baseline: Path) -> None:
+    """Parse args, build the context with ``setup(args)``, run, exit with the verdict."""
+    args = parse_args(description, baseline)
+
+    async def run() -> int:
+        ctx = await setup(args)
+        try:
+            return await run_suite(benchmarks, ctx, args)
+        finally:
+            await teardown(ctx)
+
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,473 @@
+"""Discrete-event simulator of the queue -> worker -> retry/DLQ pipeline.
+
+Answers "what happens to throughput, queue age and the DLQ rate if we
+change MAX_CONCURRENCY, the replica count or the retry settings?" in
+seconds, on a virtual clock, instead of load testing the real stack.
+
+What is modeled, and how it maps to app/main.py:
+
+* Arrivals: Poisson at ``--rate`` jobs/s, types drawn by profile weight.
+* worker_loop: every replica BLPOPs eagerly and waits on its own semaphore,
+  so a message goes to the next replica in turn (BLPOP hands them out
+  round-robin among idle pollers) and queues in that replica's memory.
+  ``--concurrency`` is the semaphore size; the AIMD limiter is not modeled.
+* process_job: a slot is held for ``claim_ms`` (claim + status commits) plus
+  the handler's duration, cut at its timeout (a JobTimeoutError). Handler
+  failures happen at the end of the run with the type's failure rate.
+* Per-type rate limits (HandlerSpec.rate_limit): a shared token bucket;
+  a job that gets no token frees its slot and is deferred through the
+  retry ZSET without using an attempt, like throttle_delay/defer_job.
+* Retries: the type's RetryPolicy from the handler registry (same backoff
+  and jitter code), fail_fast share, max_attempts, then the DLQ.
+* retry_scheduler: wakes at the earliest remaining retry score (at most
+  ``--retry-poll-interval`` later), or earlier when a newly scheduled retry
+  publishes a wake-up (off with ``--no-wakeup``). Each wake drains everything
+  due in PROMOTE_RETRY_SCRIPT calls of a batch size that doubles while
+  batches come back full, up to ``--retry-batch-max``; each call takes
+  ``script_ms``.
+
+Not modeled: micro-batching, the result cache, DB/Redis saturation (use a
+measured profile, whose durations already include them) and the AIMD
+limiter. Profiles are JSON (see simulation/profiles/handlers.json, which
+mirrors the demo handlers); ``--measure`` builds one from the jobs table.
+
+    python -m simulation.simulate --rate 40 --jobs 1000000 --concurrency 5 10 20 --replicas 2
+    python -m simulation.simulate --measure postgresql+asyncpg://... > measured.json
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import math
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from app.handlers import HANDLERS
+from app.retry_policy import DEFAULT_RETRY_POLICY, RetryPolicy
+
+DEFAULT_PROFILE = Path(__file__).with_name("profiles") / "handlers.json"
+DEFAULT_JOB_TIMEOUT = 300.0
+
+# Event kinds, in tie-break order at equal times
+ARRIVAL, FINISH, PROMOTE, READY = range(4)
+
+
+class Histogram:
+    """Log-bucketed (1% precision) histogram of seconds; O(1) memory per decade."""
+
+    _log_base = math.log1p(0.01)
+
+    def __init__(self) -> None:
+        self.counts: dict[int, int] = {}
+        self.total = 0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        bucket = math.floor(math.log(max(value, 1e-6)) / self._log_base)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> float:
+        if not self.total:
+            return 0.0
+        rank, seen = max(1, math.ceil(self.total * p / 100)), 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(math.exp((bucket + 0.5) * self._log_base), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "p50": round(self.percentile(50), 4),
+            "p99": round(self.percentile(99), 4),
+            "p999": round(self.percentile(99.9), 4),
+            "max": round(self.max, 4),
+        }
+
+
+def sampler(spec: dict, rng: random.Random):
+    """Duration sampler in seconds from a profile's ``duration`` entry."""
+    dist = spec["dist"]
+    if dist == "constant":
+        value = spec["ms"] / 1000
+        return lambda: value
+    if dist == "uniform":
+        low, high = spec["min_ms"] / 1000, spec["max_ms"] / 1000
+        return lambda: rng.uniform(low, high)
+    if dist == "exponential":
+        rate = 1000 / spec["mean_ms"]
+        return lambda: rng.expovariate(rate)
+    if dist == "lognormal":
+        # Parameterized by median and p99, which is what dashboards show
+        mu = math.log(spec["median_ms"] / 1000)
+        sigma = (math.log(spec["p99_ms"] / 1000) - mu) / 2.3263
+        return lambda: rng.lognormvariate(mu, sigma)
+    if dist == "empirical":
+        samples = [ms / 1000 for ms in spec["samples_ms"]]
+        return lambda: rng.choice(samples)
+    raise ValueError(f"Unknown duration distribution: '{dist}'")
+
+
+@dataclass
+class JobType:
+    name: str
+    weight: float
+    duration: object
+    failure_rate: float
+    fail_fast_fraction: float
+    timeout: float
+    max_attempts: int
+    retry: RetryPolicy
+    rate: float | None
+    burst: int
+    # Token bucket state (rate-limited types only)
+    tokens: float = 0.0
+    refilled_at: float = 0.0
+
+
+def load_types(profile: dict, rng: random.Random) -> list[JobType]:
+    types = []
+    for name, entry in profile["types"].items():
+        spec = HANDLERS.get(name)
+        retry = spec.retry if spec is not None else DEFAULT_RETRY_POLICY
+        if "retry" in entry:
+            retry = replace(retry, **entry["retry"])
+        timeout = entry.get("timeout_s") or (spec.timeout if spec and spec.timeout else None)
+        rate_limit = spec.rate_limit if spec is not None else None
+        rate = entry.get("rate_limit", {}).get("rate", rate_limit.rate if rate_limit else None)
+        burst = entry.get("rate_limit", {}).get("burst", rate_limit.burst if rate_limit else 1)
+        types.append(JobType(
+            name=name,
+            weight=entry.get("weight", 1.0),
+            duration=sampler(entry["duration"], rng),
+            failure_rate=entry.get("failure_rate", 0.0),
+            fail_fast_fraction=entry.get("fail_fast_fraction", 0.0),
+            timeout=timeout or DEFAULT_JOB_TIMEOUT,
+            max_attempts=entry.get("max_attempts", 3),
+            retry=retry,
+            rate=rate,
+            burst=burst,
+            tokens=float(burst),
+        ))
+    return types
+
+
+@dataclass
+class Settings:
+    rate: float
+    jobs: int
+    replicas: int
+    concurrency: int
+    claim_ms: float = 5.0
+    script_ms: float = 1.0
+    retry_poll_interval: float = 5.0
+    retry_wakeup: bool = True
+    retry_batch_min: int = 100
+    retry_batch_max: int = 1000
+    seed: int = 1
+
+
+def take_token(job_type: JobType, now: float, rng: random.Random) -> float:
+    """0.0 if the bucket had a token, else the deferral (wait + jitter) like throttle.acquire."""
+    job_type.tokens = min(
+        job_type.burst, job_type.tokens + (now - job_type.refilled_at) * job_type.rate
+    )
+    job_type.refilled_at = now
+    if job_type.tokens >= 1:
+        job_type.tokens -= 1
+        return 0.0
+    wait = (1 - job_type.tokens) / job_type.rate
+    return wait + rng.uniform(0, wait + job_type.burst / job_type.rate)
+
+
+def simulate(types: list[JobType], settings: Settings) -> dict:
+    rng = random.Random(settings.seed)
+    # RetryPolicy.next_delay draws from the module-level generator
+    random.seed(settings.seed)
+    weights = [t.weight for t in types]
+    claim_s = settings.claim_ms / 1000
+    script_s = settings.script_ms / 1000
+
+    events: list = []
+    seq = 0
+    free = [settings.concurrency] * settings.replicas
+    waiting = [deque() for _ in range(settings.replicas)]
+    busy_time = [0.0] * settings.replicas
+    next_replica = 0
+    retry_zset: list = []  # heap of (due, seq, job)
+    scheduler_wake = 0.0
+    batch_size = settings.retry_batch_min
+
+    queue_age, end_to_end = Histogram(), Histogram()
+    outcomes = {"completed": 0, "failed": 0, "dead_letter": 0}
+    attempts_total = retries = deferrals = timeouts = 0
+    backlog, max_backlog = 0, 0
+    last_finish = 0.0
+
+    def push(at: float, kind: int, data) -> None:
+        nonlocal seq
+        seq += 1
+        heapq.heappush(events, (at, kind, seq, data))
+
+    def dispatch(job: list, now: float) -> None:
+        # Round-robin BLPOP hand-out; the job then waits on that replica's semaphore
+        nonlocal next_replica
+        replica = next_replica
+        next_replica = (next_replica + 1) % settings.replicas
+        job[3] = now
+        if free[replica] > 0:
+            free[replica] -= 1
+            start(replica, job, now)
+        else:
+            waiting[replica].append(job)
+
+    def start(replica: int, job: list, now: float) -> None:
+        nonlocal deferrals, attempts_total
+        job_type = types[job[0]]
+        queue_age.record(now - job[3])
+        if job_type.rate is not None:
+            delay = take_token(job_type, now, rng)
+            if delay > 0:
+                # Claimed, handed back and deferred: the slot is busy only for the claim
+                deferrals += 1
+                push(now + claim_s, FINISH, (replica, job, "deferred", delay, now))
+                return
+        job[1] += 1
+        attempts_total += 1
+        duration = job_type.duration()
+        if duration > job_type.timeout:
+            outcome, duration = "timeout", job_type.timeout
+        elif rng.random() < job_type.failure_rate:
+            outcome = "error"
+        else:
+            outcome = "ok"
+        push(now + claim_s + duration, FINISH, (replica, job, outcome, 0.0, now))
+
+    def schedule_retry(job: list, due: float) -> None:
+        nonlocal scheduler_wake, seq
+        seq += 1
+        heapq.heappush(retry_zset, (due, seq, job))
+        # schedule_retry publishes a wake-up when the retry is due before
+        # the scheduler's planned wake; without it the retry waits for that
+        if settings.retry_wakeup and due < scheduler_wake:
+            scheduler_wake = due
+            push(due, PROMOTE, due)
+
+    # Arrivals are generated lazily, one event ahead
+    push(rng.expovariate(settings.rate), ARRIVAL, 0)
+    scheduler_wake = settings.retry_poll_interval
+    push(scheduler_wake, PROMOTE, scheduler_wake)
+
+    done = 0
+    while events and done < settings.jobs:
+        now, kind, _, data = heapq.heappop(events)
+
+        if kind == ARRIVAL:
+            index = data
+            job_type_index = rng.choices(range(len(types)), weights)[0]
+            # [type, attempts, created_at, ready_at]
+            dispatch([job_type_index, 0, now, now], now)
+            backlog += 1
+            max_backlog = max(max_backlog, backlog)
+            if index + 1 < settings.jobs:
+                push(now + rng.expovariate(settings.rate), ARRIVAL, index + 1)
+
+        elif kind == FINISH:
+            replica, job, outcome, delay, started_at = data
+            job_type = types[job[0]]
+            busy_time[replica] += now - started_at
+            finished = True
+            if outcome == "deferred":
+                finished = False
+                schedule_retry(job, now + delay)
+            elif outcome == "ok":
+                outcomes["completed"] += 1
+            else:
+                if outcome == "timeout":
+                    timeouts += 1
+                if rng.random() < job_type.fail_fast_fraction:
+                    outcomes["failed"] += 1
+                elif job[1] < job_type.max_attempts:
+                    finished = False
+                    retries += 1
+                    schedule_retry(job, now + job_type.retry.next_delay(job[1]))
+                else:
+                    outcomes["dead_letter"] += 1
+            if finished:
+                done += 1
+                backlog -= 1
+                last_finish = now
+                end_to_end.record(now - job[2])
+            # Free the slot: next waiting job on this replica, if any
+            if waiting[replica]:
+                start(replica, waiting[replica].popleft(), now)
+            else:
+                free[replica] += 1
+
+        elif kind == PROMOTE:
+            if data != scheduler_wake:
+                continue  # superseded by an earlier wake-up
+            promoted_at = now
+            while True:
+                promoted = 0
+                while retry_zset and retry_zset[0][0] <= promoted_at and promoted < batch_size:
+                    _, _, job = heapq.heappop(retry_zset)
+                    promoted += 1
+                    push(promoted_at + script_s, READY, job)
+                promoted_at += script_s
+                if promoted < batch_size:
+                    break
+                batch_size = min(batch_size * 2, settings.retry_batch_max)
+            if promoted < batch_size // 4:
+                batch_size = max(batch_size // 2, settings.retry_batch_min)
+            # Sleep until the earliest remaining score, at most the poll interval
+            scheduler_wake = promoted_at + settings.retry_poll_interval
+            if retry_zset:
+                scheduler_wake = min(scheduler_wake, max(retry_zset[0][0], promoted_at))
+            if done < settings.jobs:
+                push(scheduler_wake, PROMOTE, scheduler_wake)
+
+        else:  # READY: promoted retry lands on the main queue
+            dispatch(data, now)
+
+    horizon = last_finish or 1.0
+    capacity = settings.replicas * settings.concurrency * horizon
+    return {
+        "settings": {
+            "rate": settings.rate, "replicas": settings.replicas,
+            "concurrency": settings.concurrency, "jobs": settings.jobs,
+            "retry_wakeup": settings.retry_wakeup,
+            "retry_poll_interval": settings.retry_poll_interval,
+        },
+        "simulated_seconds": round(horizon, 1),
+        "throughput_per_s": round(done / horizon, 2),
+        "utilization": round(sum(busy_time) / capacity, 4),
+        "outcomes": outcomes,
+        "dead_letter_rate": round(outcomes["dead_letter"] / done, 5) if done else 0.0,
+        "attempts_per_job": round(attempts_total / done, 3) if done else 0.0,
+        "retries": retries,
+        "timeouts": timeouts,
+        "rate_limit_deferrals": deferrals,
+        "max_backlog": max_backlog,
+        "queue_age_s": queue_age.summary(),
+        "end_to_end_s": end_to_end.summary(),
+    }
+
+
+async def measure(database_url: str, since_hours: float, max_samples: int) -> dict:
+    """Build a profile from recent jobs: run times, failure rates and the type mix."""
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(database_url)
+    since = f"now() - interval '{float(since_hours)} hours'"
+    try:
+        async with engine.connect() as conn:
+            mix = await conn.execute(text(
+                f"SELECT type, count(*), "
+                f"sum(CASE WHEN status = 'completed' THEN attempts - 1 ELSE attempts END), "
+                f"sum(attempts), max(max_attempts) "
+                f"FROM jobs WHERE created_at > {since} AND attempts > 0 "
+                f"AND status IN ('completed', 'failed', 'dead_letter') GROUP BY type"
+            ))
+            profile: dict = {"types": {}}
+            for job_type, count, failed_attempts, attempts, max_attempts in mix:
+                samples = await conn.execute(text(
+                    f"SELECT extract(epoch FROM updated_at - started_at) * 1000 FROM jobs "
+                    f"WHERE type = :type AND status = 'completed' AND started_at IS NOT NULL "
+                    f"AND created_at > {since} ORDER BY random() LIMIT :limit"
+                ), {"type": job_type, "limit": max_samples})
+                samples_ms = [round(float(ms), 1) for (ms,) in samples if ms is not None]
+                profile["types"][job_type] = {
+                    "weight": count,
+                    "duration": (
+                        {"dist": "empirical", "samples_ms": samples_ms}
+                        if samples_ms else {"dist": "constant", "ms": 0}
+                    ),
+                    "failure_rate": round(failed_attempts / attempts, 4) if attempts else 0.0,
+                    "max_attempts": max_attempts,
+                }
+            return profile
+    finally:
+        await engine.dispose()
+
+
+def print_table(results: list[dict]) -> None:
+    print(
+        f"{'replicas':>8} {'conc':>5} {'thru/s':>9} {'util':>6} {'dlq':>8} "
+        f"{'age p50':>9} {'age p99':>9} {'e2e p99':>9} {'backlog':>8}"
+    )
+    for r in results:
+        s = r["settings"]
+        print(
+            f"{s['replicas']:>8} {s['concurrency']:>5} {r['throughput_per_s']:>9.1f} "
+            f"{r['utilization']:>6.0%} {r['dead_letter_rate']:>8.2%} "
+            f"{r['queue_age_s']['p50']:>8.2f}s {r['queue_age_s']['p99']:>8.2f}s "
+            f"{r['end_to_end_s']['p99']:>8.2f}s {r['max_backlog']:>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", type=Path, default=DEFAULT_PROFILE)
+    parser.add_argument("--rate", type=float, default=20.0, help="arrivals per second")
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[5],
+                        help="MAX_CONCURRENCY per replica")
+    parser.add_argument("--claim-ms", type=float, default=5.0)
+    parser.add_argument("--script-ms", type=float, default=1.0)
+    parser.add_argument("--retry-poll-interval", type=float, default=5.0)
+    parser.add_argument("--no-wakeup", action="store_true",
+                        help="promote retries only every --retry-poll-interval")
+    parser.add_argument("--retry-batch-min", type=int, default=100)
+    parser.add_argument("--retry-batch-max", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--measure", metavar="DATABASE_URL",
+                        help="print a profile measured from the jobs table and exit")
+    parser.add_argument("--since-hours", type=float, default=24.0)
+    parser.add_argument("--max-samples", type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.measure:
+        profile = asyncio.run(measure(args.measure, args.since_hours, args.max_samples))
+        json.dump(profile, sys.stdout, indent=2)
+        print()
+        return
+
+    profile = json.loads(args.profile.read_text())
+    results = []
+    for replicas in args.replicas:
+        for concurrency in args.concurrency:
+            settings = Settings(
+                rate=args.rate, jobs=args.jobs, replicas=replicas, concurrency=concurrency,
+                claim_ms=args.claim_ms, script_ms=args.script_ms,
+                retry_poll_interval=args.retry_poll_interval, retry_wakeup=not args.no_wakeup,
+                retry_batch_min=args.retry_batch_min, retry_batch_max=args.retry_batch_max,
+                seed=args.seed,
+            )
+            # Fresh types per run: samplers and token buckets hold state
+            types = load_types(profile, random.Random(args.seed))
+            started = time.perf_counter()
+            result = simulate(types, settings)
+            result["wall_seconds"] = round(time.perf_counter() - started, 2)
+            results.append(result)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
+import json
 import uuid
 from datetime import datetime, timezone
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from app import tracing
 from app.models import Job
 
 
+@pytest.fixture(autouse=True)
+def unthrottled():
+    """Per-type rate limits need Redis; tests that cover them patch this back."""
+    with patch("app.main.get_rate_limit", return_value=None):
+        yield
+
+
 def make_job(**kwargs) -> MagicMock:
     """Factory for creating mock Job instances for testing."""
     now = datetime.now(timezone.utc).replace(tzinfo=None)
@@ -19,6 +28,12 @@ def make_job(**kwargs) -> MagicMock:
         "max_attempts": 3,
         "error_message": None,
         "idempotency_key": None,
+        "dedupe_key": None,
+        "traceparent": None,
+        "started_at": None,
+        "timeout_seconds": None,
+        "run_at": None,
+        "cron": None,
         "created_at": now,
         "updated_at": now,
     }
@@ -27,3 +42,55 @@ def make_job(**kwargs) -> MagicMock:
     for k, v in defaults.items():
         setattr(job, k, v)
     return job
+
+
+def session_factory_for(*rows) -> MagicMock:
+    """Session factory whose Nth session returns the Nth row from every query.
+
+    The sessions handed out are kept on ``factory.sessions``.
+    """
+    sessions = []
+    for row in rows:
+        session = AsyncMock()
+        result = MagicMock()
+        result.one_or_none.return_value = row
+        result.scalar_one_or_none.return_value = row
+        session.execute = AsyncMock(return_value=result)
+        sessions.append(session)
+    session_iter = iter(sessions)
+
+    class FakeSessionCtx:
+        async def __aenter__(self):
+            return next(session_iter)
+
+        async def __aexit__(self, *args):
+            return False
+
+    factory = MagicMock(side_effect=lambda: FakeSessionCtx())
+    factory.sessions = sessions
+    return factory
+
+
+def written_statuses(session) -> list[dict]:
+    """Bind parameters of every status UPDATE executed on ``session``."""
+    return [
+        call.args[1]
+        for call in session.execute.await_args_list
+        if len(call.args) > 1 and "new_status" in call.args[1]
+    ]
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    """Tracing with every new trace sampled, exporting to a temp file."""
+    path = tmp_path / "spans.jsonl"
+    tracing.exporter = tracing.BatchExporter("test", 1.0, str(path), None, 60)
+    yield path
+    tracing.exporter = None
+
+
+async def exported_spans(path) -> list[dict]:
+    """Flush the test exporter and read back what it wrote."""
+    await tracing.exporter.flush()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+